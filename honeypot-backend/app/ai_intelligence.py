@@ -110,7 +110,6 @@ class AIThreatIntelligence:
             
             # Prepare simplified data for the AI
             attack_types = {}
-            source_ips = {}
             timestamps = []
             
             for attack in attack_sample:
@@ -118,17 +117,20 @@ class AIThreatIntelligence:
                 attack_type = attack.attack_type
                 attack_types[attack_type] = attack_types.get(attack_type, 0) + 1
                 
-                source_ip = attack.source_ip
-                source_ips[source_ip] = source_ips.get(source_ip, 0) + 1
-                
                 timestamps.append(attack.timestamp.isoformat())
             
+            # Attacker and credential summaries over the whole window come
+            # from the ingest-time sketches rather than the small sample
+            top = self.db_service.get_top_attackers(days=days, honeypot_id=honeypot_id, k=10)
+            
             # Simplified data structure
             analysis_data = {
                 "total_attacks": len(attacks),
                 "sample_size": len(attack_sample),
                 "attack_type_distribution": attack_types,
-                "source_ip_frequency": dict(list(source_ips.items())[:10]),  # Top 10 sources
+                "source_ip_frequency": {t["value"]: t["count"] for t in top["top_source_ips"]},  # Top 10 sources
+                "unique_source_ips": top["unique_source_ips"],
+                "top_credentials": {t["value"]: t["count"] for t in top["top_credentials"][:5]},
                 "time_range": {
                     "oldest": min(timestamps) if timestamps else None,
                     "newest": max(timestamps) if timestamps else None
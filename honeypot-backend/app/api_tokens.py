@@ -0,0 +1,29 @@
+# app/api_tokens.py
+import os
+import hmac
+from typing import Optional
+
+from fastapi import Header, HTTPException, status
+
+
+def require_token(env_var: str):
+    """Dependency that admits requests bearing the shared secret set in ``env_var``
+
+    Clients send ``Authorization: Bearer <token>``. While the variable is
+    unset the routes are disabled, so nothing is open by default.
+    """
+    def check_token(authorization: Optional[str] = Header(None)):
+        expected = os.getenv(env_var)
+        if not expected:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Disabled until {env_var} is set"
+            )
+        scheme, _, token = (authorization or "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), expected.encode()):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or missing token",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+    return check_token
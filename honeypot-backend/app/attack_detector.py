@@ -1,387 +1,312 @@
 # app/attack_detector.py
 import os
-import re
-import json
 import time
+import fnmatch
 import logging
-from datetime import datetime
+from collections import deque
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Callable
 import threading
 from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler, FileModifiedEvent
+from watchdog.events import FileSystemEventHandler
+
+from .log_parsers import get_parser
+from .file_tailer import FileTailer, TailOffsetStore
 
 logger = logging.getLogger(__name__)
 
-class AttackEvent:
-    def __init__(self, honeypot_id, source_ip, attack_type, details):
-        self.honeypot_id = honeypot_id
-        self.source_ip = source_ip
-        self.attack_type = attack_type
-        self.timestamp = datetime.now()
-        self.details = details
-        
-    def to_dict(self):
-        return {
-            "honeypot_id": self.honeypot_id,
-            "source_ip": self.source_ip,
-            "attack_type": self.attack_type,
-            "timestamp": self.timestamp.isoformat(),
-            "details": self.details
-        }
+# Chunks of one file a worker reads before yielding to other honeypots
+CHUNKS_PER_TURN = 16
 
-class LogWatcher(FileSystemEventHandler):
-    def __init__(self, log_path: str, honeypot_id: str, honeypot_type: str, callback: Callable):
+class LogWatcher:
+    def __init__(self, log_path: str, honeypot_id: str, honeypot_type: str, callback: Callable,
+                 offsets: Optional[TailOffsetStore] = None):
         self.log_path = log_path
         self.honeypot_id = honeypot_id
         self.honeypot_type = honeypot_type.lower()
         self.callback = callback
-        self.file_positions: Dict[str, int] = {}
-        
-        # Initialize detector based on honeypot type
-        if self.honeypot_type == "ssh":
-            self.detector = SSHAttackDetector(self.honeypot_id)
-        elif self.honeypot_type == "ftp":
-            self.detector = FTPAttackDetector(self.honeypot_id)
-        elif self.honeypot_type == "web":
-            self.detector = WebAttackDetector(self.honeypot_id)
-        else:
-            self.detector = GenericAttackDetector(self.honeypot_id)
-    
-    def on_modified(self, event):
-        if not isinstance(event, FileModifiedEvent):
-            return
-            
-        if not os.path.isfile(event.src_path):
-            return
-            
-        # Process the modified file
-        self._process_file(event.src_path)
-    
-    def _process_file(self, file_path):
+        self.offsets = offsets or TailOffsetStore()
+        self.tailers: Dict[str, FileTailer] = {}
+        self.parser = get_parser(self.honeypot_type)
+        self.stats = {"events": 0, "files_processed": 0, "lines": 0, "attacks": 0, "errors": 0, "busy_seconds": 0.0}
+
+    def process_file(self, file_path, max_chunks: Optional[int] = None) -> bool:
+        """Parse new lines of a file; returns True if unread data remains"""
+        started = time.monotonic()
         try:
-            # Get the last position we read from or start at 0
-            position = self.file_positions.get(file_path, 0)
-            
-            with open(file_path, 'r') as f:
-                # Seek to the last position
-                f.seek(position)
-                
-                # Read new lines
-                new_lines = f.readlines()
-                
-                # Update position
-                self.file_positions[file_path] = f.tell()
-                
-                # Process each new line
-                for line in new_lines:
-                    attack = self.detector.process_line(line)
-                    if attack:
-                        # Call the callback with the attack event
-                        self.callback(attack)
+            tailer = self.tailers.get(file_path)
+            if tailer is None:
+                tailer = self.tailers[file_path] = FileTailer(file_path, self.offsets)
+
+            # Parse new complete lines chunk by chunk, resuming from the saved offset
+            for lines in tailer.read_lines(max_chunks):
+                attacks = self.parser.parse_lines(lines, self.honeypot_id)
+                self.stats["lines"] += len(lines)
+                if attacks:
+                    if self.callback(attacks) < len(attacks):
+                        # Leave the offset before this chunk so it is read again
+                        logger.warning(f"Stopped reading {file_path}: attacks were not queued")
+                        return False
+                    self.stats["attacks"] += len(attacks)
+            return tailer.has_more
         except Exception as e:
+            self.stats["errors"] += 1
             logger.error(f"Error processing log file {file_path}: {e}")
-    
-    def scan_existing_logs(self):
-        """Scan existing log files on startup"""
+            return False
+        finally:
+            self.stats["files_processed"] += 1
+            self.stats["busy_seconds"] += time.monotonic() - started
+
+    def wants(self, file_path) -> bool:
+        """Whether a file is one of the logs this honeypot type's parser reads"""
+        name = os.path.basename(file_path)
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.parser.log_files)
+
+    def existing_logs(self) -> List[str]:
+        """Log files already present in the honeypot's log directory"""
         log_dir = Path(self.log_path)
-        if log_dir.exists() and log_dir.is_dir():
-            for file_path in log_dir.glob('**/*.log'):
-                if file_path.is_file():
-                    self._process_file(str(file_path))
-            for file_path in log_dir.glob('**/*.json'):
-                if file_path.is_file():
-                    self._process_file(str(file_path))
-
-class SSHAttackDetector:
-    def __init__(self, honeypot_id):
-        self.honeypot_id = honeypot_id
-        self.patterns = [
-            # Login attempts
-            (r"login attempt \[(.+?)/(.+?)\] failed", "login_attempt"),
-            (r"login attempt \[(.+?)/(.+?)\] succeeded", "login_success"),
-            # JSON log format (Cowrie)
-            (r'"username": "([^"]+)".*"password": "([^"]+)"', "login_attempt"), 
-            # SSH connection
-            (r"New connection: ([0-9.]+):(\d+)", "connection")
-        ]
-    
-    def process_line(self, line):
-        try:
-            # For JSON log files (Cowrie produces these)
-            if line.strip().startswith('{') and line.strip().endswith('}'):
-                try:
-                    data = json.loads(line)
-                    if data.get('eventid') == 'cowrie.login.failed':
-                        return AttackEvent(
-                            self.honeypot_id,
-                            data.get('src_ip', 'unknown'),
-                            'login_attempt',
-                            {
-                                'username': data.get('username', ''),
-                                'password': data.get('password', ''),
-                                'protocol': data.get('protocol', 'ssh')
-                            }
-                        )
-                    elif data.get('eventid') == 'cowrie.session.connect':
-                        return AttackEvent(
-                            self.honeypot_id,
-                            data.get('src_ip', 'unknown'),
-                            'connection',
-                            {'protocol': data.get('protocol', 'ssh')}
-                        )
-                except json.JSONDecodeError:
-                    pass
-            
-            # Regular expressions for text log files
-            for pattern, attack_type in self.patterns:
-                match = re.search(pattern, line)
-                if match:
-                    if attack_type == "login_attempt" and len(match.groups()) >= 2:
-                        username, password = match.groups()[:2]
-                        return AttackEvent(
-                            self.honeypot_id,
-                            self._extract_ip(line),
-                            attack_type,
-                            {'username': username, 'password': password}
-                        )
-                    else:
-                        return AttackEvent(
-                            self.honeypot_id,
-                            self._extract_ip(line),
-                            attack_type,
-                            {'raw_log': line.strip()}
-                        )
-        except Exception as e:
-            logger.error(f"Error processing line for SSH honeypot: {e}")
-        
-        return None
-    
-    def _extract_ip(self, line):
-        # Try to extract IP address from the line
-        ip_match = re.search(r'(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})', line)
-        return ip_match.group(1) if ip_match else "unknown"
-
-class FTPAttackDetector:
-    def __init__(self, honeypot_id):
-        self.honeypot_id = honeypot_id
-        self.patterns = [
-            (r"Authentication failed for user \"([^\"]+)\"", "login_attempt"),
-            (r"Client \"([0-9.]+)\".*logged in", "login_success"),
-            (r"Connection from ([0-9.]+)", "connection")
-        ]
-    
-    def process_line(self, line):
-        try:
-            for pattern, attack_type in self.patterns:
-                match = re.search(pattern, line)
-                if match:
-                    if attack_type == "login_attempt":
-                        username = match.group(1)
-                        return AttackEvent(
-                            self.honeypot_id,
-                            self._extract_ip(line),
-                            attack_type,
-                            {'username': username, 'protocol': 'ftp'}
-                        )
-                    else:
-                        return AttackEvent(
-                            self.honeypot_id,
-                            self._extract_ip(line),
-                            attack_type,
-                            {'raw_log': line.strip(), 'protocol': 'ftp'}
-                        )
-        except Exception as e:
-            logger.error(f"Error processing line for FTP honeypot: {e}")
-        
-        return None
-    
-    def _extract_ip(self, line):
-        # Try to extract IP address from the line
-        ip_match = re.search(r'(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})', line)
-        return ip_match.group(1) if ip_match else "unknown"
-
-class WebAttackDetector:
-    def __init__(self, honeypot_id):
-        self.honeypot_id = honeypot_id
-        self.patterns = [
-            (r"\"(?:GET|POST|PUT|DELETE) ([^ ]*) HTTP", "http_request"),
-            (r"SQL injection attempt: ([^\"]+)", "sql_injection"),
-            (r"XSS attempt: ([^\"]+)", "xss_attempt")
-        ]
-    
-    def process_line(self, line):
-        try:
-            for pattern, attack_type in self.patterns:
-                match = re.search(pattern, line)
-                if match:
-                    url_path = match.group(1)
-                    return AttackEvent(
-                        self.honeypot_id,
-                        self._extract_ip(line),
-                        attack_type,
-                        {'path': url_path, 'raw_log': line.strip(), 'protocol': 'http'}
-                    )
-                    
-            # Check for common web attack patterns in URLs
-            if "SELECT" in line.upper() and "FROM" in line.upper():
-                return AttackEvent(
-                    self.honeypot_id,
-                    self._extract_ip(line),
-                    "sql_injection",
-                    {'raw_log': line.strip(), 'protocol': 'http'}
-                )
-            
-            if "<script>" in line.lower():
-                return AttackEvent(
-                    self.honeypot_id,
-                    self._extract_ip(line),
-                    "xss_attempt",
-                    {'raw_log': line.strip(), 'protocol': 'http'}
-                )
-                
-        except Exception as e:
-            logger.error(f"Error processing line for Web honeypot: {e}")
-        
-        return None
-    
-    def _extract_ip(self, line):
-        # Try to extract IP address from the line
-        ip_match = re.search(r'(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})', line)
-        return ip_match.group(1) if ip_match else "unknown"
-
-class GenericAttackDetector:
-    def __init__(self, honeypot_id):
-        self.honeypot_id = honeypot_id
-    
-    def process_line(self, line):
-        try:
-            # Just capture any connection or activity as an "activity" event
-            if re.search(r'(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})', line):
-                return AttackEvent(
-                    self.honeypot_id,
-                    self._extract_ip(line),
-                    "activity",
-                    {'raw_log': line.strip()}
-                )
-        except Exception as e:
-            logger.error(f"Error processing line for Generic honeypot: {e}")
-        
-        return None
-    
-    def _extract_ip(self, line):
-        # Try to extract IP address from the line
-        ip_match = re.search(r'(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})', line)
-        return ip_match.group(1) if ip_match else "unknown"
+        if not log_dir.is_dir():
+            return []
+        return [str(p) for p in log_dir.glob('**/*') if p.is_file() and not p.is_symlink() and self.wants(p)]
+
+class _EventRouter(FileSystemEventHandler):
+    """Forwards file events from a shared watch to the detector"""
+
+    def __init__(self, detector: "AttackDetector"):
+        self.detector = detector
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.detector.dispatch(event.src_path)
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.detector.dispatch(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.detector.dispatch(event.dest_path)
 
 class AttackDetector:
-    def __init__(self, attack_callback=None):
-        self.observers = {}
+    """Tails honeypot log directories and feeds parsed attacks to a callback.
+
+    One watchdog observer holds a single watch per distinct parent of the
+    honeypot log directories (normally just data/honeypot_logs), and file
+    events are routed to honeypots by path. A fixed pool of workers takes
+    honeypots round-robin, reading at most CHUNKS_PER_TURN chunks per turn,
+    and never works on one honeypot from two threads at once. The thread
+    count stays constant as honeypots are added.
+    """
+
+    def __init__(self, attack_callback=None, offsets_file: str = "./data/log_offsets.json",
+                 workers: Optional[int] = None):
+        self.watchers: Dict[str, LogWatcher] = {}
         self.honeypots = {}
         self.attack_callback = attack_callback
+        self.offsets = TailOffsetStore(offsets_file)
+        self.num_workers = workers or int(os.getenv("HONEYPOT_DETECTOR_WORKERS", "4"))
+        self._observer = None
+        self._watches: Dict[str, Any] = {}  # watched directory -> watchdog watch
+        self._dirs: Dict[str, str] = {}  # honeypot log directory -> honeypot id
+        self._router = _EventRouter(self)
+
+        # Fair scheduling state, guarded by _cond
+        self._cond = threading.Condition()
+        self._pending: Dict[str, Dict[str, None]] = {}  # honeypot -> files to read, in order
+        self._ready = deque()  # honeypots waiting for a worker
+        self._scheduled = set()  # honeypots that are ready or being processed
+        self._workers: List[threading.Thread] = []
         self._running = False
-        self._thread = None
-    
-    def handle_attack(self, attack):
-        """Handle detected attacks"""
-        if attack and self.attack_callback:
-            try:
-                self.attack_callback(attack)
-            except Exception as e:
-                logger.error(f"Error in attack callback: {e}")
+
+    def handle_attacks(self, attacks) -> int:
+        """Handle a batch of detected attacks, returning how many were accepted"""
+        if not attacks or not self.attack_callback:
+            return len(attacks)
+        try:
+            accepted = self.attack_callback(attacks)
+        except Exception as e:
+            logger.error(f"Error in attack callback: {e}")
+            return 0
+        # Callbacks that don't report a count take everything
+        return len(attacks) if accepted is None else accepted
+
+    def is_watching(self, honeypot_id) -> bool:
+        return self._running and honeypot_id in self.watchers
 
     def add_honeypot(self, honeypot_id, honeypot_type, log_path):
         """Add a honeypot to monitor"""
         try:
-            if honeypot_id in self.observers:
+            if honeypot_id in self.watchers:
                 # Already monitoring this honeypot
                 return
-                
+
             # Ensure log directory exists
+            log_path = os.path.abspath(log_path)
             os.makedirs(log_path, exist_ok=True)
-            
+
             logger.info(f"Setting up attack detection for honeypot {honeypot_id} ({honeypot_type})")
-            
-            # Create and configure log watcher
-            event_handler = LogWatcher(log_path, honeypot_id, honeypot_type, self.handle_attack)
-            
-            # Scan existing logs
-            event_handler.scan_existing_logs()
-            
-            # Set up watchdog observer
-            observer = Observer()
-            observer.schedule(event_handler, log_path, recursive=True)
-            
-            # Store references
-            self.observers[honeypot_id] = observer
-            self.honeypots[honeypot_id] = {
-                "type": honeypot_type,
-                "log_path": log_path
-            }
-            
-            # Start observer if detector is running
+
+            watcher = LogWatcher(log_path, honeypot_id, honeypot_type, self.handle_attacks, self.offsets)
+            with self._cond:
+                self.watchers[honeypot_id] = watcher
+                self._dirs[log_path] = honeypot_id
+                self.honeypots[honeypot_id] = {
+                    "type": honeypot_type,
+                    "log_path": log_path
+                }
+
             if self._running:
-                observer.start()
-                
+                self._watch(os.path.dirname(log_path))
+
+            # Pick up whatever was written while we weren't watching
+            for file_path in watcher.existing_logs():
+                self._enqueue(honeypot_id, file_path)
+
             logger.info(f"Attack detector configured for honeypot {honeypot_id}")
-            
+
         except Exception as e:
             logger.error(f"Failed to add honeypot to attack detector: {e}")
-    
+
     def remove_honeypot(self, honeypot_id):
         """Remove a honeypot from monitoring"""
         try:
-            if honeypot_id in self.observers:
-                observer = self.observers[honeypot_id]
-                observer.stop()
-                observer.join()
-                del self.observers[honeypot_id]
-                del self.honeypots[honeypot_id]
-                logger.info(f"Stopped monitoring honeypot {honeypot_id}")
+            with self._cond:
+                if honeypot_id not in self.watchers:
+                    return
+                del self.watchers[honeypot_id]
+                log_path = self.honeypots.pop(honeypot_id)["log_path"]
+                self._dirs.pop(log_path, None)
+                self._pending.pop(honeypot_id, None)
+
+            # Drop the shared watch once no honeypot uses it
+            parent = os.path.dirname(log_path)
+            if not any(os.path.dirname(d) == parent for d in self._dirs):
+                self._unwatch(parent)
+            logger.info(f"Stopped monitoring honeypot {honeypot_id}")
         except Exception as e:
             logger.error(f"Error removing honeypot from monitoring: {e}")
-    
+
+    def _watch(self, directory):
+        if directory in self._watches or self._observer is None:
+            return
+        self._watches[directory] = self._observer.schedule(self._router, directory, recursive=True)
+
+    def _unwatch(self, directory):
+        watch = self._watches.pop(directory, None)
+        if watch is not None and self._observer is not None:
+            self._observer.unschedule(watch)
+
+    def dispatch(self, file_path):
+        """Route a file event to the honeypot whose log directory contains it"""
+        directory = os.path.dirname(file_path)
+        honeypot_id = None
+        while directory and honeypot_id is None:
+            honeypot_id = self._dirs.get(directory)
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                break
+            directory = parent
+
+        watcher = self.watchers.get(honeypot_id) if honeypot_id else None
+        if watcher is None or not watcher.wants(file_path):
+            return
+        watcher.stats["events"] += 1
+        self._enqueue(honeypot_id, file_path)
+
+    def _enqueue(self, honeypot_id, file_path):
+        with self._cond:
+            # Repeated events for a file that hasn't been read yet collapse into one
+            self._pending.setdefault(honeypot_id, {})[file_path] = None
+            if honeypot_id not in self._scheduled:
+                self._scheduled.add(honeypot_id)
+                self._ready.append(honeypot_id)
+                self._cond.notify()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while self._running and not self._ready:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                honeypot_id = self._ready.popleft()
+                files = self._pending.get(honeypot_id)
+                watcher = self.watchers.get(honeypot_id)
+                file_path = next(iter(files)) if files else None
+                if file_path is not None:
+                    del files[file_path]
+
+            more = False
+            if watcher is not None and file_path is not None:
+                more = watcher.process_file(file_path, CHUNKS_PER_TURN)
+
+            with self._cond:
+                files = self._pending.get(honeypot_id)
+                if more and files is not None:
+                    files[file_path] = None
+                if files:
+                    # Back of the line, so busy honeypots can't starve quiet ones
+                    self._ready.append(honeypot_id)
+                    self._cond.notify()
+                else:
+                    self._pending.pop(honeypot_id, None)
+                    self._scheduled.discard(honeypot_id)
+
+            self.offsets.maybe_flush()
+
     def start(self):
-        """Start all observers"""
+        """Start the observer and worker pool"""
         if self._running:
             return
-            
+
         self._running = True
-        
-        def run():
-            for honeypot_id, observer in self.observers.items():
-                try:
-                    observer.start()
-                except Exception as e:
-                    logger.error(f"Failed to start observer for honeypot {honeypot_id}: {e}")
-            
-            # Keep the thread alive
-            while self._running:
-                time.sleep(1)
-                
-            # Stop all observers when thread stops
-            for observer in list(self.observers.values()):
-                observer.stop()
-            
-            for observer in list(self.observers.values()):
-                observer.join()
-        
-        # Start in a separate thread
-        self._thread = threading.Thread(target=run)
-        self._thread.daemon = True
-        self._thread.start()
-        
-        logger.info("Attack detector started")
-    
+        self._observer = Observer()
+        for log_path in list(self._dirs):
+            self._watch(os.path.dirname(log_path))
+        self._observer.start()
+
+        self._workers = [
+            threading.Thread(target=self._work, name=f"attack-detector-{i}", daemon=True)
+            for i in range(self.num_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+        logger.info(f"Attack detector started with {self.num_workers} workers")
+
     def stop(self):
-        """Stop all observers"""
+        """Stop the observer and workers"""
         if not self._running:
             return
-            
-        self._running = False
-        
-        if self._thread:
-            self._thread.join(timeout=5.0)
-            self._thread = None
-            
-        logger.info("Attack detector stopped")
\ No newline at end of file
+
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+        self._observer.stop()
+        self._observer.join(timeout=5.0)
+        self._observer = None
+        self._watches.clear()
+
+        for worker in self._workers:
+            worker.join(timeout=5.0)
+        self._workers = []
+
+        self.offsets.flush()
+
+        logger.info("Attack detector stopped")
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            pending = {h: len(files) for h, files in self._pending.items()}
+            ready = len(self._ready)
+        return {
+            "running": self._running,
+            "workers": self.num_workers,
+            "watched_directories": len(self._watches),
+            "honeypots_ready": ready,
+            "honeypots": {
+                honeypot_id: {**watcher.stats, "pending_files": pending.get(honeypot_id, 0)}
+                for honeypot_id, watcher in list(self.watchers.items())
+            },
+        }
@@ -0,0 +1,75 @@
+# app/attack_sync.py
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Set
+
+from .models import Honeypot
+
+logger = logging.getLogger(__name__)
+
+
+class AttackSync:
+    """Polls honeypot container logs for new attacks, many honeypots at once
+
+    Docker log reads block, so they run on a pool of ``concurrency``
+    threads. Each honeypot's read is awaited for up to ``timeout``
+    seconds; a read that takes longer keeps running and its attacks are
+    queued when it finishes, and the honeypot is skipped by later rounds
+    until then.
+    """
+
+    def __init__(self, docker_service, pipeline, concurrency: int = 8, timeout: float = 20.0):
+        self.docker_service = docker_service
+        self.pipeline = pipeline
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="attack-sync")
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.in_flight: Set[str] = set()
+
+    async def sync(self, honeypots: List[Honeypot]):
+        """Sync the given honeypots concurrently"""
+        await asyncio.gather(*(self._sync_one(h) for h in honeypots if h.id not in self.in_flight))
+
+    def _read(self, honeypot: Honeypot):
+        return self.docker_service.get_attacks_from_container(
+            honeypot.container_id,
+            honeypot.id,
+            honeypot.type
+        )
+
+    async def _ingest(self, honeypot: Honeypot, attacks_data, log_cursor) -> int:
+        # The log checkpoint only moves once the attacks are on the queue
+        queued = await self.pipeline.submit_many(attacks_data)
+        await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.docker_service.commit_log_cursor, honeypot.container_id, log_cursor
+        )
+        return queued
+
+    def _queue_late(self, honeypot: Honeypot, future):
+        if not future.cancelled() and future.exception() is None:
+            asyncio.ensure_future(self._ingest(honeypot, *future.result()))
+
+    async def _sync_one(self, honeypot: Honeypot):
+        async with self._semaphore:
+            future = asyncio.get_running_loop().run_in_executor(self.executor, self._read, honeypot)
+            self.in_flight.add(honeypot.id)
+            future.add_done_callback(lambda f: self.in_flight.discard(honeypot.id))
+
+            try:
+                attacks_data, log_cursor = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            except asyncio.TimeoutError:
+                # The worker can't be interrupted; its attacks are queued when it finishes
+                logger.warning(f"Sync for honeypot {honeypot.id} timed out after {self.timeout}s")
+                future.add_done_callback(lambda f: self._queue_late(honeypot, f))
+                return
+            except Exception as e:
+                logger.error(f"Error syncing attacks for honeypot {honeypot.id}: {e}")
+                return
+
+        # Hand the attacks to the ingestion pipeline, waiting if it is full
+        queued = await self._ingest(honeypot, attacks_data, log_cursor)
+        if queued:
+            logger.info(f"Queued {queued} attacks from honeypot {honeypot.id}")
+        else:
+            logger.debug(f"No new log attacks for honeypot {honeypot.id}")
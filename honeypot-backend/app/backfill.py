@@ -0,0 +1,384 @@
+# app/backfill.py
+import os
+import json
+import time
+import uuid
+import fnmatch
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+from .log_parsers import get_parser
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_BYTES = 32 * 1024 * 1024
+
+# Minimum seconds between progress snapshots written for other workers
+PROGRESS_SAVE_INTERVAL = 1.0
+
+
+def split_ranges(path: str, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> List[Tuple[int, int]]:
+    """Split a file into byte ranges that start and end on line boundaries"""
+    size = os.path.getsize(path)
+    ranges = []
+    start = 0
+    with open(path, "rb") as f:
+        while start < size:
+            end = start + chunk_bytes
+            if end >= size:
+                end = size
+            else:
+                # Extend the range to the end of the line it cuts through
+                f.seek(end)
+                f.readline()
+                end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def parse_range(path: str, start: int, end: int, honeypot_id: str, honeypot_type: str,
+                docker_timestamps: bool = False) -> Tuple[List[Dict[str, Any]], int]:
+    """Parse one byte range of a log file (runs in a worker process)"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    if docker_timestamps:
+        # Container log dumps prefix every line with its RFC3339 timestamp
+        lines = [line.partition(" ")[2] for line in lines]
+    return get_parser(honeypot_type).parse_lines(lines, honeypot_id), len(lines)
+
+
+def find_log_files(log_dir: str, honeypot_type: str) -> List[str]:
+    """Log files for a honeypot type in a directory, including rotated copies"""
+    patterns = get_parser(honeypot_type).log_files
+    found = []
+    for root, _, names in os.walk(log_dir):
+        for name in names:
+            if any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(name, f"{p}.*") for p in patterns):
+                found.append(os.path.join(root, name))
+    return sorted(found)
+
+
+def resolve_under(path: str, root: str) -> str:
+    """Resolve a path, following symlinks, and make sure it stays inside root"""
+    real_root = os.path.realpath(root)
+    real_path = os.path.realpath(path)
+    if os.path.commonpath([real_root, real_path]) != real_root:
+        raise ValueError(f"{path} is outside the honeypot's log directory")
+    return real_path
+
+
+def dump_container_logs(docker_service, container_id: str, dump_dir: str) -> str:
+    """Write a container's full log output, with timestamps, to a file
+
+    The dump is deleted when the backfill job using it finishes.
+    """
+    os.makedirs(dump_dir, exist_ok=True)
+    dump_path = os.path.join(dump_dir, f"{container_id[:12]}-{int(time.time())}.log")
+    container = docker_service.client.containers.get(container_id)
+    try:
+        with open(dump_path, "wb") as f:
+            for chunk in container.logs(stream=True, follow=False, timestamps=True):
+                f.write(chunk)
+    except Exception:
+        remove_dumps([(dump_path, True)])
+        raise
+    return dump_path
+
+
+def remove_dumps(files: List[Tuple[str, bool]]):
+    """Delete the container log dumps among a job's files"""
+    for path, docker_timestamps in files:
+        if docker_timestamps:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Failed to remove container log dump {path}: {e}")
+
+
+class BackfillJob:
+    """Progress of one backfill run"""
+
+    def __init__(self, honeypot_id: str, honeypot_type: str, files: List[Tuple[str, bool]]):
+        self.id = str(uuid.uuid4())
+        self.honeypot_id = honeypot_id
+        self.honeypot_type = honeypot_type
+        self.files = files  # (path, has docker timestamps)
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.total_bytes = sum(os.path.getsize(path) for path, _ in files)
+        self.processed_bytes = 0
+        self.chunks_total = 0
+        self.chunks_done = 0
+        self.lines = 0
+        self.parsed = 0
+        self.saved = 0
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._started = None
+        self._elapsed = 0.0
+        self._saved_at = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        if self._started is not None and self.status == "running":
+            return time.monotonic() - self._started
+        return self._elapsed
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = self.elapsed
+        return {
+            "id": self.id,
+            "honeypot_id": self.honeypot_id,
+            "status": self.status,
+            "error": self.error,
+            "files": [path for path, _ in self.files],
+            "total_bytes": self.total_bytes,
+            "processed_bytes": self.processed_bytes,
+            "progress": round(self.processed_bytes / self.total_bytes, 4) if self.total_bytes else 1.0,
+            "chunks": f"{self.chunks_done}/{self.chunks_total}",
+            "lines": self.lines,
+            "parsed_attacks": self.parsed,
+            "new_attacks": self.saved,
+            "duplicates": self.parsed - self.saved,
+            "elapsed_seconds": round(elapsed, 2),
+            "mb_per_second": round(self.processed_bytes / 1e6 / elapsed, 2) if elapsed else 0.0,
+            "lines_per_second": int(self.lines / elapsed) if elapsed else 0,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def save(self, jobs_dir: Optional[str], force: bool = False):
+        """Write a progress snapshot so any worker process can report it"""
+        now = time.monotonic()
+        if jobs_dir is None or (not force and now - self._saved_at < PROGRESS_SAVE_INTERVAL):
+            return
+        self._saved_at = now
+        path = os.path.join(jobs_dir, f"{self.id}.json")
+        try:
+            with open(f"{path}.tmp", "w") as f:
+                json.dump(self.to_dict(), f)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            logger.warning(f"Failed to save progress of backfill {self.id}: {e}")
+
+
+def run_backfill(job: BackfillJob, db_service, workers: Optional[int] = None,
+                 chunk_bytes: int = DEFAULT_CHUNK_BYTES, jobs_dir: Optional[str] = None,
+                 publish: Optional[Callable[[List], None]] = None):
+    """Parse a job's files in a process pool and bulk-save the attacks found
+
+    ``publish`` gets each batch of new attacks, so live clients and the
+    caches of other worker processes see them.
+    """
+    from .ingest import save_attack_data
+
+    workers = workers or os.cpu_count() or 2
+    job.status = "running"
+    job.started_at = datetime.now()
+    job._started = time.monotonic()
+
+    tasks = [
+        (path, start, end, docker_timestamps)
+        for path, docker_timestamps in job.files
+        for start, end in split_ranges(path, chunk_bytes)
+    ]
+    job.chunks_total = len(tasks)
+    job.save(jobs_dir, force=True)
+
+    try:
+        # Spawned workers don't inherit the server's threads or open connections
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            in_flight = {}
+            queued = iter(tasks)
+
+            def submit_next():
+                task = next(queued, None)
+                if task is not None:
+                    path, start, end, docker_timestamps = task
+                    future = executor.submit(
+                        parse_range, path, start, end, job.honeypot_id, job.honeypot_type, docker_timestamps
+                    )
+                    in_flight[future] = end - start
+
+            # Keep a bounded number of chunks in flight so parsed results don't pile up
+            for _ in range(workers * 2):
+                submit_next()
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    size = in_flight.pop(future)
+                    attacks, line_count = future.result()
+                    new_attacks = save_attack_data(attacks, db_service)
+                    if new_attacks and publish is not None:
+                        publish(new_attacks)
+                    job.saved += len(new_attacks)
+                    job.parsed += len(attacks)
+                    job.lines += line_count
+                    job.processed_bytes += size
+                    job.chunks_done += 1
+                    job.save(jobs_dir)
+                    submit_next()
+
+        job.status = "completed"
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+        logger.error(f"Backfill {job.id} for honeypot {job.honeypot_id} failed: {e}")
+    finally:
+        job._elapsed = time.monotonic() - job._started
+        job.finished_at = datetime.now()
+        job.save(jobs_dir, force=True)
+        # Container log dumps are a full copy of the logs, only needed for this run
+        remove_dumps(job.files)
+
+    logger.info(
+        f"Backfill {job.id} {job.status}: {job.saved} new of {job.parsed} attacks "
+        f"from {job.lines} lines in {job._elapsed:.1f}s"
+    )
+    return job
+
+
+class BackfillManager:
+    """Runs backfill jobs in background threads and keeps their progress
+
+    Progress is also written to ``<dump_dir>/jobs`` so that every API
+    worker process can report on jobs started by another one.
+    """
+
+    def __init__(self, db_service, docker_service=None, dump_dir: str = "./data/backfill"):
+        self.db_service = db_service
+        self.docker_service = docker_service
+        self.dump_dir = dump_dir
+        self.jobs_dir = os.path.join(dump_dir, "jobs")
+        self.jobs: Dict[str, BackfillJob] = {}
+
+    def create_job(self, honeypot, paths: Optional[List[str]] = None, log_dir: Optional[str] = None,
+                   container: bool = False, root: Optional[str] = None) -> BackfillJob:
+        """Collect the files to backfill for a honeypot
+
+        With ``root``, every file must resolve to a location inside it.
+        """
+        files = [(path, False) for path in paths or []]
+        if log_dir:
+            if root is not None:
+                log_dir = resolve_under(log_dir, root)
+            files.extend((path, False) for path in find_log_files(log_dir, honeypot.type))
+        if root is not None:
+            # Checked after listing too, as log directories may contain symlinks
+            files = [(resolve_under(path, root), docker_timestamps) for path, docker_timestamps in files]
+        if container:
+            if not honeypot.container_id or self.docker_service is None:
+                raise ValueError("Honeypot has no container to read logs from")
+            files.append((dump_container_logs(self.docker_service, honeypot.container_id, self.dump_dir), True))
+
+        missing = [path for path, _ in files if not os.path.isfile(path)]
+        if missing:
+            remove_dumps(files)
+            raise ValueError(f"Log files not found: {', '.join(missing)}")
+        if not files:
+            raise ValueError("No log files to backfill")
+
+        job = BackfillJob(honeypot.id, honeypot.type, files)
+        self.jobs[job.id] = job
+        return job
+
+    def start(self, job: BackfillJob, workers: Optional[int] = None,
+              chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+              publish: Optional[Callable[[List], None]] = None) -> BackfillJob:
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        thread = threading.Thread(
+            target=run_backfill, args=(job, self.db_service, workers, chunk_bytes, self.jobs_dir, publish),
+            name=f"backfill-{job.id[:8]}", daemon=True
+        )
+        thread.start()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Progress of a job started by any worker process"""
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        try:
+            with open(os.path.join(self.jobs_dir, f"{os.path.basename(job_id)}.json")) as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        try:
+            names = os.listdir(self.jobs_dir)
+        except FileNotFoundError:
+            names = []
+        job_ids = set(self.jobs) | {name[:-5] for name in names if name.endswith(".json")}
+        return [job for job in map(self.get_job, sorted(job_ids)) if job is not None]
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backfill attacks from historical honeypot logs")
+    parser.add_argument("honeypot_id", help="Honeypot the logs belong to")
+    parser.add_argument("paths", nargs="*", help="Log files to parse")
+    parser.add_argument("--log-dir", help="Parse every log file of the honeypot's type in this directory")
+    parser.add_argument("--container", action="store_true", help="Dump and parse the honeypot container's logs")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--chunk-mb", type=int, default=DEFAULT_CHUNK_BYTES // (1024 * 1024), help="Chunk size in MB")
+    parser.add_argument("--data-dir", default="./data", help="Data directory")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    from .database import DatabaseService
+    from .storage import close_all_storage
+    from .event_bus import EventBusClient
+
+    db_service = DatabaseService(args.data_dir)
+    honeypot = db_service.get_honeypot(args.honeypot_id)
+    if not honeypot:
+        parser.error(f"Honeypot {args.honeypot_id} not found")
+
+    docker_service = None
+    if args.container:
+        from .docker_service import DockerService
+        docker_service = DockerService()
+
+    manager = BackfillManager(db_service, docker_service, os.path.join(args.data_dir, "backfill"))
+    try:
+        job = manager.create_job(honeypot, args.paths, args.log_dir, args.container)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Let a running server show the new attacks and keep its caches current
+    bus = EventBusClient()
+    print(f"Backfilling {len(job.files)} file(s), {job.total_bytes / 1e6:.1f} MB, for honeypot {honeypot.id}")
+    manager.start(job, args.workers, args.chunk_mb * 1024 * 1024, bus.publish)
+    while job.status in ("pending", "running"):
+        time.sleep(1)
+        progress = job.to_dict()
+        print(f"  {progress['progress'] * 100:5.1f}%  chunks {progress['chunks']}  "
+              f"{progress['mb_per_second']} MB/s  {progress['lines_per_second']:,} lines/s  "
+              f"{progress['new_attacks']:,} new attacks", flush=True)
+
+    result = job.to_dict()
+    print(f"Backfill {result['status']}: {result['new_attacks']:,} new attacks, "
+          f"{result['duplicates']:,} duplicates, {result['lines']:,} lines in {result['elapsed_seconds']}s")
+    if job.error:
+        print(f"Error: {job.error}")
+    bus.close()
+    close_all_storage()
+    return 0 if job.status == "completed" else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
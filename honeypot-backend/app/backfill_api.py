@@ -0,0 +1,79 @@
+# app/backfill_api.py
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
+from typing import Dict, Any, List
+import logging
+import asyncio
+
+from .models import BackfillRequest
+from .backfill import BackfillManager
+from .honeypot import db_service, docker_service, event_bus
+from .api_tokens import require_token
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+# Create router; backfill reads files on the server, so every route needs the admin token
+router = APIRouter(dependencies=[Depends(require_token("HONEYPOT_ADMIN_TOKEN"))])
+
+# Backfill jobs run in background threads and are tracked here
+backfill_manager = BackfillManager(db_service, docker_service)
+
+@router.post("/backfill", status_code=202)
+async def start_backfill(request: BackfillRequest):
+    """
+    Reprocess historical log files and/or a container's full log output
+    for a honeypot. Without explicit sources, the honeypot's mounted log
+    directory is used if it has one, otherwise its container logs.
+    Explicit paths must be inside the honeypot's mounted log directory.
+    """
+    honeypot = db_service.get_honeypot(request.honeypot_id)
+    if not honeypot:
+        raise HTTPException(status_code=404, detail="Honeypot not found")
+    
+    log_mount = None
+    if honeypot.container_id:
+        log_mount = await run_in_threadpool(docker_service.get_log_mount, honeypot.container_id)
+    
+    log_dir = request.log_dir
+    container = request.container
+    if (request.paths or log_dir) and log_mount is None:
+        raise HTTPException(status_code=400, detail="Honeypot has no mounted log directory to read files from")
+    if not request.paths and not log_dir and not container:
+        log_dir = log_mount
+        container = log_mount is None
+    
+    try:
+        # Dumping container logs blocks, so collecting sources runs off the event loop
+        job = await run_in_threadpool(
+            backfill_manager.create_job, honeypot, request.paths, log_dir, container, log_mount
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # New attacks are published from the backfill thread through the event loop
+    loop = asyncio.get_running_loop()
+    
+    def publish(attacks):
+        loop.call_soon_threadsafe(event_bus.publish, attacks)
+    
+    backfill_manager.start(job, request.workers, request.chunk_mb * 1024 * 1024, publish)
+    logger.info(f"Started backfill {job.id} for honeypot {honeypot.id}")
+    return job.to_dict()
+
+@router.get("/backfill")
+async def list_backfills() -> List[Dict[str, Any]]:
+    """
+    Get progress of all backfill jobs
+    """
+    return await run_in_threadpool(backfill_manager.list_jobs)
+
+@router.get("/backfill/{job_id}")
+async def get_backfill(job_id: str):
+    """
+    Get progress and throughput of a backfill job
+    """
+    job = await run_in_threadpool(backfill_manager.get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Backfill job not found")
+    return job
@@ -0,0 +1,463 @@
+# app/broadcaster.py
+import os
+import json
+import uuid
+import asyncio
+import logging
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from ipaddress import ip_address, ip_network
+from typing import Dict, Any, List, Optional, Set, FrozenSet, Tuple, NamedTuple, Union
+
+import msgpack
+from fastapi import WebSocket
+from pydantic import ValidationError
+
+from .models import Attack, AttackSubscription
+
+logger = logging.getLogger(__name__)
+
+# Close code sent to clients evicted for falling behind (1013 = try again later)
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+# msgpack batch frames are {"type": "batch", "attacks": [...]} built around pre-packed attacks
+_MSGPACK_BATCH_PREFIX = (
+    msgpack.Packer().pack_map_header(2) + msgpack.packb("type") + msgpack.packb("batch") + msgpack.packb("attacks")
+)
+
+Payload = Union[str, bytes]
+
+
+@lru_cache(maxsize=65536)
+def _parse_ip(value: str):
+    try:
+        return ip_address(value)
+    except ValueError:
+        return None
+
+
+class AttackFilter(NamedTuple):
+    """Immutable subscription filter; equal filters share one delivery group"""
+
+    honeypot_ids: FrozenSet[str] = frozenset()
+    attack_types: FrozenSet[str] = frozenset()
+    source_networks: Tuple = ()
+
+    @classmethod
+    def from_subscription(cls, subscription: AttackSubscription) -> "AttackFilter":
+        """Build a filter, raising ValueError for an invalid CIDR"""
+        networks = {ip_network(cidr.strip(), strict=False) for cidr in subscription.source_cidrs}
+        return cls(
+            frozenset(subscription.honeypot_ids),
+            frozenset(subscription.attack_types),
+            tuple(sorted(networks, key=str)),
+        )
+
+    def matches(self, attack: Attack) -> bool:
+        if self.honeypot_ids and attack.honeypot_id not in self.honeypot_ids:
+            return False
+        if self.attack_types and attack.attack_type not in self.attack_types:
+            return False
+        if self.source_networks:
+            ip = _parse_ip(attack.source_ip)
+            return ip is not None and any(ip in network for network in self.source_networks)
+        return True
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        return {
+            "honeypot_ids": sorted(self.honeypot_ids),
+            "attack_types": sorted(self.attack_types),
+            "source_cidrs": [str(network) for network in self.source_networks],
+        }
+
+
+MATCH_ALL = AttackFilter()
+
+
+class _GroupKey(NamedTuple):
+    """Clients that receive the same attacks encoded the same way"""
+
+    filter: AttackFilter = MATCH_ALL
+    projection: str = "full"
+    encoding: str = "json"
+
+
+def encode_attack(attack: Attack, seq: int, projection: str = "full", encoding: str = "json") -> Payload:
+    """Serialize one attack, tagged with its sequence number, for a delivery format"""
+    if projection == "full" and encoding == "json":
+        return f'{{"seq":{seq},{attack.json()[1:]}'
+    data = attack.dict()
+    data["seq"] = seq
+    if projection == "slim" and "raw_log" in data["details"]:
+        data["details"] = {k: v for k, v in data["details"].items() if k != "raw_log"}
+    data["timestamp"] = data["timestamp"].isoformat()
+    if encoding == "msgpack":
+        return msgpack.packb(data, default=str)
+    return json.dumps(data, default=str)
+
+
+def batch_frame(payloads: List[Payload], encoding: str = "json") -> Payload:
+    """Join already-encoded attacks into one batch frame without re-serializing them"""
+    if encoding == "msgpack":
+        return _MSGPACK_BATCH_PREFIX + msgpack.Packer().pack_array_header(len(payloads)) + b"".join(payloads)
+    return '{"type":"batch","attacks":[' + ",".join(payloads) + "]}"
+
+
+class _Client:
+    """One WebSocket connection with its own send queue and sender task"""
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        # Items are lists of encoded attacks, or a str control message
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sender: Optional[asyncio.Task] = None
+        self.group = _GroupKey()
+        # Last seq assigned before the client joined its current group
+        self.joined_seq = 0
+        self.batch_interval = 0.0
+        self.batch_max_events = 0
+
+    @property
+    def batching(self) -> bool:
+        return bool(self.batch_interval or self.batch_max_events)
+
+
+class AttackBroadcaster:
+    """Pushes new attacks to WebSocket clients without blocking ingestion.
+
+    ``publish`` only appends the batch to a central queue. A fan-out task
+    encodes the attacks and hands them to every client's bounded queue,
+    and a sender task per client drains its own queue. A client that is
+    ``queue_size`` batches behind, or whose send takes longer than
+    ``send_timeout``, is disconnected so it can't hold up the others.
+
+    Clients start subscribed to everything, one JSON frame per attack, and
+    may send an AttackSubscription to narrow the feed, pick a slim or
+    msgpack encoding, or have attacks coalesced into batch frames. Clients
+    with equal filters and encodings form one group, and groups are
+    indexed by honeypot ID, so an attack is only checked against the
+    groups that could want it and is encoded once per format. Per-message
+    deflate is negotiated by uvicorn when the client offers it.
+
+    Every attack gets a sequence number when it is fanned out and is kept
+    in a ring buffer of the last ``replay_size`` attacks. A reconnecting
+    client subscribes with the ``last_seq`` and ``epoch`` it saw last and
+    gets just the attacks it missed; if they have left the buffer, or the
+    server restarted (new epoch), the reply says ``reset`` and the client
+    should reload instead.
+    """
+
+    def __init__(self, queue_size: Optional[int] = None, send_timeout: Optional[float] = None,
+                 replay_size: Optional[int] = None):
+        self.queue_size = queue_size or int(os.getenv("HONEYPOT_WS_QUEUE_SIZE", "64"))
+        self.send_timeout = send_timeout or float(os.getenv("HONEYPOT_WS_SEND_TIMEOUT", "10"))
+        self.replay_size = replay_size or int(os.getenv("HONEYPOT_WS_REPLAY_SIZE", "10000"))
+        # Sequence numbers restart with the process, so they are scoped to an epoch
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self._replay: deque = deque(maxlen=self.replay_size)  # (seq, attack)
+        self.active_connections: Dict[WebSocket, _Client] = {}
+        # Routing index: group -> subscribers, and honeypot ID (None = any) -> groups
+        self._groups: Dict[_GroupKey, Set[_Client]] = {}
+        self._by_honeypot: Dict[Optional[str], Set[_GroupKey]] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._fanout: Optional[asyncio.Task] = None
+        self._stats = {"published": 0, "delivered": 0, "frames": 0, "bytes": 0, "evicted": 0,
+                       "replayed": 0, "resets": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._fanout is not None and not self._fanout.done()
+
+    def start(self):
+        """Start the fan-out task on the running event loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._fanout = asyncio.create_task(self._fan_out())
+        logger.info(f"Attack broadcaster started (client queue={self.queue_size})")
+
+    async def stop(self):
+        """Stop fan-out and close every client connection"""
+        if self._fanout is not None:
+            self._fanout.cancel()
+            self._fanout = None
+        for client in list(self.active_connections.values()):
+            await self._drop(client, code=1001)
+
+    async def connect(self, websocket: WebSocket):
+        """Accept a WebSocket and start its sender task"""
+        await websocket.accept()
+        client = _Client(websocket, self.queue_size)
+        client.sender = asyncio.create_task(self._send(client))
+        self.active_connections[websocket] = client
+        self._join(client, client.group)
+
+    async def disconnect(self, websocket: WebSocket):
+        client = self.active_connections.get(websocket)
+        if client is not None:
+            await self._drop(client, close=False)
+
+    def handle_message(self, websocket: WebSocket, text: str):
+        """Apply a subscription message from a client and queue the reply"""
+        client = self.active_connections.get(websocket)
+        if client is None:
+            return
+        try:
+            subscription = AttackSubscription.parse_raw(text)
+            if subscription.type != "subscribe":
+                raise ValueError(f"unknown message type {subscription.type!r}")
+            group = _GroupKey(AttackFilter.from_subscription(subscription),
+                              subscription.projection, subscription.encoding)
+        except (ValidationError, ValueError) as e:
+            self._reply(client, {"type": "error", "detail": f"Invalid subscription: {e}"})
+            return
+
+        missed, reset = [], False
+        if subscription.last_seq is not None:
+            missed, reset = self._missed(client, group, subscription.last_seq, subscription.epoch)
+
+        self._leave(client)
+        self._join(client, group)
+        client.batch_interval = subscription.batch_interval_ms / 1000
+        client.batch_max_events = subscription.batch_max_events
+        self._reply(client, {
+            "type": "subscribed",
+            "filter": group.filter.to_dict(),
+            "projection": group.projection,
+            "encoding": group.encoding,
+            "batch_interval_ms": subscription.batch_interval_ms,
+            "batch_max_events": subscription.batch_max_events,
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "replayed": len(missed),
+            "reset": reset,
+        })
+        if missed:
+            try:
+                client.queue.put_nowait([encode_attack(attack, seq, group.projection, group.encoding)
+                                         for seq, attack in missed])
+            except asyncio.QueueFull:
+                self._evict(client)
+                return
+            self._stats["replayed"] += len(missed)
+        if reset:
+            self._stats["resets"] += 1
+
+    def _missed(self, client: _Client, group: _GroupKey, last_seq: int,
+                epoch: Optional[str]) -> Tuple[List[Tuple[int, Attack]], bool]:
+        """Buffered attacks after last_seq the client hasn't been sent, and whether there is a gap"""
+        if epoch != self.epoch or last_seq > self.seq:
+            return [], True
+        oldest = self._replay[0][0] if self._replay else self.seq + 1
+        if last_seq + 1 < oldest:
+            return [], True
+        # Seqs in the buffer are consecutive, so the first missed one is found by offset
+        missed = []
+        for seq, attack in islice(self._replay, last_seq + 1 - oldest, None):
+            # Attacks routed since the client joined its current group are already on their way
+            if seq > client.joined_seq and client.group.filter.matches(attack):
+                continue
+            if group.filter.matches(attack):
+                missed.append((seq, attack))
+        return missed, False
+
+    def _reply(self, client: _Client, message: Dict[str, Any]):
+        # Replies share the client's queue so only its sender task writes to the socket
+        try:
+            client.queue.put_nowait(json.dumps(message))
+        except asyncio.QueueFull:
+            self._evict(client)
+
+    def _join(self, client: _Client, group: _GroupKey):
+        client.group = group
+        client.joined_seq = self.seq
+        members = self._groups.setdefault(group, set())
+        if not members:
+            for honeypot_id in group.filter.honeypot_ids or (None,):
+                self._by_honeypot.setdefault(honeypot_id, set()).add(group)
+        members.add(client)
+
+    def _leave(self, client: _Client):
+        group = client.group
+        members = self._groups.get(group)
+        if members is None or client not in members:
+            return
+        members.discard(client)
+        if not members:
+            del self._groups[group]
+            for honeypot_id in group.filter.honeypot_ids or (None,):
+                groups = self._by_honeypot.get(honeypot_id)
+                if groups is not None:
+                    groups.discard(group)
+                    if not groups:
+                        del self._by_honeypot[honeypot_id]
+
+    def publish(self, attacks: List[Attack], first_seq: Optional[int] = None, epoch: Optional[str] = None):
+        """Queue new attacks for every client; call from the event loop thread
+
+        With several workers the event bus leader numbers the attacks and
+        passes ``first_seq`` and its ``epoch``, so a client can resume on
+        any worker. An empty batch with a new epoch just switches to it.
+        """
+        # Attacks go through even with no clients so reconnecting ones can catch up
+        if not self.running or (not attacks and epoch in (None, self.epoch)):
+            return
+        self._queue.put_nowait((attacks, first_seq, epoch))
+        self._stats["published"] += len(attacks)
+
+    async def _fan_out(self):
+        while True:
+            attacks, first_seq, epoch = await self._queue.get()
+            self._renumber(first_seq, epoch)
+            for payloads, clients in self._route(attacks):
+                for client in clients:
+                    try:
+                        client.queue.put_nowait(payloads)
+                    except asyncio.QueueFull:
+                        logger.warning(f"Disconnecting WebSocket client {self._peer(client)}: "
+                                       f"{self.queue_size} batches behind")
+                        self._evict(client)
+
+    def _renumber(self, first_seq: Optional[int], epoch: Optional[str]):
+        """Follow the numbering of the next batch when another process assigned it"""
+        if epoch is not None and epoch != self.epoch:
+            logger.info(f"Attack sequence epoch changed from {self.epoch} to {epoch}")
+            self.epoch = epoch
+            self.seq = first_seq - 1 if first_seq is not None else 0
+            self._replay.clear()
+            for client in self.active_connections.values():
+                client.joined_seq = 0
+        elif first_seq is not None and first_seq != self.seq + 1:
+            # Missed batches: the buffer must stay consecutive, so clients resuming
+            # from before the gap get a reset
+            logger.warning(f"Attack sequence jumped from {self.seq} to {first_seq}")
+            self.seq = first_seq - 1
+            self._replay.clear()
+
+    def _route(self, attacks: List[Attack]) -> List[Tuple[List[Payload], List[_Client]]]:
+        """Encoded attacks for each group that matches part of a batch"""
+        deliveries: Dict[_GroupKey, List[Payload]] = {}
+        any_honeypot = self._by_honeypot.get(None, set())
+        for attack in attacks:
+            self.seq += 1
+            seq = self.seq
+            self._replay.append((seq, attack))
+            encoded: Dict[Tuple[str, str], Payload] = {}
+            for group in any_honeypot | self._by_honeypot.get(attack.honeypot_id, set()):
+                if group.filter.matches(attack):
+                    # Encoded once per format, however many groups and clients receive it
+                    fmt = (group.projection, group.encoding)
+                    payload = encoded.get(fmt)
+                    if payload is None:
+                        payload = encoded[fmt] = encode_attack(attack, seq, *fmt)
+                    deliveries.setdefault(group, []).append(payload)
+        return [
+            (payloads, list(self._groups.get(group, ())))
+            for group, payloads in deliveries.items()
+        ]
+
+    async def _send(self, client: _Client):
+        loop = asyncio.get_running_loop()
+        pending: List[Payload] = []
+        deadline = 0.0
+        while True:
+            if pending and client.batch_interval:
+                try:
+                    item = await asyncio.wait_for(client.queue.get(), max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    item = None  # interval elapsed
+            else:
+                item = await client.queue.get()
+
+            frames: List[Payload] = []
+            if isinstance(item, list):
+                self._stats["delivered"] += len(item)
+            if isinstance(item, str):
+                # Control messages go out after the attacks queued before them
+                if pending:
+                    frames.append(batch_frame(pending, client.group.encoding))
+                    pending = []
+                frames.append(item)
+            elif not client.batching:
+                frames.extend(pending)
+                frames.extend(item or ())
+                pending = []
+            else:
+                if item:
+                    if not pending:
+                        deadline = loop.time() + client.batch_interval
+                    pending.extend(item)
+                limit = client.batch_max_events
+                while limit and len(pending) >= limit:
+                    frames.append(batch_frame(pending[:limit], client.group.encoding))
+                    pending = pending[limit:]
+                    deadline = loop.time() + client.batch_interval
+                # Without an interval, whatever is left of a batch goes out right away
+                if pending and (item is None or not client.batch_interval):
+                    frames.append(batch_frame(pending, client.group.encoding))
+                    pending = []
+
+            for frame in frames:
+                if not await self._send_frame(client, frame):
+                    return
+
+    async def _send_frame(self, client: _Client, frame: Payload) -> bool:
+        websocket = client.websocket
+        try:
+            if isinstance(frame, bytes):
+                await asyncio.wait_for(websocket.send_bytes(frame), self.send_timeout)
+            else:
+                await asyncio.wait_for(websocket.send_text(frame), self.send_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Disconnecting WebSocket client {self._peer(client)}: "
+                           f"send took over {self.send_timeout}s")
+            self._evict(client)
+            return False
+        except Exception:
+            # The connection is gone; the endpoint's receive loop cleans up
+            self.active_connections.pop(websocket, None)
+            self._leave(client)
+            return False
+        self._stats["frames"] += 1
+        self._stats["bytes"] += len(frame)
+        return True
+
+    def _evict(self, client: _Client):
+        if self.active_connections.pop(client.websocket, None) is None:
+            return
+        self._leave(client)
+        self._stats["evicted"] += 1
+        asyncio.create_task(self._drop(client, code=SLOW_CONSUMER_CLOSE_CODE))
+
+    async def _drop(self, client: _Client, close: bool = True, code: int = 1000):
+        self.active_connections.pop(client.websocket, None)
+        self._leave(client)
+        if client.sender is not None and client.sender is not asyncio.current_task():
+            client.sender.cancel()
+        if close:
+            try:
+                await asyncio.wait_for(client.websocket.close(code=code), self.send_timeout)
+            except Exception:
+                pass
+
+    @staticmethod
+    def _peer(client: _Client) -> str:
+        peer = client.websocket.client
+        return f"{peer.host}:{peer.port}" if peer else "unknown"
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "replay_buffer": len(self._replay),
+            "clients": len(self.active_connections),
+            "batching_clients": sum(1 for c in self.active_connections.values() if c.batching),
+            "delivery_groups": len(self._groups),
+            "client_queue_size": self.queue_size,
+            "fanout_backlog": self._queue.qsize() if self._queue else 0,
+            "max_client_backlog": max((c.queue.qsize() for c in self.active_connections.values()), default=0),
+            **self._stats,
+        }
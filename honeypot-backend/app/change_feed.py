@@ -0,0 +1,55 @@
+# app/change_feed.py
+import asyncio
+import threading
+from typing import List, Tuple
+
+
+class ChangeFeed:
+    """Wakes async long-poll readers when attacks are stored.
+
+    ``notify`` may be called from any thread (attacks are saved on worker
+    threads); each waiting future is resolved on its own event loop.
+    A reader registers before it checks for new data, so an insert that
+    lands between the check and the wait still wakes it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self.notifications = 0
+
+    def register(self) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        with self._lock:
+            self._waiters.append((loop, waiter))
+        return waiter
+
+    def unregister(self, waiter: asyncio.Future):
+        with self._lock:
+            self._waiters = [(loop, w) for loop, w in self._waiters if w is not waiter]
+
+    async def wait(self, waiter: asyncio.Future, timeout: float) -> bool:
+        """Wait until notified or timed out; True if there was a notification"""
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def notify(self):
+        """Wake every registered reader"""
+        with self._lock:
+            waiters, self._waiters = self._waiters, []
+            self.notifications += 1
+        for loop, waiter in waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_wake, waiter)
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
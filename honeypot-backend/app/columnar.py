@@ -0,0 +1,154 @@
+# app/columnar.py
+import time
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class _Dictionary:
+    """Dictionary encoding of a string column to dense integer codes"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, value) -> int:
+        value = value if value is not None else ""
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, value) -> int:
+        """Code for a value, or -1 if it was never seen"""
+        return self.codes.get(value if value is not None else "", -1)
+
+
+class ColumnarAttackStore:
+    """Read-side columnar copy of the attack store for vectorized analytics.
+
+    Keeps wall-clock timestamps as an int64 array and honeypot_id,
+    attack_type and source_ip as dictionary-encoded int32 codes. Appends
+    grow the arrays geometrically; readers work on views of the filled
+    prefix, which never change once written.
+    """
+
+    COLUMNS = ("honeypot_id", "attack_type", "source_ip")
+
+    def __init__(self, initial_capacity: int = 1024):
+        self._capacity = initial_capacity
+        self._size = 0
+        self._ts = np.empty(initial_capacity, dtype=np.int64)
+        self._codes = {name: np.empty(initial_capacity, dtype=np.int32) for name in self.COLUMNS}
+        self.dictionaries = {name: _Dictionary() for name in self.COLUMNS}
+        # Wall-clock time before any row was loaded, to tell which attacks a build saw
+        self.created_at = time.time()
+        # When the row count was last checked against storage
+        self.reconciled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self, needed: int):
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self._capacity:
+            return
+        ts = np.empty(capacity, dtype=np.int64)
+        ts[:self._size] = self._ts[:self._size]
+        self._ts = ts
+        for name, column in self._codes.items():
+            grown = np.empty(capacity, dtype=np.int32)
+            grown[:self._size] = column[:self._size]
+            self._codes[name] = grown
+        self._capacity = capacity
+
+    def append_many(self, rows: Iterable[Tuple[float, Dict[str, Any]]], chunk_size: int = 65536):
+        """Append ``(ts, attack)`` pairs"""
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                self._append_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._append_chunk(chunk)
+
+    def _append_chunk(self, chunk):
+        with self._lock:
+            start = self._size
+            end = start + len(chunk)
+            self._grow(end)
+            self._ts[start:end] = [int(ts) for ts, _ in chunk]
+            for name in self.COLUMNS:
+                dictionary = self.dictionaries[name]
+                self._codes[name][start:end] = [dictionary.encode(attack.get(name)) for _, attack in chunk]
+            self._size = end
+
+    def _select(self, start: Optional[float] = None, end: Optional[float] = None,
+                honeypot_id: Optional[str] = None):
+        """Get the timestamp and code columns of the rows matching a filter"""
+        with self._lock:
+            size = self._size
+            ts = self._ts[:size]
+            codes = {name: column[:size] for name, column in self._codes.items()}
+            honeypot_code = self.dictionaries["honeypot_id"].lookup(honeypot_id) if honeypot_id else None
+
+        mask = np.ones(size, dtype=bool)
+        if start is not None:
+            mask &= ts >= start
+        if end is not None:
+            mask &= ts < end
+        if honeypot_code is not None:
+            mask &= codes["honeypot_id"] == honeypot_code
+        return ts[mask], {name: column[mask] for name, column in codes.items()}
+
+    def _count_by_code(self, name: str, codes) -> Dict[str, int]:
+        counts = np.bincount(codes, minlength=0)
+        values = self.dictionaries[name].values
+        return {values[code]: int(count) for code, count in enumerate(counts) if count}
+
+    @staticmethod
+    def _count_by_bucket(ts, bucket_seconds: int) -> Dict[int, int]:
+        buckets, counts = np.unique(ts // bucket_seconds, return_counts=True)
+        return {int(b) * bucket_seconds: int(c) for b, c in zip(buckets, counts)}
+
+    def stats(self, since: float, honeypot_id: Optional[str] = None) -> Dict[str, Any]:
+        """Totals by attack type, honeypot and day since a timestamp"""
+        ts, codes = self._select(start=since, honeypot_id=honeypot_id)
+        return {
+            "total": int(ts.size),
+            "by_type": self._count_by_code("attack_type", codes["attack_type"]),
+            "by_honeypot": self._count_by_code("honeypot_id", codes["honeypot_id"]),
+            "by_day": self._count_by_bucket(ts, 86400),
+        }
+
+    def bucket_counts(self, start: Optional[float], end: Optional[float], bucket_seconds: int,
+                      honeypot_id: Optional[str] = None) -> Dict[int, int]:
+        """Attack counts per time bucket"""
+        ts, _ = self._select(start=start, end=end, honeypot_id=honeypot_id)
+        return self._count_by_bucket(ts, bucket_seconds)
+
+    def histogram(self, start: Optional[float], end: Optional[float], bucket_seconds: int,
+                  group_by: Tuple[str, ...] = (), honeypot_id: Optional[str] = None
+                  ) -> List[Tuple[int, Tuple[str, ...], int]]:
+        """Counts per ``(bucket, group values)``, sorted by bucket"""
+        ts, codes = self._select(start=start, end=end, honeypot_id=honeypot_id)
+        if not ts.size:
+            return []
+        keys = np.stack([ts // bucket_seconds] + [codes[name].astype(np.int64) for name in group_by], axis=1)
+        groups, counts = np.unique(keys, axis=0, return_counts=True)
+        dictionaries = [self.dictionaries[name].values for name in group_by]
+        return [
+            (int(row[0]) * bucket_seconds,
+             tuple(values[code] for values, code in zip(dictionaries, row[1:])),
+             int(count))
+            for row, count in zip(groups.tolist(), counts.tolist())
+        ]
@@ -2,50 +2,79 @@
 import os
 import json
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Tuple
 from datetime import datetime
 from .models import Honeypot, Attack, User
+from .sketches import AttackSketches
+from .columnar import ColumnarAttackStore
+from .change_feed import ChangeFeed
+from .storage import open_storage, to_wall_seconds, from_wall_seconds, rollup_bucket, ROLLUP_BUCKET_SECONDS
 import hashlib
+import base64
+import threading
+import time
 
 
 logger = logging.getLogger(__name__)
 
+# Read-side structures derived from a storage backend, shared like the
+# backend itself by every DatabaseService on the same data directory
+_derived: Dict[Tuple[int, str], Any] = {}
+_derived_lock = threading.Lock()
+
+
+def _get_derived(storage, name: str, build):
+    key = (id(storage), name)
+    with _derived_lock:
+        if key not in _derived:
+            _derived[key] = build()
+        return _derived[key]
+
+
+def _rebuild_derived(storage, name: str, build):
+    """Replace a derived structure with a freshly built one"""
+    key = (id(storage), name)
+    with _derived_lock:
+        _derived[key] = build()
+        return _derived[key]
+
+
+# Attacks above which the opt-in columnar cache is not kept
+COLUMNAR_MAX_ROWS = int(os.getenv("HONEYPOT_COLUMNAR_MAX_ROWS", "5000000"))
+
+# Seconds between checks that the columnar cache still matches storage
+COLUMNAR_RECONCILE_SECONDS = float(os.getenv("HONEYPOT_COLUMNAR_RECONCILE_SECONDS", "60"))
+
+HISTOGRAM_BUCKETS = {"minute": 60, "hour": 3600, "day": 86400}
+HISTOGRAM_GROUP_BY = ("attack_type", "honeypot_id")
+
+
+def encode_cursor(attack: Attack) -> str:
+    """Encode an attack's (timestamp, id) position as an opaque page cursor"""
+    raw = json.dumps([to_wall_seconds(attack.timestamp), attack.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """Decode a page cursor, raising ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, attack_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(ts), str(attack_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
 class DatabaseService:
-    """Simple file-based database for honeypots and attacks"""
+    """Database for honeypots and attacks on top of a pluggable storage backend"""
     
-    def __init__(self, data_dir="./data"):
+    def __init__(self, data_dir="./data", backend: Optional[str] = None):
         self.data_dir = data_dir
-        self.honeypots_file = os.path.join(data_dir, "honeypots.json")
-        self.attacks_file = os.path.join(data_dir, "attacks.json")
-        
-        # Create data directory if needed
-        os.makedirs(data_dir, exist_ok=True)
-        
-        # Initialize empty files if they don't exist
-        if not os.path.exists(self.honeypots_file):
-            self._save_data(self.honeypots_file, {})
-            
-        if not os.path.exists(self.attacks_file):
-            self._save_data(self.attacks_file, {})
-    
-    def _load_data(self, file_path):
-        """Load data from a JSON file"""
-        try:
-            with open(file_path, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            logger.error(f"Failed to load data from {file_path}: {e}")
-            return {}
-    
-    def _save_data(self, file_path, data):
-        """Save data to a JSON file"""
-        try:
-            with open(file_path, 'w') as f:
-                json.dump(data, f, indent=2, default=str)
-            return True
-        except Exception as e:
-            logger.error(f"Failed to save data to {file_path}: {e}")
-            return False
+        
+        # Backends are shared per data directory, so every service instance
+        # sees the same storage engine
+        self.storage = open_storage(data_dir, backend)
+    
     def _get_attack_hash(self, attack_data):
         """Create a unique hash for an attack to prevent duplicates"""
         # Create a string with all the unique identifiers of this attack
@@ -63,132 +92,287 @@ class DatabaseService:
     # Honeypot operations
     def get_all_honeypots(self) -> List[Honeypot]:
         """Get all honeypots"""
-        data = self._load_data(self.honeypots_file)
-        return [Honeypot.parse_obj(h) for h in data.values()]
+        return [Honeypot.parse_obj(h) for h in self.storage.get_all_honeypots()]
     
     def get_honeypot(self, honeypot_id: str) -> Optional[Honeypot]:
         """Get a specific honeypot by ID"""
-        data = self._load_data(self.honeypots_file)
-        honeypot_data = data.get(honeypot_id)
+        honeypot_data = self.storage.get_honeypot(honeypot_id)
         return Honeypot.parse_obj(honeypot_data) if honeypot_data else None
     
     def create_honeypot(self, honeypot: Honeypot) -> Honeypot:
         """Save a new honeypot"""
-        data = self._load_data(self.honeypots_file)
-        data[honeypot.id] = honeypot.dict()
-        self._save_data(self.honeypots_file, data)
+        self.storage.save_honeypot(honeypot.dict())
         return honeypot
     
     def update_honeypot(self, honeypot: Honeypot) -> Honeypot:
         """Update an existing honeypot"""
-        data = self._load_data(self.honeypots_file)
-        data[honeypot.id] = honeypot.dict()
-        self._save_data(self.honeypots_file, data)
+        self.storage.save_honeypot(honeypot.dict())
         return honeypot
     
     def delete_honeypot(self, honeypot_id: str) -> bool:
         """Delete a honeypot"""
-        data = self._load_data(self.honeypots_file)
-        if honeypot_id in data:
-            del data[honeypot_id]
-            self._save_data(self.honeypots_file, data)
-            return True
-        return False
+        return self.storage.delete_honeypot(honeypot_id)
     
     def increment_attack_count(self, honeypot_id: str) -> bool:
         """Increment the attack count for a honeypot"""
-        data = self._load_data(self.honeypots_file)
-        if honeypot_id in data:
-            data[honeypot_id]["attack_count"] = data[honeypot_id].get("attack_count", 0) + 1
-            self._save_data(self.honeypots_file, data)
-            return True
-        return False
+        return self.storage.increment_attack_count(honeypot_id)
 
     # Attack operations
     def attack_exists(self, attack_data):
         """Check if an attack with the same signature already exists"""
         attack_hash = self._get_attack_hash(attack_data)
-        
-        data = self._load_data(self.attacks_file)
-        
-        for attack in data.values():
-            if attack.get("attack_hash") == attack_hash:
-                return True
-        
-        return False
+        return self.storage.attack_hash_exists(attack_hash)
+    
     def get_attacks(self, honeypot_id: Optional[str] = None, 
-                   limit: int = 100, offset: int = 0) -> List[Attack]:
-        """Get attacks, optionally filtered by honeypot ID"""
-        data = self._load_data(self.attacks_file)
+                   limit: int = 100, offset: int = 0,
+                   before: Optional[str] = None, after: Optional[str] = None) -> List[Attack]:
+        """Get attacks (newest first), optionally filtered by honeypot ID
         
-        attacks = []
-        for attack_data in data.values():
-            if honeypot_id is None or attack_data.get("honeypot_id") == honeypot_id:
-                attacks.append(Attack.parse_obj(attack_data))
-        
-        # Sort by timestamp (newest first)
-        attacks.sort(key=lambda a: a.timestamp, reverse=True)
-        
-        # Apply limit and offset
-        return attacks[offset:offset+limit]
+        ``before``/``after`` are cursors from encode_cursor; pages are read
+        with an indexed range scan starting at the cursor.
+        """
+        rows = self.storage.get_attacks(
+            honeypot_id=honeypot_id,
+            limit=limit,
+            offset=offset,
+            before=decode_cursor(before) if before else None,
+            after=decode_cursor(after) if after else None
+        )
+        return [Attack.parse_obj(a) for a in rows]
+    
+    def count_attacks(self, honeypot_id: Optional[str] = None) -> int:
+        """Count attacks, optionally filtered by honeypot ID"""
+        return self.storage.count_attacks(honeypot_id)
     
     def get_attack(self, attack_id: str) -> Optional[Attack]:
         """Get a specific attack by ID"""
-        data = self._load_data(self.attacks_file)
-        attack_data = data.get(attack_id)
+        attack_data = self.storage.get_attack(attack_id)
         return Attack.parse_obj(attack_data) if attack_data else None
     
     def save_attack(self, attack):
         """Save an attack and increment honeypot attack count"""
-        # First check if attack has a hash, if not generate one
-        if not attack.dict().get("attack_hash"):
-            attack_hash = self._get_attack_hash(attack.dict())
-            # Add the hash to the attack object
-            attack.attack_hash = attack_hash
+        saved = self.save_attacks([attack])
+        return saved[0] if saved else None
+    
+    def save_attacks(self, attacks: Iterable[Attack]) -> List[Attack]:
+        """Save attacks in bulk, returning only the ones that were new
         
-        # Check if this attack already exists
-        if self.attack_exists(attack.dict()):
-            return None  # Skip saving duplicates
+        Deduplication, inserts and honeypot attack count updates happen in a
+        single pass over the storage backend.
+        """
+        attacks = list(attacks)
+        for attack in attacks:
+            # Generate a hash for attacks that don't have one yet
+            if not attack.attack_hash:
+                attack.attack_hash = self._get_attack_hash(attack.dict())
         
-        # Save the attack
-        data = self._load_data(self.attacks_file)
-        data[attack.id] = attack.dict()
-        self._save_data(self.attacks_file, data)
+        # Make sure the read-side caches exist before the insert so a first
+        # build does not count this batch twice
+        sketches = self.get_sketches()
+        columnar = self.get_columnar()
         
-        # Increment the honeypot's attack count
-        self.increment_attack_count(attack.honeypot_id)
+        inserted = self.storage.insert_attacks([attack.dict() for attack in attacks])
+        inserted_ids = {a["id"] for a in inserted}
+        new_attacks = [attack for attack in attacks if attack.id in inserted_ids]
         
-        return attack
+        rows = [(to_wall_seconds(a["timestamp"]), a) for a in inserted]
+        sketches.add_many(rows)
+        if columnar is not None:
+            columnar.append_many(rows)
+        if inserted:
+            self.get_change_feed().notify()
+        return new_attacks
+    
+    def apply_remote_attacks(self, attacks: List[Attack], stored_at: Optional[float] = None):
+        """Account for attacks another worker process has already stored
+        
+        Only caches built in this process are updated, and only if they
+        were built before ``stored_at`` (wall-clock time after the attacks
+        were committed); a later build read them from storage already.
+        Holds the lock the caches are built under, so a build in progress
+        finishes first.
+        """
+        rows = [(to_wall_seconds(a.timestamp), a.dict()) for a in attacks]
+        with _derived_lock:
+            sketches = _derived.get((id(self.storage), "sketches"))
+            if sketches is not None and (stored_at is None or stored_at > sketches.created_at):
+                sketches.add_many(rows)
+            columnar = _derived.get((id(self.storage), "columnar"))
+            if columnar is not None and (stored_at is None or stored_at > columnar.created_at):
+                columnar.append_many(rows)
+        self.get_change_feed().notify()
+    
+    def get_attack_changes(self, since: int, limit: int = 100,
+                           honeypot_id: Optional[str] = None) -> Tuple[List[Attack], int]:
+        """Get attacks stored after a change cursor, oldest first, and the next cursor
+        
+        Cursors are insertion sequence numbers, so attacks are returned in
+        the order they were ingested regardless of their timestamps.
+        """
+        rows, cursor = self.storage.get_changes(since, limit, honeypot_id)
+        return [Attack.parse_obj(a) for _, a in rows], cursor
+    
+    def latest_change_cursor(self) -> int:
+        """Cursor positioned after the most recently stored attack"""
+        return self.storage.latest_seq()
+    
+    def get_change_feed(self) -> ChangeFeed:
+        """Get the shared notifier that wakes change-feed long polls"""
+        return _get_derived(self.storage, "changes", ChangeFeed)
+    
+    def get_columnar(self) -> Optional[ColumnarAttackStore]:
+        """Get the shared columnar analytics cache, or None if it is not in use
+        
+        Opt-in with HONEYPOT_COLUMNAR_CACHE=1; stats come from the rollups
+        otherwise. The cache is dropped above HONEYPOT_COLUMNAR_MAX_ROWS
+        attacks and rebuilt from storage when its row count stops matching.
+        """
+        if os.getenv("HONEYPOT_COLUMNAR_CACHE", "0") != "1":
+            return None
+        
+        columnar = _get_derived(self.storage, "columnar", self._build_columnar)
+        if columnar is not None and time.monotonic() - columnar.reconciled_at >= COLUMNAR_RECONCILE_SECONDS:
+            columnar.reconciled_at = time.monotonic()
+            stored = self.storage.count_attacks()
+            if stored != len(columnar) or stored > COLUMNAR_MAX_ROWS:
+                logger.warning(f"Rebuilding columnar cache ({len(columnar)} rows cached, {stored} stored)")
+                columnar = _rebuild_derived(self.storage, "columnar", self._build_columnar)
+        return columnar
+    
+    def _build_columnar(self) -> Optional[ColumnarAttackStore]:
+        stored = self.storage.count_attacks()
+        if stored > COLUMNAR_MAX_ROWS:
+            logger.warning(
+                f"{stored} attacks exceed HONEYPOT_COLUMNAR_MAX_ROWS ({COLUMNAR_MAX_ROWS}), "
+                f"answering stats from the rollups"
+            )
+            return None
+        columnar = ColumnarAttackStore()
+        columnar.append_many(self.storage.iter_attacks())
+        logger.info(f"Built columnar attack cache with {len(columnar)} rows")
+        return columnar
+    
+    def get_sketches(self) -> AttackSketches:
+        """Get the shared attacker/credential sketches, building them on first use"""
+        def build():
+            sketches = AttackSketches()
+            since = to_wall_seconds(datetime.utcnow()) - sketches.retention_days * 86400
+            sketches.add_many(self.storage.iter_attacks(since=since))
+            return sketches
+        return _get_derived(self.storage, "sketches", build)
+    
+    def get_top_attackers(self, days: int = 7, honeypot_id: Optional[str] = None,
+                          k: int = 10) -> Dict[str, Any]:
+        """Top source IPs and credentials plus distinct attacker count
+        
+        Approximate: served from streaming sketches kept per honeypot and day.
+        """
+        sketches = self.get_sketches()
+        now = to_wall_seconds(datetime.utcnow())
+        sketches.expire(now)
+        result = sketches.query(now, days=days, honeypot_id=honeypot_id, k=k)
+        result.update({"days": days, "honeypot_id": honeypot_id})
+        return result
     
     def get_attack_stats(self, days: int = 7) -> Dict[str, Any]:
-        """Get attack statistics"""
-        attacks = self.get_attacks(limit=1000)  # Get a large sample
+        """Get attack statistics over the full history
         
-        # Calculate cutoff time
-        cutoff = datetime.now().timestamp() - (days * 86400)
+        Uses the hourly rollups (where the window starts at the hour
+        containing the cutoff), or the columnar cache when it is enabled.
+        """
+        cutoff = to_wall_seconds(datetime.utcnow()) - (days * 86400)
         
-        # Filter to recent attacks only
-        recent_attacks = [a for a in attacks if a.timestamp.timestamp() > cutoff]
+        columnar = self.get_columnar()
+        if columnar is not None:
+            # Same window as the rollups, so enabling the cache doesn't change the answer
+            stats = columnar.stats(since=rollup_bucket(cutoff))
+            return {
+                "total": stats["total"],
+                "by_type": stats["by_type"],
+                "by_honeypot": stats["by_honeypot"],
+                "daily": {from_wall_seconds(day).strftime("%Y-%m-%d"): count
+                          for day, count in stats["by_day"].items()}
+            }
         
-        # Count by type
         attack_types = {}
-        for attack in recent_attacks:
-            attack_types[attack.attack_type] = attack_types.get(attack.attack_type, 0) + 1
-        
-        # Count by honeypot
         honeypot_attacks = {}
-        for attack in recent_attacks:
-            honeypot_attacks[attack.honeypot_id] = honeypot_attacks.get(attack.honeypot_id, 0) + 1
-        
-        # Group by day
         daily_attacks = {}
-        for attack in recent_attacks:
-            day = attack.timestamp.strftime("%Y-%m-%d")
-            daily_attacks[day] = daily_attacks.get(day, 0) + 1
+        total = 0
+        for honeypot_id, attack_type, bucket, count in self.storage.get_rollups(since=cutoff):
+            total += count
+            attack_types[attack_type] = attack_types.get(attack_type, 0) + count
+            honeypot_attacks[honeypot_id] = honeypot_attacks.get(honeypot_id, 0) + count
+            day = from_wall_seconds(bucket).strftime("%Y-%m-%d")
+            daily_attacks[day] = daily_attacks.get(day, 0) + count
         
         return {
-            "total": len(recent_attacks),
+            "total": total,
             "by_type": attack_types,
             "by_honeypot": honeypot_attacks,
             "daily": daily_attacks
         }
+    
+    def get_attack_histogram(self, start: datetime, end: datetime, bucket: str = "hour",
+                             group_by: Iterable[str] = (),
+                             honeypot_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Attack counts per time bucket, optionally split by attack_type/honeypot_id
+        
+        Raises ValueError for an unknown bucket size or group-by field.
+        """
+        if bucket not in HISTOGRAM_BUCKETS:
+            raise ValueError(f"Unknown bucket size: {bucket}")
+        group_by = tuple(group_by)
+        for name in group_by:
+            if name not in HISTOGRAM_GROUP_BY:
+                raise ValueError(f"Cannot group by: {name}")
+        
+        bucket_seconds = HISTOGRAM_BUCKETS[bucket]
+        start_ts, end_ts = to_wall_seconds(start), to_wall_seconds(end)
+        
+        columnar = self.get_columnar()
+        if columnar is not None:
+            rows = columnar.histogram(start_ts, end_ts, bucket_seconds, group_by, honeypot_id)
+        else:
+            rows = self.storage.count_by_bucket(start_ts, end_ts, bucket_seconds, group_by, honeypot_id)
+        
+        return [
+            {"time": from_wall_seconds(bucket_ts).isoformat(), **dict(zip(group_by, group)), "count": count}
+            for bucket_ts, group, count in sorted(rows)
+        ]
+    
+    def get_honeypot_attack_stats(self, honeypot_id: str, days: int = 7) -> Dict[str, Any]:
+        """Get daily and last-24-hour hourly attack counts for a honeypot"""
+        now = to_wall_seconds(datetime.utcnow())
+        cutoff = now - (days * 86400)
+        hourly_cutoff = now - 86400
+        
+        columnar = self.get_columnar()
+        if columnar is not None:
+            stats = columnar.stats(since=rollup_bucket(cutoff), honeypot_id=honeypot_id)
+            hourly = columnar.bucket_counts(rollup_bucket(hourly_cutoff), None, ROLLUP_BUCKET_SECONDS,
+                                            honeypot_id=honeypot_id)
+            return {
+                "total": stats["total"],
+                "by_day": {from_wall_seconds(day).strftime("%Y-%m-%d"): count
+                           for day, count in stats["by_day"].items()},
+                "by_hour": {from_wall_seconds(hour).strftime("%Y-%m-%d %H:00"): count
+                            for hour, count in hourly.items()}
+            }
+        
+        attacks_by_day = {}
+        attacks_by_hour = {}
+        total = 0
+        for _, _, bucket, count in self.storage.get_rollups(honeypot_id=honeypot_id, since=cutoff):
+            total += count
+            bucket_time = from_wall_seconds(bucket)
+            day = bucket_time.strftime("%Y-%m-%d")
+            attacks_by_day[day] = attacks_by_day.get(day, 0) + count
+            if bucket + ROLLUP_BUCKET_SECONDS > hourly_cutoff:
+                hour = bucket_time.strftime("%Y-%m-%d %H:00")
+                attacks_by_hour[hour] = attacks_by_hour.get(hour, 0) + count
+        
+        return {
+            "total": total,
+            "by_day": attacks_by_day,
+            "by_hour": attacks_by_hour
+        }
@@ -0,0 +1,147 @@
+# app/dedup.py
+import os
+import math
+import hashlib
+import logging
+import threading
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SIZE = 16  # attack hashes are md5 hex digests
+
+
+def hash_digest(attack_hash: str) -> bytes:
+    """Pack an attack hash into its 16 raw bytes"""
+    try:
+        digest = bytes.fromhex(attack_hash)
+        if len(digest) == DIGEST_SIZE:
+            return digest
+    except ValueError:
+        pass
+    # Hashes that are not md5 hex strings still get a fixed-size key
+    return hashlib.md5(attack_hash.encode()).digest()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 16-byte digests"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest: bytes):
+        # Double hashing on the two halves of the digest, which is already uniform
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, digest: bytes):
+        for pos in self._positions(digest):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def might_contain(self, digest: bytes) -> bool:
+        for pos in self._positions(digest):
+            if not self.bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+class AttackHashIndex:
+    """In-memory attack hash index with a Bloom filter in front of it.
+
+    The Bloom filter rejects unseen hashes without touching the exact set,
+    and every inserted digest is appended to ``index_file`` so the index can
+    be reloaded on restart instead of being rebuilt from storage.
+    """
+
+    MIN_CAPACITY = 100_000
+
+    def __init__(self, index_file: str):
+        self.index_file = index_file
+        self._digests = set()
+        self._bloom = BloomFilter(self.MIN_CAPACITY)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._digests)
+
+    def load(self, expected_count: int, rebuild_source: Iterable[str]):
+        """Load the persisted index, rebuilding it if it is out of date.
+
+        ``expected_count`` is the number of hashed attacks in storage and
+        ``rebuild_source`` yields their hashes when a rebuild is needed.
+        """
+        digests = self._read_index_file()
+        if digests is None or len(digests) != expected_count:
+            digests = {hash_digest(h) for h in rebuild_source if h}
+            self._write_index_file(digests)
+            logger.info(f"Rebuilt attack hash index with {len(digests)} entries")
+
+        with self._lock:
+            self._digests = digests
+            self._rebuild_bloom()
+
+    def _rebuild_bloom(self):
+        self._bloom = BloomFilter(max(self.MIN_CAPACITY, 2 * len(self._digests)))
+        for digest in self._digests:
+            self._bloom.add(digest)
+
+    def _read_index_file(self) -> Optional[set]:
+        try:
+            with open(self.index_file, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return None
+        # A torn final record means the file is not trustworthy
+        if len(raw) % DIGEST_SIZE:
+            return None
+        return {raw[i:i + DIGEST_SIZE] for i in range(0, len(raw), DIGEST_SIZE)}
+
+    def _write_index_file(self, digests):
+        tmp_file = f"{self.index_file}.tmp"
+        try:
+            with open(tmp_file, "wb") as f:
+                f.write(b"".join(digests))
+            os.replace(tmp_file, self.index_file)
+        except OSError as e:
+            logger.error(f"Failed to write attack hash index {self.index_file}: {e}")
+
+    def contains(self, attack_hash: str) -> bool:
+        digest = hash_digest(attack_hash)
+        if not self._bloom.might_contain(digest):
+            return False
+        return digest in self._digests
+
+    def add_many(self, attack_hashes: Iterable[str]):
+        """Record newly stored attack hashes and persist them"""
+        new_digests = []
+        with self._lock:
+            for attack_hash in attack_hashes:
+                if not attack_hash:
+                    continue
+                digest = hash_digest(attack_hash)
+                if digest in self._digests:
+                    continue
+                self._digests.add(digest)
+                self._bloom.add(digest)
+                new_digests.append(digest)
+
+            if self._bloom.count > self._bloom.capacity:
+                self._rebuild_bloom()
+
+            if new_digests:
+                try:
+                    with open(self.index_file, "ab") as f:
+                        f.write(b"".join(new_digests))
+                except OSError as e:
+                    logger.error(f"Failed to persist attack hash index: {e}")
+
+    def add(self, attack_hash: str):
+        self.add_many([attack_hash])
@@ -2,21 +2,122 @@
 import docker
 import logging
 import os
-import re
+import json
+import calendar
+import threading
 from typing import Dict, Any, Optional, List, Tuple
 import time
-from datetime import datetime
+
+from .log_parsers import get_parser
 
 logger = logging.getLogger(__name__)
 
+# How attacks get from containers to the database: "stream" follows docker logs,
+# "file" tails bind-mounted log files, "poll" only uses the periodic sync
+INGEST_MODE = os.getenv("HONEYPOT_INGEST_MODE", "stream").lower()
+
+# Where Cowrie writes cowrie.log and cowrie.json inside its container
+COWRIE_LOG_DIR = "/cowrie/cowrie-git/var/log/cowrie"
+
+# User the honeypot runs as inside its container (the cowrie user in the official image)
+CONTAINER_UID = int(os.getenv("HONEYPOT_CONTAINER_UID", "999"))
+
+
+def parse_docker_timestamp(stamp: str) -> Optional[Tuple[int, int]]:
+    """Parse an RFC3339Nano docker log timestamp into (epoch seconds, nanoseconds)"""
+    try:
+        seconds = calendar.timegm(time.strptime(stamp[:19], "%Y-%m-%dT%H:%M:%S"))
+    except ValueError:
+        return None
+    nanos = 0
+    if len(stamp) > 19 and stamp[19] == ".":
+        fraction = stamp[20:].rstrip("Z")
+        nanos = int(fraction[:9].ljust(9, "0")) if fraction.isdigit() else 0
+    return seconds, nanos
+
+
+def split_log_line(raw_line: str) -> Tuple[Optional[Tuple[int, int]], str]:
+    """Split a ``timestamps=True`` docker log line into its position and text"""
+    stamp, _, line = raw_line.partition(" ")
+    return parse_docker_timestamp(stamp), line
+
+
+class LogCursorStore:
+    """Per-container docker log checkpoints, persisted to a JSON file
+    
+    A checkpoint is the timestamp of the last log line that was processed,
+    stored as "<epoch seconds>.<9-digit nanoseconds>".
+    """
+    
+    _stores: Dict[str, "LogCursorStore"] = {}
+    _stores_lock = threading.Lock()
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r") as f:
+                self._cursors: Dict[str, str] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._cursors = {}
+    
+    @classmethod
+    def open(cls, path: str) -> "LogCursorStore":
+        """Get the shared cursor store for a file"""
+        path = os.path.abspath(path)
+        with cls._stores_lock:
+            if path not in cls._stores:
+                cls._stores[path] = cls(path)
+            return cls._stores[path]
+    
+    def get(self, container_id: str) -> Optional[Tuple[int, int]]:
+        cursor = self._cursors.get(container_id)
+        if not cursor:
+            return None
+        seconds, _, nanos = cursor.partition(".")
+        return int(seconds), int(nanos or 0)
+    
+    def set(self, container_id: str, position: Tuple[int, int], persist: bool = True):
+        """Advance a checkpoint; it never moves backwards"""
+        with self._lock:
+            current = self.get(container_id)
+            if current and position <= current:
+                return
+            self._cursors[container_id] = f"{position[0]}.{position[1]:09d}"
+            if persist:
+                self._save()
+    
+    def flush(self):
+        with self._lock:
+            self._save()
+    
+    def remove(self, container_id: str):
+        with self._lock:
+            if self._cursors.pop(container_id, None) is not None:
+                self._save()
+    
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(self._cursors, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Failed to save docker log cursors to {self.path}: {e}")
+
+
 class DockerService:
-    def __init__(self):
+    def __init__(self, cursor_file: str = "./data/log_cursors.json", log_root: str = "./data/honeypot_logs"):
         try:
             self.client = docker.from_env()
             logger.info("Docker client initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Docker client: {e}")
             raise
+        
+        self.log_cursors = LogCursorStore.open(cursor_file)
+        self.log_root = os.path.abspath(log_root)
 
     def deploy_honeypot(self, honeypot_id: str, honeypot_type: str, port: str) -> Dict[str, Any]:
         """
@@ -77,9 +178,13 @@ class DockerService:
         honeypot_type = honeypot_type.lower()
         
         if honeypot_type == "ssh":
+            volumes = {}
+            if INGEST_MODE == "file":
+                # Bind-mount the log directory so cowrie.json can be tailed from the host
+                volumes[self._create_log_dir(honeypot_id)] = {"bind": COWRIE_LOG_DIR, "mode": "rw"}
             return (
                 "cowrie/cowrie",
-                {},  # No need for volume mounts as we'll extract logs directly
+                volumes,
                 {"2222/tcp": None},  # Will be mapped to a random port
                 {
                     "COWRIE_TELNET_ENABLED": "yes",
@@ -115,6 +220,33 @@ class DockerService:
                 {}
             )
 
+    def _create_log_dir(self, honeypot_id: str) -> str:
+        log_dir = os.path.join(self.log_root, honeypot_id)
+        os.makedirs(log_dir, exist_ok=True)
+        # Writable by the container's user, readable by this process through the group,
+        # closed to everyone else
+        try:
+            os.chown(log_dir, CONTAINER_UID, os.getgid())
+        except PermissionError:
+            logger.warning(
+                f"Cannot chown {log_dir} to uid {CONTAINER_UID}; run as root or pre-create it "
+                f"owned by the container user, or the honeypot cannot write its logs"
+            )
+        os.chmod(log_dir, 0o770)
+        return log_dir
+
+    def get_log_mount(self, container_id: str) -> Optional[str]:
+        """Host directory bind-mounted as the container's log directory, if any"""
+        try:
+            container_info = self.client.api.inspect_container(container_id)
+        except Exception as e:
+            logger.error(f"Failed to inspect container {container_id[:12]}: {e}")
+            return None
+        for mount in container_info.get("Mounts") or []:
+            if mount.get("Destination") == COWRIE_LOG_DIR and mount.get("Type") == "bind":
+                return mount.get("Source")
+        return None
+
     def stop_honeypot(self, container_id: str) -> bool:
         """
         Stop and remove a honeypot container
@@ -123,6 +255,7 @@ class DockerService:
             container = self.client.containers.get(container_id)
             container.stop()
             container.remove()
+            self.log_cursors.remove(container_id)
             logger.info(f"Stopped and removed container {container_id[:12]}")
             return True
         except docker.errors.NotFound:
@@ -195,106 +328,57 @@ class DockerService:
             logger.error(f"Failed to get logs for container {container_id[:12]}: {e}")
             return ""
 
-    def get_attacks_from_container(self, container_id: str, honeypot_id: str, honeypot_type: str) -> List[Dict[str, Any]]:
-        """Extract attack information from container logs"""
-        attacks = []
+    def get_new_container_logs(self, container_id: str) -> Tuple[List[str], Optional[Tuple[int, int]]]:
+        """Get the log lines written since the container's checkpoint
         
-        try:
-            logs = self.get_container_logs(container_id)
-            
-            
-            if honeypot_type.lower() == "ssh":
-                # Parse SSH honeypot logs (Cowrie)
-                for line in logs.splitlines():
-                    # Look for login attempts
-                    login_match = re.search(r"login attempt \[b'([^']*)'/b'([^']*)'\] failed", line)
-                    if login_match:
-                        username, password = login_match.groups()
-                        
-                        # Extract source IP 
-                        ip_match = re.search(r"HoneyPotSSHTransport,\d+,(\S+)", line)
-                        source_ip = ip_match.group(1) if ip_match else "unknown"
-                        
-                        # Extract timestamp
-                        time_match = re.search(r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})", line)
-                        timestamp = time_match.group(1) if time_match else datetime.now().isoformat()
-                        
-                        attacks.append({
-                            "honeypot_id": honeypot_id,
-                            "source_ip": source_ip,
-                            "attack_type": "login_attempt",
-                            "username": username,
-                            "password": password,
-                            "timestamp": timestamp,
-                            "details": {"raw_log": line}
-                        })
-            
-            elif honeypot_type.lower() == "web":
-                # Parse Web honeypot logs
-                for line in logs.splitlines():
-                    # Look for HTTP requests
-                    http_match = re.search(r'(\d+\.\d+\.\d+\.\d+).*"(GET|POST|PUT|DELETE) ([^ ]+)', line)
-                    if http_match:
-                        source_ip, method, path = http_match.groups()
-                        
-                        # Consider certain paths as attacks
-                        is_attack = any(x in path.lower() for x in ['/admin', '/wp-login', '.php', 'script', 'eval'])
-                        
-                        if is_attack:
-                            attacks.append({
-                                "honeypot_id": honeypot_id,
-                                "source_ip": source_ip,
-                                "attack_type": "web_scan",
-                                "timestamp": datetime.now().isoformat(),
-                                "details": {"method": method, "path": path, "raw_log": line}
-                            })
-            
-            elif honeypot_type.lower() == "ftp":
-                # Parse FTP honeypot logs
-                # First, try to extract info from the logs directly
-                
-                for line in logs.splitlines():
-                    # Debug the actual log content to see what's available
-                    logger.debug(f"FTP log line: {line}")
-                    
-                    
-                    # Look for various FTP authentication patterns
-                    if any(pattern in line.lower() for pattern in [
-                        "authentication failed",
-                        "user", 
-                        "password required",
-                        "unable to read",
-                        "indexed puredb"
-                    ]):
-                        # Extract username - try various patterns
-                        username = "unknown"
-                        user_patterns = [
-                            r'User\s+(\S+)\s+OK',   # Matches "User devraj OK"
-                            r'User\s+(\S+)',        # Matches "User: username"
-                            r'user\[([^\]]+)\]',    # Matches "user[username]"
-                            r'username[=:\s]+(\S+)', # Matches "username: value"
-                        ]
-                        
-                        for pattern in user_patterns:
-                            user_match = re.search(pattern, line, re.IGNORECASE)
-                            if user_match:
-                                username = user_match.group(1)
-                                break
-                        
-                        # Since actual connection IPs may not be in logs, create a fake "attack"
-                        # This simulates someone trying to connect to your honeypot
-                        attacks.append({
-                            "honeypot_id": honeypot_id,
-                            "source_ip": "127.0.0.1",  # Local connection
-                            "attack_type": "ftp_login_attempt",
-                            "username": username,
-                            "timestamp": datetime.now().isoformat(),
-                            "details": {"raw_log": line}
-                        })
-            
-            logger.info(f"Extracted {len(attacks)} attacks from container {container_id[:12]}")
-            return attacks
+        Uses the docker ``since``/``timestamps`` options so each call only
+        transfers new output. Also returns the position of the newest line
+        (None if there were none); the caller passes it to
+        ``commit_log_cursor`` once the lines have been handled.
+        """
+        container = self.client.containers.get(container_id)
+        checkpoint = self.log_cursors.get(container_id)
+        
+        kwargs = {"timestamps": True}
+        if checkpoint:
+            kwargs["since"] = checkpoint[0] + checkpoint[1] / 1e9
+        logs = container.logs(**kwargs).decode('utf-8', errors='ignore')
+        
+        lines = []
+        newest = None
+        for raw_line in logs.splitlines():
+            position, line = split_log_line(raw_line)
+            if position is None:
+                continue
+            # "since" is inclusive, so skip lines at or before the checkpoint
+            if checkpoint and position <= checkpoint:
+                continue
+            lines.append(line)
+            newest = position
+        return lines, newest
+
+    def commit_log_cursor(self, container_id: str, cursor: Optional[Tuple[int, int]]):
+        """Advance a container's checkpoint past logs that have been ingested"""
+        if cursor is not None:
+            self.log_cursors.set(container_id, cursor)
+
+    def get_attacks_from_container(self, container_id: str, honeypot_id: str,
+                                   honeypot_type: str) -> Tuple[List[Dict[str, Any]], Optional[Tuple[int, int]]]:
+        """Extract attack information from new container log lines
         
+        Returns the attacks and the log cursor to commit once they are queued.
+        """
+        try:
+            lines, cursor = self.get_new_container_logs(container_id)
         except Exception as e:
-            logger.error(f"Failed to extract attacks from container {container_id[:12]}: {e}")
-            return []
\ No newline at end of file
+            logger.error(f"Failed to get logs for container {container_id[:12]}: {e}")
+            return [], None
+        
+        attacks = self.parse_log_lines(lines, honeypot_id, honeypot_type)
+        if attacks:
+            logger.info(f"Extracted {len(attacks)} attacks from container {container_id[:12]}")
+        return attacks, cursor
+
+    def parse_log_lines(self, lines: List[str], honeypot_id: str, honeypot_type: str) -> List[Dict[str, Any]]:
+        """Extract attack information from honeypot log lines"""
+        return get_parser(honeypot_type).parse_lines(lines, honeypot_id)
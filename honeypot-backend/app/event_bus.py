@@ -0,0 +1,390 @@
+# app/event_bus.py
+import os
+import json
+import time
+import uuid
+import random
+import socket
+import asyncio
+import threading
+import logging
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Set
+
+from .models import Attack
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; every process runs standalone there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Longest line (one batch of attacks) a peer may send
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+
+# A peer with more than this much unsent data is disconnected
+MAX_PEER_BUFFER_BYTES = 32 * 1024 * 1024
+
+# Messages a follower holds while it has no leader; the oldest are dropped beyond this
+MAX_BACKLOG_MESSAGES = 1000
+
+
+def encode_attacks(attacks: List[Attack], **fields) -> bytes:
+    """An ``attacks`` message; each attack is serialized by pydantic"""
+    head = json.dumps({"type": "attacks", **fields})[:-1]
+    return (head + ',"attacks":[' + ",".join(attack.json() for attack in attacks) + "]}\n").encode()
+
+
+def encode_command(command: Dict[str, Any]) -> bytes:
+    return (json.dumps({"type": "command", "command": command}) + "\n").encode()
+
+
+def decode_message(line: bytes) -> Dict[str, Any]:
+    message = json.loads(line)
+    if message.get("type") == "attacks":
+        message["attacks"] = [Attack.parse_obj(data) for data in message["attacks"]]
+    return message
+
+
+class EventBus:
+    """Shares newly ingested attacks between the API worker processes.
+
+    With ``uvicorn --workers N`` every worker has its own WebSocket clients,
+    so each batch a worker publishes must reach the others. The worker
+    that holds an exclusive lock on ``<socket>.lock`` is the leader: it
+    serves a Unix domain socket, and the other workers connect to it.
+
+    The leader numbers every attack within its epoch and sends each batch
+    to all followers, the one that stored it included, so every worker
+    hands its clients the same sequence numbers. Followers send their
+    attacks up unnumbered and deliver them when they come back. Messages
+    are one JSON object per line: ``attacks`` batches and ``command``
+    messages, which run ``on_command`` in the leader.
+
+    The lock is released by the OS when the leader dies, so a follower
+    takes over with a new epoch. ``on_leader`` then runs in the new leader;
+    it starts the work that only one process should do, such as log
+    ingestion and the periodic sync.
+    """
+
+    def __init__(self, deliver: Callable[[List[Attack], int, str], None],
+                 on_remote: Optional[Callable[[List[Attack], Optional[float]], None]] = None,
+                 socket_path: Optional[str] = None):
+        self.deliver = deliver
+        self.on_remote = on_remote
+        self.socket_path = socket_path or os.getenv("HONEYPOT_EVENT_BUS_SOCKET", "./data/eventbus.sock")
+        self.enabled = os.getenv("HONEYPOT_EVENT_BUS", "1") != "0" and fcntl is not None
+        self.is_leader = False
+        # Set by the leader; sequence numbers are only comparable within an epoch
+        self.epoch: Optional[str] = None
+        self.seq = 0
+        self._on_leader: Optional[Callable[[], Awaitable[None]]] = None
+        self._on_command: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+        self._lock_fd: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._peers: Set[asyncio.StreamWriter] = set()
+        self._upstream: Optional[asyncio.StreamWriter] = None
+        self._follower: Optional[asyncio.Task] = None
+        self._backlog: deque = deque()
+        self._running = False
+        self._stats = {"published": 0, "received": 0, "relayed": 0, "commands": 0, "send_errors": 0,
+                       "backlog_dropped": 0, "leader_changes": 0}
+
+    async def start(self, on_leader: Optional[Callable[[], Awaitable[None]]] = None,
+                    on_command: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None):
+        """Become the leader if no other worker is, otherwise follow it"""
+        self._on_leader = on_leader
+        self._on_command = on_command
+        self._running = True
+        if not self.enabled:
+            # A single process is its own leader
+            await self._lead(serve=False)
+            return
+        if self._try_lock():
+            await self._lead()
+        else:
+            logger.info(f"Following event bus leader on {self.socket_path}")
+            self._follower = asyncio.create_task(self._follow())
+
+    async def stop(self):
+        self._running = False
+        if self._follower is not None:
+            self._follower.cancel()
+            self._follower = None
+        if self._upstream is not None:
+            self._upstream.close()
+            self._upstream = None
+        for writer in list(self._peers):
+            writer.close()
+        self._peers.clear()
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def publish(self, attacks: List[Attack]):
+        """Share attacks this process has just stored with every worker, this one included"""
+        if not attacks:
+            return
+        self._stats["published"] += len(attacks)
+        # Other workers skip cache updates for attacks their caches were built after
+        self._forward(attacks, {"origin": os.getpid(), "stored_at": time.time()})
+
+    def command(self, command: Dict[str, Any]):
+        """Run a command in the leader, wherever it is"""
+        if self.is_leader:
+            self._run_command(command)
+        elif self._upstream is not None:
+            self._send(self._upstream, encode_command(command))
+        else:
+            self._hold(("command", command, None))
+
+    def _forward(self, attacks: List[Attack], fields: Dict[str, Any]):
+        if self.is_leader:
+            self._sequence(attacks, fields)
+        elif self._upstream is not None:
+            self._send(self._upstream, encode_attacks(attacks, **fields))
+        else:
+            self._hold(("attacks", attacks, fields))
+
+    def _sequence(self, attacks: List[Attack], fields: Dict[str, Any]):
+        """Number a batch, deliver it here and send it to every follower (leader only)"""
+        first_seq = self.seq + 1
+        self.seq += len(attacks)
+        self._deliver(attacks, first_seq, self.epoch, fields)
+        message = encode_attacks(attacks, **fields, epoch=self.epoch, seq=first_seq)
+        for writer in list(self._peers):
+            self._send(writer, message)
+            self._stats["relayed"] += 1
+
+    def _deliver(self, attacks: List[Attack], first_seq: int, epoch: str, fields: Dict[str, Any]):
+        self.deliver(attacks, first_seq, epoch)
+        if attacks and self.on_remote is not None and fields.get("origin") != os.getpid():
+            self.on_remote(attacks, fields.get("stored_at"))
+
+    def _hold(self, item):
+        # Until a leader is reachable; sent on (re)connect or handled on taking over
+        if len(self._backlog) >= MAX_BACKLOG_MESSAGES:
+            self._backlog.popleft()
+            self._stats["backlog_dropped"] += 1
+        self._backlog.append(item)
+
+    def _flush_backlog(self):
+        while self._backlog and (self.is_leader or self._upstream is not None):
+            kind, payload, fields = self._backlog.popleft()
+            if kind == "attacks":
+                self._forward(payload, fields)
+            else:
+                self.command(payload)
+
+    def _run_command(self, command: Dict[str, Any]):
+        self._stats["commands"] += 1
+        if self._on_command is not None:
+            asyncio.ensure_future(self._on_command(command)).add_done_callback(self._command_done)
+
+    @staticmethod
+    def _command_done(task: asyncio.Future):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Event bus command failed: {task.exception()}")
+
+    def _try_lock(self) -> bool:
+        os.makedirs(os.path.dirname(os.path.abspath(self.socket_path)), exist_ok=True)
+        fd = os.open(f"{self.socket_path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    def _bind_private(self) -> socket.socket:
+        """Bind the listening socket so only this user can ever connect to it
+
+        The socket is bound under a temporary name, restricted to 0o600
+        and then renamed into place, so there is no moment where it is
+        reachable with the umask's permissions.
+        """
+        temp_path = f"{self.socket_path}.{os.getpid()}.tmp"
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            try:
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
+            sock.bind(temp_path)
+            os.chmod(temp_path, 0o600)
+            os.rename(temp_path, self.socket_path)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    async def _lead(self, serve: bool = True):
+        self.is_leader = True
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self._stats["leader_changes"] += 1
+        # Local clients switch to the new numbering right away
+        self.deliver([], 1, self.epoch)
+        if serve:
+            # Renaming over the path also replaces a socket file left by a dead leader
+            self._server = await asyncio.start_unix_server(
+                self._serve_peer, sock=self._bind_private(), limit=MAX_MESSAGE_BYTES
+            )
+            logger.info(f"Leading event bus on {self.socket_path} (pid {os.getpid()}, epoch {self.epoch})")
+        self._flush_backlog()
+        if self._on_leader is not None:
+            try:
+                await self._on_leader()
+            except Exception as e:
+                logger.error(f"Failed to start leader tasks: {e}")
+
+    async def _follow(self):
+        while self._running:
+            if self._try_lock():
+                logger.info("Event bus leader is gone, taking over")
+                await self._lead()
+                return
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.socket_path, limit=MAX_MESSAGE_BYTES)
+            except OSError:
+                # The leader is starting up or has just died
+                await asyncio.sleep(0.2 + random.random() * 0.3)
+                continue
+
+            self._upstream = writer
+            self._flush_backlog()
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    self._receive(line)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Lost event bus leader connection: {e}")
+            finally:
+                self._upstream = None
+                writer.close()
+            await asyncio.sleep(random.random() * 0.3)
+
+    async def _serve_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._peers.add(writer)
+        # Tell the follower which epoch and seq it is joining
+        self._send(writer, encode_attacks([], epoch=self.epoch, seq=self.seq + 1))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = self._decode(line)
+                if message is None:
+                    continue
+                if message.get("type") == "attacks":
+                    self._stats["received"] += len(message["attacks"])
+                    fields = {"origin": message.get("origin"), "stored_at": message.get("stored_at")}
+                    self._sequence(message["attacks"], fields)
+                elif message.get("type") == "command":
+                    self._run_command(message["command"])
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropped event bus peer: {e}")
+        except asyncio.CancelledError:
+            # Shutting down
+            pass
+        finally:
+            self._peers.discard(writer)
+            writer.close()
+
+    def _receive(self, line: bytes):
+        """Handle a numbered batch from the leader (follower only)"""
+        message = self._decode(line)
+        if message is None or message.get("type") != "attacks":
+            return
+        attacks = message["attacks"]
+        self._stats["received"] += len(attacks)
+        self.epoch = message["epoch"]
+        self.seq = message["seq"] + len(attacks) - 1
+        self._deliver(attacks, message["seq"], message["epoch"], message)
+
+    def _decode(self, line: bytes) -> Optional[Dict[str, Any]]:
+        try:
+            return decode_message(line)
+        except Exception as e:
+            logger.error(f"Ignoring malformed event bus message: {e}")
+            return None
+
+    def _send(self, writer: asyncio.StreamWriter, message: bytes):
+        if writer.is_closing() or writer.transport.get_write_buffer_size() > MAX_PEER_BUFFER_BYTES:
+            self._stats["send_errors"] += 1
+            writer.close()
+            self._peers.discard(writer)
+            return
+        writer.write(message)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "pid": os.getpid(),
+            "role": "leader" if self.is_leader else "follower",
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "peers": len(self._peers),
+            "connected": self.is_leader or self._upstream is not None,
+            "backlog": len(self._backlog),
+            **self._stats,
+        }
+
+
+class EventBusClient:
+    """Publishes attacks to a running server's event bus from another process
+
+    Used by tools such as the backfill command that store attacks outside
+    the API workers. Messages relayed back by the leader are discarded.
+    Does nothing if no server is listening.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None):
+        self.socket_path = socket_path or os.getenv("HONEYPOT_EVENT_BUS_SOCKET", "./data/eventbus.sock")
+        self._sock: Optional[socket.socket] = None
+        if not hasattr(socket, "AF_UNIX"):
+            return
+        try:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.socket_path)
+        except OSError:
+            return
+        self._sock = sock
+        threading.Thread(target=self._discard, name="event-bus-client", daemon=True).start()
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def publish(self, attacks: List[Attack]):
+        if self._sock is None or not attacks:
+            return
+        try:
+            self._sock.sendall(encode_attacks(attacks, origin=os.getpid(), stored_at=time.time()))
+        except OSError as e:
+            logger.warning(f"Lost event bus connection: {e}")
+            self.close()
+
+    def _discard(self):
+        sock = self._sock
+        try:
+            while sock is not None and sock.recv(65536):
+                pass
+        except OSError:
+            pass
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
@@ -0,0 +1,173 @@
+# app/file_tailer.py
+import os
+import json
+import time
+import logging
+import threading
+from stat import S_ISREG
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bytes read per chunk; a line longer than this is skipped
+CHUNK_SIZE = 64 * 1024
+
+
+class TailOffsetStore:
+    """Read offsets of tailed files, keyed by path and checkpointed to a JSON file"""
+
+    def __init__(self, path: str = "./data/log_offsets.json", flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        try:
+            with open(path, "r") as f:
+                self._offsets: Dict[str, List[int]] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._offsets = {}
+
+    def get(self, file_path: str) -> Optional[Tuple[int, int]]:
+        """(inode, offset) last recorded for a file"""
+        entry = self._offsets.get(file_path)
+        return (entry[0], entry[1]) if entry else None
+
+    def set(self, file_path: str, inode: int, offset: int):
+        with self._lock:
+            self._offsets[file_path] = [inode, offset]
+            self._dirty = True
+
+    def maybe_flush(self):
+        """Flush if the last checkpoint is older than the flush interval"""
+        if self._dirty and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = f"{self.path}.tmp"
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(tmp_path, "w") as f:
+                    json.dump(self._offsets, f)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError as e:
+                logger.error(f"Failed to save log offsets to {self.path}: {e}")
+            self._last_flush = time.monotonic()
+
+
+class FileTailer:
+    """Incrementally reads complete lines appended to one log file.
+
+    Reads go through bounded binary chunks and the offset only ever
+    advances past the last newline, so a partially written line is picked
+    up whole on the next read. A new inode at the path means the file was
+    rotated: the rest of the old file is drained (if it can still be found
+    in the same directory) and the new one is read from the start. A file
+    smaller than the saved offset was truncated and is re-read from the
+    start.
+    """
+
+    def __init__(self, path: str, offsets: TailOffsetStore, chunk_size: int = CHUNK_SIZE):
+        self.path = os.path.abspath(path)
+        self.offsets = offsets
+        self.chunk_size = chunk_size
+        # Set when the last read stopped at max_chunks before the end of the file
+        self.has_more = False
+
+    def read_lines(self, max_chunks: Optional[int] = None) -> Iterator[List[str]]:
+        """Yield batches of new complete lines, checkpointing each once the next is requested"""
+        self.has_more = False
+        try:
+            stat = os.lstat(self.path)
+        except FileNotFoundError:
+            return
+        if not S_ISREG(stat.st_mode):
+            # The honeypot can write to its log directory, so symlinks are never followed
+            logger.warning(f"Not tailing {self.path}: not a regular file")
+            return
+
+        saved = self.offsets.get(self.path)
+        offset = 0
+        if saved:
+            inode, saved_offset = saved
+            if inode != stat.st_ino:
+                logger.info(f"{self.path} was rotated, draining the previous file first")
+                rotated = self._find_rotated(inode)
+                if rotated:
+                    yield from self._read(rotated, inode, saved_offset, final=True, checkpoint=False)
+                self.offsets.set(self.path, stat.st_ino, 0)
+            elif stat.st_size < saved_offset:
+                logger.info(f"{self.path} was truncated, reading it from the start")
+                self.offsets.set(self.path, stat.st_ino, 0)
+            else:
+                offset = saved_offset
+
+        yield from self._read(self.path, stat.st_ino, offset, max_chunks=max_chunks)
+
+    def _read(self, path: str, inode: int, offset: int, final: bool = False,
+              checkpoint: bool = True, max_chunks: Optional[int] = None) -> Iterator[List[str]]:
+        chunks = 0
+        try:
+            fd = os.open(path, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
+        except OSError as e:
+            logger.warning(f"Cannot open {path}: {e}")
+            return
+        with os.fdopen(fd, "rb") as f:
+            f.seek(offset)
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    return
+
+                end = chunk.rfind(b"\n")
+                if end == -1:
+                    if len(chunk) < self.chunk_size:
+                        # Partial line at EOF; a rotated file will never be completed
+                        if final:
+                            yield [chunk.decode("utf-8", errors="replace")]
+                        return
+                    offset = self._skip_long_line(f, offset + len(chunk))
+                    if offset is None:
+                        return
+                else:
+                    offset += end + 1
+                    # Resumes only when the caller is done with the batch
+                    yield chunk[:end].decode("utf-8", errors="replace").splitlines()
+
+                if checkpoint:
+                    self.offsets.set(self.path, inode, offset)
+                chunks += 1
+                if max_chunks and chunks >= max_chunks:
+                    self.has_more = True
+                    return
+                f.seek(offset)
+
+    def _skip_long_line(self, f, position: int) -> Optional[int]:
+        """Skip past a line longer than a chunk, returning the offset after it"""
+        while True:
+            chunk = f.read(self.chunk_size)
+            if not chunk:
+                # Still being written; retry from its start next time
+                return None
+            newline = chunk.find(b"\n")
+            if newline != -1:
+                logger.warning(f"Skipped a log line over {self.chunk_size} bytes in {self.path}")
+                return position + newline + 1
+            position += len(chunk)
+
+    def _find_rotated(self, inode: int) -> Optional[str]:
+        """Path of the file in the same directory that still has a given inode"""
+        directory = os.path.dirname(self.path)
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if (entry.is_file(follow_symlinks=False) and entry.inode() == inode
+                            and entry.path != self.path):
+                        return entry.path
+        except OSError:
+            pass
+        return None
@@ -1,15 +1,22 @@
 # app/honeypot.py
 from fastapi import APIRouter, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Dict, Any, Optional
 import logging
 import asyncio
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from .models import Honeypot, HoneypotCreate, Attack, AttackList
-from .docker_service import DockerService
-from .database import DatabaseService
-from .auth import get_current_user
+from .models import Honeypot, HoneypotCreate, Attack, AttackList, AttackIngest, AttackChanges
+from .docker_service import DockerService, INGEST_MODE
+from .database import DatabaseService, encode_cursor, HISTOGRAM_BUCKETS
+from .storage import to_naive_utc
+from .ingest import save_attack_data, IngestionPipeline
+from .log_streamer import LogStreamManager
+from .attack_detector import AttackDetector
+from .broadcaster import AttackBroadcaster
+from .event_bus import EventBus
+from .api_tokens import require_token
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -18,8 +25,71 @@ logger = logging.getLogger(__name__)
 docker_service = DockerService()
 db_service = DatabaseService()
 
-# WebSocket connections for real-time attack notifications
-active_connections: set = set()
+# Upper bound on the number of buckets a histogram request may span
+MAX_HISTOGRAM_BUCKETS = 10000
+
+# Longest a change-feed request may block waiting for new attacks
+MAX_CHANGES_WAIT_SECONDS = 60
+
+# WebSocket clients for real-time attack notifications, each with its own send queue
+attack_broadcaster = AttackBroadcaster()
+
+# Shares new attacks with the other API worker processes so all their clients see them
+event_bus = EventBus(attack_broadcaster.publish, on_remote=db_service.apply_remote_attacks)
+
+# Producers queue parsed attacks here; a writer task saves them in batches and notifies clients
+ingest_pipeline = IngestionPipeline(db_service, event_bus.publish)
+
+# Live container log streams feeding the ingestion pipeline
+log_streams = LogStreamManager(docker_service, ingest_pipeline)
+
+# Tails bind-mounted honeypot log files when HONEYPOT_INGEST_MODE=file
+attack_detector = AttackDetector(
+    attack_callback=lambda attacks: ingest_pipeline.submit_threadsafe(attacks, timeout=None)
+)
+
+def start_log_ingestion(honeypot: Honeypot):
+    """Follow a honeypot's logs live: tail its log files if they are mounted, else stream docker logs"""
+    if INGEST_MODE == "file" and honeypot.status == "active" and honeypot.container_id:
+        log_dir = docker_service.get_log_mount(honeypot.container_id)
+        if log_dir:
+            attack_detector.add_honeypot(honeypot.id, honeypot.type, log_dir)
+            return
+    log_streams.start(honeypot)
+
+def stop_log_ingestion(honeypot_id: str):
+    attack_detector.remove_honeypot(honeypot_id)
+    log_streams.stop(honeypot_id)
+
+def is_ingesting_live(honeypot_id: str) -> bool:
+    """Whether a honeypot's attacks already arrive without polling"""
+    return log_streams.is_streaming(honeypot_id) or attack_detector.is_watching(honeypot_id)
+
+def reconcile_log_ingestion(honeypots: List[Honeypot]):
+    """Follow the logs of every running honeypot and stop following the rest
+    
+    Only the event bus leader ingests logs; other workers ask it to
+    reconcile with request_log_ingestion().
+    """
+    running = {h.id for h in honeypots if h.status == "active" and h.container_id}
+    for honeypot_id in set(log_streams.honeypot_ids()) | set(attack_detector.watchers):
+        if honeypot_id not in running:
+            stop_log_ingestion(honeypot_id)
+    for honeypot in honeypots:
+        if honeypot.id in running and not is_ingesting_live(honeypot.id):
+            start_log_ingestion(honeypot)
+
+def request_log_ingestion():
+    """Have the event bus leader pick up deployed, deleted or recovered honeypots"""
+    event_bus.command({"type": "reconcile_ingestion"})
+
+async def handle_bus_command(command: Dict[str, Any]):
+    """Run a command another worker sent to the event bus leader"""
+    if command.get("type") == "reconcile_ingestion":
+        honeypots = await run_in_threadpool(db_service.get_all_honeypots)
+        await run_in_threadpool(reconcile_log_ingestion, honeypots)
+    else:
+        logger.warning(f"Unknown event bus command: {command}")
 
 @router.post("/honeypots", response_model=Honeypot)
 async def create_honeypot(honeypot: HoneypotCreate):
@@ -76,6 +146,9 @@ async def deploy_honeypot(honeypot_id: str):
     # Update in database
     db_service.update_honeypot(honeypot)
     
+    # Start following its logs
+    request_log_ingestion()
+    
     logger.info(f"Deployed honeypot {honeypot_id} with status {honeypot.status}")
     return honeypot
 
@@ -92,8 +165,9 @@ async def delete_honeypot(honeypot_id: str):
     if honeypot.container_id:
         docker_service.stop_honeypot(honeypot.container_id)
     
-    # Remove from database
+    # Remove from database, then stop following its logs
     db_service.delete_honeypot(honeypot_id)
+    request_log_ingestion()
     
     return {"success": True}
 
@@ -101,7 +175,9 @@ async def delete_honeypot(honeypot_id: str):
 async def get_honeypot_attacks(
         honeypot_id: str, 
         limit: int = Query(50, ge=1, le=1000),
-        offset: int = Query(0, ge=0)
+        offset: int = Query(0, ge=0),
+        before: Optional[str] = None,
+        after: Optional[str] = None
     ):
         """
         Get attacks for a specific honeypot
@@ -115,11 +191,30 @@ async def get_honeypot_attacks(
             raise HTTPException(status_code=404, detail="Honeypot not found")
         
         # Get attacks from database
-        attacks = db_service.get_attacks(honeypot_id=honeypot_id, limit=limit, offset=offset)
-        logger.info(f"Retrieved {len(attacks)} attacks for honeypot {honeypot_id}")
-        
-        # Create the response with both attacks and total count
-        return AttackList(attacks=attacks, total=len(attacks))
+        page = _get_attack_page(honeypot_id, limit, offset, before, after)
+        logger.info(f"Retrieved {len(page.attacks)} attacks for honeypot {honeypot_id}")
+        return page
+
+def _get_attack_page(honeypot_id: Optional[str], limit: int, offset: int,
+                     before: Optional[str], after: Optional[str]) -> AttackList:
+    """Read one page of attacks along with cursors and the true total"""
+    try:
+        attacks = db_service.get_attacks(
+            honeypot_id=honeypot_id,
+            limit=limit,
+            offset=offset,
+            before=before,
+            after=after
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return AttackList(
+        attacks=attacks,
+        total=db_service.count_attacks(honeypot_id),
+        next_cursor=encode_cursor(attacks[-1]) if len(attacks) == limit else None,
+        prev_cursor=encode_cursor(attacks[0]) if attacks else None
+    )
     
 @router.post("/honeypots/{honeypot_id}/sync-attacks")
 async def sync_attacks(honeypot_id: str):
@@ -135,60 +230,78 @@ async def sync_attacks(honeypot_id: str):
     if honeypot.status != "active" or not honeypot.container_id:
         raise HTTPException(status_code=400, detail="Honeypot is not active")
     
-    # Get attacks from container logs
-    attacks_data = docker_service.get_attacks_from_container(
+    # Get attacks from container logs (blocking docker call, kept off the event loop)
+    attacks_data, log_cursor = await run_in_threadpool(
+        docker_service.get_attacks_from_container,
         honeypot.container_id, 
         honeypot_id,
         honeypot.type
     )
     
-    # Save attacks to database
-    new_attacks = 0
-    for attack_data in attacks_data:
-        # Create attack object
-        attack = Attack(
-            id=str(uuid.uuid4()),
-            honeypot_id=attack_data["honeypot_id"],
-            source_ip=attack_data["source_ip"],
-            attack_type=attack_data["attack_type"],
-            username=attack_data.get("username"),
-            password=attack_data.get("password"),
-            timestamp=datetime.fromisoformat(attack_data["timestamp"]) 
-                if isinstance(attack_data["timestamp"], str) else attack_data["timestamp"],
-            details=attack_data.get("details", {})
-        )
-        
-        # Save to database
-        db_service.save_attack(attack)
-        new_attacks += 1
-        
-        # Notify WebSocket clients
-        if active_connections:
-            for connection in list(active_connections):
-                try:
-                    await connection.send_json(attack.dict())
-                except Exception:
-                    active_connections.discard(connection)
+    # Save attacks to database in one bulk pass, then move the log checkpoint past them
+    new_attacks = await run_in_threadpool(save_attack_data, attacks_data, db_service)
+    await run_in_threadpool(docker_service.commit_log_cursor, honeypot.container_id, log_cursor)
+    
+    # Notify WebSocket clients about the new ones
+    event_bus.publish(new_attacks)
     
     # Update honeypot count
     honeypot = db_service.get_honeypot(honeypot_id)
     
     return {
         "success": True,
-        "new_attacks": new_attacks,
+        "new_attacks": len(new_attacks),
         "total_attacks": honeypot.attack_count
     }
 
 @router.get("/attacks", response_model=AttackList)
 async def get_all_attacks(
-    limit: int = Query(50, ge=1, le=1000),
-    offset: int = Query(0, ge=0)
-):
+        limit: int = Query(50, ge=1, le=1000),
+        offset: int = Query(0, ge=0),
+        honeypot_id: Optional[str] = None,
+        before: Optional[str] = None,
+        after: Optional[str] = None
+    ):
+        """
+        Get all attacks or filter by honeypot_id
+        
+        Page with the returned cursors: ``before=next_cursor`` for older
+        attacks and ``after=prev_cursor`` for newer ones.
+        """
+        return _get_attack_page(honeypot_id, limit, offset, before, after)
+
+@router.get("/attacks/changes", response_model=AttackChanges)
+async def get_attack_changes(
+        since: Optional[int] = Query(None, ge=0),
+        wait: float = Query(0, ge=0, le=MAX_CHANGES_WAIT_SECONDS),
+        limit: int = Query(100, ge=1, le=1000),
+        honeypot_id: Optional[str] = None
+    ):
     """
-    Get all attacks
+    Get attacks ingested after a cursor, oldest first
+
+    Pass the returned ``cursor`` as ``since`` on the next call; without
+    ``since`` the feed starts at the newest attack. With ``wait``, the
+    request blocks for up to that many seconds until new attacks arrive.
     """
-    attacks = db_service.get_attacks(limit=limit, offset=offset)
-    return AttackList(attacks=attacks)
+    feed = db_service.get_change_feed()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    if since is None:
+        since = await run_in_threadpool(db_service.latest_change_cursor)
+    while True:
+        # Register before reading so an insert in between still wakes this request
+        waiter = feed.register()
+        try:
+            attacks, cursor = await run_in_threadpool(db_service.get_attack_changes, since, limit, honeypot_id)
+            remaining = deadline - loop.time()
+            if attacks or remaining <= 0:
+                return AttackChanges(attacks=attacks, cursor=cursor, has_more=len(attacks) >= limit)
+            # Nothing matched yet, but later polls can start past what was scanned
+            since = cursor
+            await feed.wait(waiter, remaining)
+        finally:
+            feed.unregister(waiter)
 
 @router.get("/attacks/stats")
 async def get_attack_statistics(days: int = Query(7, ge=1, le=30)):
@@ -197,6 +310,59 @@ async def get_attack_statistics(days: int = Query(7, ge=1, le=30)):
     """
     return db_service.get_attack_stats(days=days)
 
+@router.get("/attacks/histogram")
+async def get_attack_histogram(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bucket: str = Query("hour", regex="^(minute|hour|day)$"),
+    group_by: Optional[str] = Query(None, description="Comma-separated: attack_type, honeypot_id"),
+    honeypot_id: Optional[str] = None
+):
+    """
+    Get attack counts per minute, hour or day over a time range
+    (default: the last 7 days), optionally grouped by attack type and/or honeypot
+    """
+    # Attack timestamps are naive UTC
+    end = to_naive_utc(end) if end else datetime.utcnow()
+    start = to_naive_utc(start) if start else end - timedelta(days=7)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    
+    bucket_seconds = HISTOGRAM_BUCKETS[bucket]
+    if (end - start).total_seconds() / bucket_seconds > MAX_HISTOGRAM_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range too large for {bucket} buckets (max {MAX_HISTOGRAM_BUCKETS} buckets)"
+        )
+    
+    fields = [f.strip() for f in group_by.split(",") if f.strip()] if group_by else []
+    try:
+        buckets = db_service.get_attack_histogram(start, end, bucket, fields, honeypot_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "bucket": bucket,
+        "group_by": fields,
+        "buckets": buckets
+    }
+
+@router.get("/attacks/stats/top")
+async def get_top_attackers(
+    honeypot_id: Optional[str] = None,
+    days: int = Query(7, ge=1, le=30),
+    k: int = Query(10, ge=1, le=50)
+):
+    """
+    Get top source IPs, usernames, passwords and credential pairs plus the
+    number of distinct attackers, optionally for a single honeypot
+    """
+    if honeypot_id and not db_service.get_honeypot(honeypot_id):
+        raise HTTPException(status_code=404, detail="Honeypot not found")
+    return db_service.get_top_attackers(days=days, honeypot_id=honeypot_id, k=k)
+
 @router.post("/recover")
 async def recover_honeypots():
     """
@@ -230,6 +396,9 @@ async def recover_honeypots():
                 # Update in database
                 db_service.update_honeypot(honeypot)
         
+        # Follow the logs of every honeypot that is still running
+        request_log_ingestion()
+        
         return {
             "recovered": updated_count,
             "total": len(honeypots)
@@ -242,16 +411,24 @@ async def recover_honeypots():
 async def websocket_endpoint(websocket: WebSocket):
     """
     WebSocket for real-time attack notifications
+
+    Clients get every attack until they send a subscription such as
+    {"type": "subscribe", "honeypot_ids": [...], "attack_types": [...], "source_cidrs": [...]};
+    the server answers with {"type": "subscribed", ...} or {"type": "error", ...}.
     """
-    await websocket.accept()
-    active_connections.add(websocket)
+    await attack_broadcaster.connect(websocket)
     
     try:
         while True:
-            # Keep connection alive with ping/pong
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        active_connections.discard(websocket)
+            message = await websocket.receive_text()
+            # Plain "ping" messages just keep the connection alive
+            if message != "ping":
+                attack_broadcaster.handle_message(websocket, message)
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the broadcaster already closed a slow client
+        pass
+    finally:
+        await attack_broadcaster.disconnect(websocket)
 
 @router.post("/test/add-attack", response_model=Attack)
 async def add_test_attack(honeypot_id: str):
@@ -273,19 +450,57 @@ async def add_test_attack(honeypot_id: str):
         details={"note": "This is a test attack"}
     )
     
-    # Save to database
-    db_service.save_attack(attack)
+    # Save to database; a duplicate is not saved and not announced
+    saved = db_service.save_attack(attack)
     
     # Notify WebSocket clients
-    if active_connections:
-        for connection in list(active_connections):
-            try:
-                await connection.send_json(attack.dict())
-            except Exception:
-                active_connections.discard(connection)
+    if saved:
+        event_bus.publish([saved])
     
     return attack
 
+@router.post("/ingest/attacks", status_code=202,
+             dependencies=[Depends(require_token("HONEYPOT_INGEST_TOKEN"))])
+async def ingest_attacks(attacks: List[AttackIngest]):
+    """
+    Queue externally detected attacks for saving
+    
+    Ingest clients authenticate with HONEYPOT_INGEST_TOKEN as a bearer token.
+    Rejects the whole request with 429 when the ingestion queue can't hold it.
+    """
+    if not ingest_pipeline.running:
+        raise HTTPException(status_code=503, detail="Ingestion pipeline is not running")
+    
+    honeypot_ids = {attack.honeypot_id for attack in attacks}
+    unknown = [h for h in honeypot_ids if not db_service.get_honeypot(h)]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown honeypot(s): {', '.join(sorted(unknown))}")
+    
+    if ingest_pipeline.capacity_left() < len(attacks):
+        raise HTTPException(
+            status_code=429,
+            detail="Ingestion queue is full, retry later",
+            headers={"Retry-After": "1"}
+        )
+    
+    accepted = ingest_pipeline.offer(
+        attack.dict(exclude_none=True) for attack in attacks
+    )
+    return {"accepted": accepted}
+
+@router.get("/ingest/metrics")
+async def get_ingest_metrics():
+    """
+    Get ingestion queue depth, batch and drop counters, plus file-tail worker
+    and WebSocket fan-out stats, plus this worker's event bus role
+    """
+    return {
+        **ingest_pipeline.metrics(),
+        "file_tail": attack_detector.metrics(),
+        "websocket": attack_broadcaster.metrics(),
+        "event_bus": event_bus.metrics()
+    }
+
 @router.get("/honeypots/{honeypot_id}/attack-stats")
 async def get_honeypot_attack_stats(honeypot_id: str, days: int = Query(7, ge=1, le=30)):
     """
@@ -296,57 +511,8 @@ async def get_honeypot_attack_stats(honeypot_id: str, days: int = Query(7, ge=1,
     if not honeypot:
         raise HTTPException(status_code=404, detail="Honeypot not found")
     
-    # Get attacks for this honeypot
-    all_attacks = db_service.get_attacks(honeypot_id=honeypot_id, limit=1000)
-    
-    # Calculate cutoff time (days ago)
-    cutoff = datetime.now().timestamp() - (days * 86400)
-    
-    # Filter to recent attacks only
-    recent_attacks = [a for a in all_attacks if a.timestamp.timestamp() > cutoff]
-    
-    # Group by day
-    attacks_by_day = {}
-    for attack in recent_attacks:
-        day = attack.timestamp.strftime("%Y-%m-%d")
-        if day not in attacks_by_day:
-            attacks_by_day[day] = 0
-        attacks_by_day[day] += 1
-    
-    # Group by hour (for last 24 hours)
-    hourly_cutoff = datetime.now().timestamp() - 86400
-    recent_hourly = [a for a in all_attacks if a.timestamp.timestamp() > hourly_cutoff]
-    attacks_by_hour = {}
-    for attack in recent_hourly:
-        hour = attack.timestamp.strftime("%Y-%m-%d %H:00")
-        if hour not in attacks_by_hour:
-            attacks_by_hour[hour] = 0
-        attacks_by_hour[hour] += 1
+    return db_service.get_honeypot_attack_stats(honeypot_id, days=days)
     
-    return {
-        "total": len(recent_attacks),
-        "by_day": attacks_by_day,
-        "by_hour": attacks_by_hour
-    }
-    
-@router.get("/attacks", response_model=AttackList)
-async def get_all_attacks(
-        limit: int = Query(50, ge=1, le=1000),
-        offset: int = Query(0, ge=0),
-        honeypot_id: Optional[str] = None
-    ):
-        """
-        Get all attacks or filter by honeypot_id
-        """
-        attacks = db_service.get_attacks(
-            honeypot_id=honeypot_id, 
-            limit=limit, 
-            offset=offset
-        )
-        
-        return AttackList(attacks=attacks, total=len(attacks))
-    
-
 @router.post("/simulate-attack")
 async def simulate_attack(request):
     """
@@ -360,7 +526,7 @@ async def simulate_attack(request):
     attack_id = str(uuid.uuid4())
     
     # Set timestamp if not provided
-    timestamp = request.timestamp if request.timestamp else datetime.now().isoformat()
+    timestamp = request.timestamp if request.timestamp else datetime.utcnow().isoformat()
     
     # Generate random source IP if not provided
     source_ip = request.source_ip
@@ -0,0 +1,269 @@
+# app/ingest.py
+import os
+import time
+import uuid
+import asyncio
+import logging
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Iterable, Union, Callable, Optional
+
+from .models import Attack
+from .storage import to_naive_utc
+
+logger = logging.getLogger(__name__)
+
+# Backoff between attempts to save a batch that failed, doubling up to the max
+SAVE_RETRY_DELAY = 0.1
+SAVE_RETRY_MAX_DELAY = 5.0
+
+
+def build_attack(attack_data: Dict[str, Any], db_service) -> Attack:
+    """Create an Attack from an attack dict produced by a log parser"""
+    # Parse the timestamp correctly
+    timestamp = attack_data.get("timestamp")
+    if not isinstance(timestamp, datetime):
+        try:
+            timestamp = datetime.fromisoformat(timestamp)
+        except (ValueError, TypeError):
+            timestamp = datetime.utcnow()
+
+    return Attack(
+        id=str(uuid.uuid4()),
+        honeypot_id=attack_data["honeypot_id"],
+        source_ip=attack_data["source_ip"],
+        attack_type=attack_data["attack_type"],
+        username=attack_data.get("username"),
+        password=attack_data.get("password"),
+        timestamp=to_naive_utc(timestamp),
+        details=attack_data.get("details", {}),
+        attack_hash=db_service._get_attack_hash(attack_data)
+    )
+
+
+def save_attack_data(attacks_data: Iterable[Union[Dict[str, Any], Attack]], db_service) -> List[Attack]:
+    """Build and bulk-save parsed attacks, returning only the new ones"""
+    attacks = []
+    for attack_data in attacks_data:
+        if isinstance(attack_data, Attack):
+            attacks.append(attack_data)
+            continue
+        try:
+            attacks.append(build_attack(attack_data, db_service))
+        except Exception as e:
+            logger.error(f"Skipping malformed attack data {attack_data}: {e}")
+    return db_service.save_attacks(attacks)
+
+
+class IngestionPipeline:
+    """Bounded queue between attack producers and a micro-batching writer.
+
+    Producers enqueue parsed attack dicts (or Attack models). A single
+    writer task drains the queue in batches of up to ``batch_size``,
+    flushing early after ``flush_interval`` seconds, saves each batch on
+    a dedicated thread and passes the new attacks to ``notify``, which
+    must return quickly (it runs on the event loop).
+
+    When the queue is full, ``submit`` waits, ``offer`` drops and
+    ``submit_threadsafe`` blocks its thread for up to ``timeout`` and
+    then drops. Producers that checkpoint their read position pass
+    ``timeout=None`` to wait for as long as the pipeline runs, and only
+    advance the checkpoint when every attack was accepted. Dropped
+    attacks are counted in ``metrics()``.
+
+    Accepted attacks may already be behind a producer's checkpoint, so a
+    batch that fails to save is retried with backoff until it is saved
+    or the pipeline stops; meanwhile the queue fills up and producers wait.
+    """
+
+    def __init__(self, db_service, notify: Callable[[List[Attack]], None],
+                 max_queue: Optional[int] = None, batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None):
+        self.db_service = db_service
+        self.notify = notify
+        self.max_queue = max_queue or int(os.getenv("HONEYPOT_INGEST_QUEUE_SIZE", "10000"))
+        self.batch_size = batch_size or int(os.getenv("HONEYPOT_INGEST_BATCH_SIZE", "500"))
+        self.flush_interval = int(os.getenv("HONEYPOT_INGEST_FLUSH_MS", "100")) / 1000 \
+            if flush_interval is None else flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats = {
+            "enqueued": 0,
+            "dropped": 0,
+            "saved": 0,
+            "duplicates": 0,
+            "failed": 0,
+            "retries": 0,
+            "batches": 0,
+            "last_batch_size": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._writer is not None and not self._writer.done()
+
+    def start(self):
+        """Start the writer task on the running event loop"""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-writer")
+        self._writer = asyncio.create_task(self._write_batches())
+        logger.info(f"Ingestion pipeline started (queue={self.max_queue}, batch={self.batch_size})")
+
+    async def stop(self, timeout: float = 5.0):
+        """Flush what is queued, then stop the writer"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Ingestion pipeline stopped with {self._queue.qsize()} attacks unsaved")
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+        self._executor.shutdown(wait=True)
+        self._writer = None
+
+    def capacity_left(self) -> int:
+        return self.max_queue - self._queue.qsize() if self.running else 0
+
+    async def submit(self, attack):
+        """Enqueue one attack, waiting while the queue is full"""
+        await self._queue.put(attack)
+        self._stats["enqueued"] += 1
+
+    async def submit_many(self, attacks: Iterable) -> int:
+        count = 0
+        for attack in attacks:
+            await self.submit(attack)
+            count += 1
+        return count
+
+    def offer(self, attacks: Iterable) -> int:
+        """Enqueue without waiting, dropping what doesn't fit; returns the number accepted"""
+        accepted = 0
+        for attack in attacks:
+            try:
+                self._queue.put_nowait(attack)
+                accepted += 1
+            except asyncio.QueueFull:
+                self._stats["dropped"] += 1
+        self._stats["enqueued"] += accepted
+        return accepted
+
+    def submit_threadsafe(self, attacks: List, timeout: Optional[float] = 5.0) -> int:
+        """Enqueue from a producer thread (never the event loop thread)
+        
+        Returns how many attacks were enqueued, in order; the rest were
+        dropped. With ``timeout=None`` it only gives up when the pipeline
+        stops.
+        """
+        if not self.running or self._loop.is_closed():
+            self._stats["dropped"] += len(attacks)
+            return 0
+        progress = [0]
+        future = asyncio.run_coroutine_threadsafe(self._put_many(attacks, timeout, progress), self._loop)
+        while True:
+            try:
+                return future.result(timeout=1.0)
+            except concurrent.futures.TimeoutError:
+                if self.running:
+                    continue
+                future.cancel()
+                logger.warning(f"Ingestion pipeline stopped, dropped {len(attacks) - progress[0]} attacks")
+            except Exception as e:
+                logger.error(f"Failed to enqueue {len(attacks)} attacks: {e}")
+            self._stats["dropped"] += len(attacks) - progress[0]
+            return progress[0]
+
+    async def _put_many(self, attacks: List, timeout: Optional[float], progress: List[int]) -> int:
+        deadline = self._loop.time() + timeout if timeout is not None else None
+        for i, attack in enumerate(attacks):
+            if deadline is None:
+                await self._queue.put(attack)
+            else:
+                try:
+                    await asyncio.wait_for(self._queue.put(attack), max(0.0, deadline - self._loop.time()))
+                except asyncio.TimeoutError:
+                    self._stats["dropped"] += len(attacks) - i
+                    logger.warning(f"Ingestion queue full, dropped {len(attacks) - i} attacks")
+                    return i
+            self._stats["enqueued"] += 1
+            progress[0] = i + 1
+        return len(attacks)
+
+    async def _write_batches(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: List):
+        started = time.monotonic()
+        delay = SAVE_RETRY_DELAY
+        try:
+            while True:
+                try:
+                    new_attacks = await self._loop.run_in_executor(
+                        self._executor, save_attack_data, batch, self.db_service
+                    )
+                    break
+                except Exception as e:
+                    self._stats["retries"] += 1
+                    logger.error(f"Failed to save batch of {len(batch)} attacks, retrying in {delay:.1f}s: {e}")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, SAVE_RETRY_MAX_DELAY)
+        except asyncio.CancelledError:
+            self._stats["failed"] += len(batch)
+            logger.error(f"Ingestion pipeline stopped before a batch of {len(batch)} attacks was saved")
+            raise
+
+        stats = self._stats
+        stats["batches"] += 1
+        stats["saved"] += len(new_attacks)
+        stats["duplicates"] += len(batch) - len(new_attacks)
+        stats["last_batch_size"] = len(batch)
+        stats["last_flush_ms"] = round((time.monotonic() - started) * 1000, 2)
+
+        if new_attacks:
+            logger.debug(f"Saved {len(new_attacks)} new attacks from a batch of {len(batch)}")
+            try:
+                self.notify(new_attacks)
+            except Exception as e:
+                logger.error(f"Failed to notify clients about new attacks: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": int(self.flush_interval * 1000),
+            **self._stats,
+        }
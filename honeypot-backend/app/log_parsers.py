@@ -0,0 +1,292 @@
+# app/log_parsers.py
+import re
+import json
+import logging
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Iterable
+
+from .signatures import get_matcher
+
+logger = logging.getLogger(__name__)
+
+IP_RE = re.compile(r"(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})")
+ISO_TIME_RE = re.compile(r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})")
+
+
+class LogParser:
+    """Turns honeypot log lines into attack dicts.
+
+    Subclasses implement ``parse_line``; each one checks cheap literal
+    prefilters before running its precompiled pattern, so lines that
+    cannot match cost a few substring scans.
+    """
+
+    honeypot_type = "generic"
+
+    # File names a log watcher should tail for this honeypot type
+    log_files = ("*.log", "*.json")
+
+    def parse_line(self, line: str, honeypot_id: str) -> Optional[Dict[str, Any]]:
+        # Just capture any line with an IP address as an "activity" event
+        ip_match = IP_RE.search(line)
+        if not ip_match:
+            return None
+        return self._attack(honeypot_id, ip_match.group(1), "activity", line)
+
+    def parse_lines(self, lines: Iterable[str], honeypot_id: str) -> List[Dict[str, Any]]:
+        """Parse a batch of lines, skipping lines that fail to parse"""
+        attacks = []
+        parse_line = self.parse_line
+        for line in lines:
+            try:
+                attack = parse_line(line, honeypot_id)
+            except Exception as e:
+                logger.error(f"Error parsing {self.honeypot_type} log line: {e}")
+                continue
+            if attack is not None:
+                attacks.append(attack)
+        return attacks
+
+    @staticmethod
+    def _attack(honeypot_id: str, source_ip: str, attack_type: str, line: str,
+                timestamp: Optional[str] = None, **fields) -> Dict[str, Any]:
+        details = fields.pop("details", {})
+        details["raw_log"] = line.strip()
+        attack = {
+            "honeypot_id": honeypot_id,
+            "source_ip": source_ip,
+            "attack_type": attack_type,
+            "timestamp": timestamp or datetime.utcnow().isoformat(),
+            "details": details,
+        }
+        attack.update(fields)
+        return attack
+
+    @staticmethod
+    def _find_ip(line: str, default: str = "unknown") -> str:
+        ip_match = IP_RE.search(line)
+        return ip_match.group(1) if ip_match else default
+
+
+class CowrieLogParser(LogParser):
+    """SSH honeypot (Cowrie) text log lines and JSON events"""
+
+    honeypot_type = "ssh"
+
+    # The JSON event log carries the same logins as cowrie.log plus session details
+    log_files = ("cowrie.json",)
+
+    LOGIN_RE = re.compile(
+        r"login attempt \[(?:b'(?P<bu>[^']*)'|(?P<u>[^/\]]*))/(?:b'(?P<bp>[^']*)'|(?P<p>[^\]]*))\] "
+        r"(?P<result>failed|succeeded)"
+    )
+    TRANSPORT_IP_RE = re.compile(r"HoneyPotSSHTransport,\d+,([^\]\s]+)")
+
+    JSON_EVENTS = {
+        "cowrie.login.failed": "login_attempt",
+        "cowrie.login.success": "login_success",
+    }
+
+    def parse_line(self, line, honeypot_id):
+        if line.startswith("{"):
+            return self._parse_json(line, honeypot_id)
+        if "login attempt" not in line:
+            return None
+
+        match = self.LOGIN_RE.search(line)
+        if not match:
+            return None
+        username = match.group("bu") if match.group("bu") is not None else match.group("u")
+        password = match.group("bp") if match.group("bp") is not None else match.group("p")
+        attack_type = "login_attempt" if match.group("result") == "failed" else "login_success"
+
+        ip_match = self.TRANSPORT_IP_RE.search(line)
+        source_ip = ip_match.group(1) if ip_match else self._find_ip(line)
+        time_match = ISO_TIME_RE.search(line)
+
+        return self._attack(
+            honeypot_id, source_ip, attack_type, line,
+            timestamp=time_match.group(1) if time_match else None,
+            username=username, password=password
+        )
+
+    def _parse_json(self, line, honeypot_id):
+        """Parse a line of Cowrie's cowrie.json event stream"""
+        # Only login events are attacks; skip decoding everything else
+        if '"cowrie.login.' not in line:
+            return None
+        try:
+            event = json.loads(line)
+        except json.JSONDecodeError:
+            return None
+
+        attack_type = self.JSON_EVENTS.get(event.get("eventid"))
+        if attack_type is None:
+            return None
+
+        timestamp = event.get("timestamp")
+        if timestamp:
+            timestamp = timestamp.rstrip("Z")
+        return self._attack(
+            honeypot_id, event.get("src_ip", "unknown"), attack_type, line,
+            timestamp=timestamp,
+            username=event.get("username"),
+            password=event.get("password"),
+            details={
+                "protocol": event.get("protocol", "ssh"),
+                "session": event.get("session"),
+                "src_port": event.get("src_port"),
+                "sensor": event.get("sensor"),
+            }
+        )
+
+
+@lru_cache(maxsize=4096)
+def _convert_access_time(stamp: str) -> Optional[str]:
+    # strptime is slow and access log lines share timestamps, so results are cached
+    try:
+        parsed = datetime.strptime(stamp, "%d/%b/%Y:%H:%M:%S %z")
+    except ValueError:
+        return None
+    # Attack timestamps are naive UTC, like Cowrie's
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None).isoformat()
+
+
+class WebLogParser(LogParser):
+    """Web honeypot access log lines"""
+
+    honeypot_type = "web"
+
+    REQUEST_RE = re.compile(
+        r'(?P<ip>\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}).*?'
+        r'"(?P<method>GET|POST|PUT|DELETE|HEAD|OPTIONS|PATCH) (?P<path>[^ "]+)'
+    )
+    ACCESS_TIME_RE = re.compile(r"\[(\d{2}/\w{3}/\d{4}:\d{2}:\d{2}:\d{2} [+-]\d{4})\]")
+
+    def parse_line(self, line, honeypot_id):
+        if '"' not in line:
+            return None
+        match = self.REQUEST_RE.search(line)
+        if not match:
+            return None
+
+        # Request, referer and user agent are classified in one signature pass
+        attack_type, signatures = get_matcher().classify(line[match.start("method"):])
+        if attack_type is None:
+            return None
+
+        return self._attack(
+            honeypot_id, match.group("ip"), attack_type, line,
+            timestamp=self._access_time(line),
+            details={"method": match.group("method"), "path": match.group("path"), "signatures": signatures}
+        )
+
+    def _access_time(self, line) -> Optional[str]:
+        time_match = self.ACCESS_TIME_RE.search(line)
+        return _convert_access_time(time_match.group(1)) if time_match else None
+
+
+class FTPLogParser(LogParser):
+    """FTP honeypot (Pure-FTPd) log lines"""
+
+    honeypot_type = "ftp"
+
+    # Lines mentioning any of these count as authentication activity
+    KEYWORDS = ("authentication failed", "user", "password required", "unable to read", "indexed puredb")
+
+    USER_RE = re.compile(
+        r"User\s+(?P<ok>\S+)\s+OK|user\s*\[(?P<bracket>[^\]]+)\]|username[=:\s]+(?P<named>\S+)|User\s+(?P<plain>\S+)",
+        re.IGNORECASE
+    )
+    CLIENT_IP_RE = re.compile(r"\(\S*@([^)\s]+)\)")
+
+    def parse_line(self, line, honeypot_id):
+        lowered = line.lower()
+        if not any(keyword in lowered for keyword in self.KEYWORDS):
+            return None
+
+        username = "unknown"
+        user_match = self.USER_RE.search(line)
+        if user_match:
+            username = next(g for g in user_match.group("ok", "bracket", "named", "plain") if g is not None)
+
+        # Connection IPs are often missing from the logs, so fall back to a local source
+        ip_match = self.CLIENT_IP_RE.search(line)
+        source_ip = ip_match.group(1) if ip_match else self._find_ip(line, "127.0.0.1")
+
+        return self._attack(
+            honeypot_id, source_ip, "ftp_login_attempt", line,
+            username=username
+        )
+
+
+PARSERS = {
+    "ssh": CowrieLogParser(),
+    "web": WebLogParser(),
+    "ftp": FTPLogParser(),
+}
+GENERIC_PARSER = LogParser()
+
+
+def get_parser(honeypot_type: str) -> LogParser:
+    """Get the log parser for a honeypot type"""
+    return PARSERS.get((honeypot_type or "").lower(), GENERIC_PARSER)
+
+
+def parse_lines(honeypot_type: str, lines: Iterable[str], honeypot_id: str) -> List[Dict[str, Any]]:
+    return get_parser(honeypot_type).parse_lines(lines, honeypot_id)
+
+
+SAMPLE_LINES = {
+    "ssh": [
+        "2025-03-31T17:38:31.123456Z [HoneyPotSSHTransport,12,203.0.113.7] login attempt [b'root'/b'123456'] failed",
+        "2025-03-31T17:38:31.223456Z [HoneyPotSSHTransport,12,203.0.113.7] Remote SSH version: SSH-2.0-libssh2_1.9.0",
+        '{"eventid": "cowrie.login.failed", "username": "admin", "password": "admin", "src_ip": "198.51.100.4", '
+        '"session": "a1b2c3d4", "protocol": "ssh", "timestamp": "2025-03-31T17:38:32.000000Z"}',
+        '{"eventid": "cowrie.session.connect", "src_ip": "198.51.100.4", "session": "a1b2c3d4", "protocol": "ssh"}',
+    ],
+    "web": [
+        '203.0.113.9 - - [31/Mar/2025:17:38:31 +0000] "GET /wp-login.php HTTP/1.1" 404 153 "-" "curl/8.0"',
+        '203.0.113.9 - - [31/Mar/2025:17:38:32 +0000] "GET /index.html HTTP/1.1" 200 612 "-" "Mozilla/5.0"',
+        '203.0.113.9 - - [31/Mar/2025:17:38:33 +0000] "GET /item?id=1%20UNION%20SELECT%20pass%20FROM%20users HTTP/1.1" 200 10',
+    ],
+    "ftp": [
+        "(?@203.0.113.20) [WARNING] Authentication failed for user [root]",
+        "(?@203.0.113.20) [INFO] New connection from 203.0.113.20",
+        "(?@203.0.113.20) [INFO] Logout.",
+    ],
+    "generic": [
+        "connection from 203.0.113.30 port 4444",
+        "service heartbeat ok",
+    ],
+}
+
+
+def benchmark(lines_per_parser: int = 200_000):
+    """Measure parse throughput (lines/s) of each parser on sample log lines"""
+    import time
+
+    results = {}
+    for honeypot_type, samples in SAMPLE_LINES.items():
+        parser = get_parser(honeypot_type)
+        lines = (samples * (lines_per_parser // len(samples) + 1))[:lines_per_parser]
+        started = time.perf_counter()
+        attacks = parser.parse_lines(lines, "benchmark")
+        elapsed = time.perf_counter() - started
+        results[honeypot_type] = {
+            "lines": len(lines),
+            "attacks": len(attacks),
+            "seconds": round(elapsed, 3),
+            "lines_per_second": int(len(lines) / elapsed),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    for honeypot_type, result in benchmark(count).items():
+        print(f"{honeypot_type:8} {result['lines_per_second']:>10,} lines/s  "
+              f"({result['attacks']:,} attacks from {result['lines']:,} lines in {result['seconds']}s)")
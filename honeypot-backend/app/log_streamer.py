@@ -0,0 +1,184 @@
+# app/log_streamer.py
+import time
+import logging
+import threading
+from typing import Dict, Any, List, Callable
+
+import docker
+
+from .docker_service import DockerService, split_log_line, INGEST_MODE
+from .ingest import IngestionPipeline
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before reopening a log stream that ended or failed
+RECONNECT_DELAY = 5.0
+
+# Seconds between checkpoint writes while streaming
+CURSOR_FLUSH_INTERVAL = 1.0
+
+
+class ContainerLogStreamer:
+    """Follows one honeypot container's log stream in a daemon thread
+
+    ``on_attacks`` returns how many attacks were queued. The checkpoint
+    only moves past lines whose attacks were all queued; otherwise the
+    stream is reopened from the old checkpoint.
+    """
+
+    def __init__(self, docker_service: DockerService, honeypot_id: str, honeypot_type: str,
+                 container_id: str, on_attacks: Callable[[str, List[Dict[str, Any]]], int]):
+        self.docker_service = docker_service
+        self.honeypot_id = honeypot_id
+        self.honeypot_type = honeypot_type
+        self.container_id = container_id
+        self.on_attacks = on_attacks
+        self._stop = threading.Event()
+        self._stream = None
+        self._thread = threading.Thread(
+            target=self._run, name=f"log-stream-{honeypot_id[:8]}", daemon=True
+        )
+
+    @property
+    def alive(self) -> bool:
+        return self._thread.is_alive() and not self._stop.is_set()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        # Closing the response unblocks the thread waiting for the next chunk
+        stream = self._stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    def _run(self):
+        # A dedicated client keeps the long-lived stream off the shared connection pool
+        client = docker.from_env()
+        try:
+            while not self._stop.is_set():
+                try:
+                    self._follow(client)
+                except docker.errors.NotFound:
+                    logger.info(f"Container {self.container_id[:12]} is gone, stopping log stream")
+                    break
+                except Exception as e:
+                    if not self._stop.is_set():
+                        logger.warning(f"Log stream for honeypot {self.honeypot_id} failed: {e}")
+                self._stop.wait(RECONNECT_DELAY)
+        finally:
+            self.docker_service.log_cursors.flush()
+            client.close()
+
+    def _follow(self, client):
+        """Stream log lines after the checkpoint until the stream ends"""
+        cursors = self.docker_service.log_cursors
+        checkpoint = cursors.get(self.container_id)
+
+        kwargs = {"stream": True, "follow": True, "timestamps": True}
+        if checkpoint:
+            kwargs["since"] = checkpoint[0] + checkpoint[1] / 1e9
+        container = client.containers.get(self.container_id)
+        self._stream = container.logs(**kwargs)
+        logger.info(f"Streaming logs for honeypot {self.honeypot_id}")
+
+        buffer = b""
+        last_flush = time.monotonic()
+        try:
+            for chunk in self._stream:
+                if self._stop.is_set():
+                    break
+                buffer += chunk
+                if b"\n" not in buffer:
+                    continue
+
+                # Only complete lines are parsed; the tail waits for the next chunk
+                complete, _, buffer = buffer.rpartition(b"\n")
+                lines = []
+                newest = None
+                for raw_line in complete.decode("utf-8", errors="ignore").splitlines():
+                    position, line = split_log_line(raw_line)
+                    if position is None or (checkpoint and position <= checkpoint):
+                        continue
+                    lines.append(line)
+                    newest = position
+
+                if lines:
+                    attacks = self.docker_service.parse_log_lines(lines, self.honeypot_id, self.honeypot_type)
+                    if attacks and self.on_attacks(self.honeypot_id, attacks) < len(attacks):
+                        # Not all queued (the pipeline is stopping); these lines are read again
+                        logger.warning(f"Log stream for honeypot {self.honeypot_id} stopped before its checkpoint")
+                        break
+                    checkpoint = newest
+                    cursors.set(self.container_id, newest, persist=False)
+
+                if time.monotonic() - last_flush >= CURSOR_FLUSH_INTERVAL:
+                    cursors.flush()
+                    last_flush = time.monotonic()
+        finally:
+            self._stream = None
+            cursors.flush()
+
+
+class LogStreamManager:
+    """Keeps one log streamer running per active honeypot.
+
+    Attacks parsed on a streamer thread go straight onto the ingestion
+    pipeline, so they are saved and broadcast as soon as the log line is
+    written.
+    """
+
+    def __init__(self, docker_service: DockerService, pipeline: IngestionPipeline):
+        self.docker_service = docker_service
+        self.pipeline = pipeline
+        # In file mode, honeypots without mounted log files are streamed instead
+        self.enabled = INGEST_MODE in ("stream", "file")
+        self._streamers: Dict[str, ContainerLogStreamer] = {}
+        self._lock = threading.Lock()
+
+    def is_streaming(self, honeypot_id: str) -> bool:
+        streamer = self._streamers.get(honeypot_id)
+        return streamer is not None and streamer.alive
+
+    def honeypot_ids(self) -> List[str]:
+        return list(self._streamers)
+
+    def start(self, honeypot):
+        """Start streaming a honeypot's container logs"""
+        if not self.enabled or honeypot.status != "active" or not honeypot.container_id:
+            return
+
+        with self._lock:
+            current = self._streamers.get(honeypot.id)
+            if current is not None:
+                if current.alive and current.container_id == honeypot.container_id:
+                    return
+                current.stop()
+
+            streamer = ContainerLogStreamer(
+                self.docker_service, honeypot.id, honeypot.type,
+                honeypot.container_id, self._handle_attacks
+            )
+            self._streamers[honeypot.id] = streamer
+            streamer.start()
+
+    def stop(self, honeypot_id: str):
+        with self._lock:
+            streamer = self._streamers.pop(honeypot_id, None)
+        if streamer is not None:
+            streamer.stop()
+            logger.info(f"Stopped log stream for honeypot {honeypot_id}")
+
+    def stop_all(self):
+        for honeypot_id in list(self._streamers):
+            self.stop(honeypot_id)
+
+    def _handle_attacks(self, honeypot_id: str, attacks_data: List[Dict[str, Any]]) -> int:
+        """Queue attacks parsed on a streamer thread, waiting while the queue is full"""
+        queued = self.pipeline.submit_threadsafe(attacks_data, timeout=None)
+        logger.debug(f"Queued {queued} streamed attacks for honeypot {honeypot_id}")
+        return queued
@@ -13,6 +13,7 @@ load_dotenv()
 from .honeypot import router as honeypot_router
 from .simulation_api import router as simulation_router
 from .ai_routes import router as ai_router
+from .backfill_api import router as backfill_router
 
 # Configure logging
 logging.basicConfig(
@@ -41,98 +42,59 @@ app.add_middleware(
 app.include_router(honeypot_router, tags=["honeypots"])
 app.include_router(simulation_router, tags=["simulations"])
 app.include_router(ai_router, prefix="/ai", tags=["ai"])
+app.include_router(backfill_router, prefix="/admin", tags=["admin"])
 
 
 # Sync task for background attack detection
+SYNC_INTERVAL = float(os.getenv("HONEYPOT_SYNC_INTERVAL", "30"))
+SYNC_CONCURRENCY = int(os.getenv("HONEYPOT_SYNC_CONCURRENCY", "8"))
+SYNC_TIMEOUT = float(os.getenv("HONEYPOT_SYNC_TIMEOUT", "20"))
+
 async def periodic_attack_sync():
     """Periodically sync attacks from all active honeypots"""
     from .docker_service import DockerService
     from .database import DatabaseService
-    from .models import Attack
-    import uuid
+    from .attack_sync import AttackSync
+    from .honeypot import ingest_pipeline, is_ingesting_live, reconcile_log_ingestion
     
-    docker_service = DockerService()
+    loop = asyncio.get_running_loop()
+    # Docker and storage calls block, so they run on the syncer's pool off the event loop
+    docker_service = await loop.run_in_executor(None, DockerService)
+    syncer = AttackSync(docker_service, ingest_pipeline, SYNC_CONCURRENCY, SYNC_TIMEOUT)
     db_service = DatabaseService()
     
     while True:
         try:
             # Get all active honeypots
-            honeypots = db_service.get_all_honeypots()
-            active_honeypots = [h for h in honeypots if h.status == "active" and h.container_id]
+            honeypots = await loop.run_in_executor(syncer.executor, db_service.get_all_honeypots)
+            
+            # Pick up honeypots whose log ingestion a lost bus command never started or stopped
+            await loop.run_in_executor(syncer.executor, reconcile_log_ingestion, honeypots)
+            active_honeypots = [
+                h for h in honeypots
+                if h.status == "active" and h.container_id
+                # Honeypots with a live log stream or tailed log files don't need polling
+                and not is_ingesting_live(h.id)
+            ]
             
-            for honeypot in active_honeypots:
-                try:
-                    # Extract attacks from container logs
-                    attacks_data = docker_service.get_attacks_from_container(
-                        honeypot.container_id, 
-                        honeypot.id,
-                        honeypot.type
-                    )
-                    
-                    # Save new attacks to database (with deduplication)
-                    new_attack_count = 0
-                    for attack_data in attacks_data:
-                        # Skip if this attack already exists
-                        if db_service.attack_exists(attack_data):
-                            continue
-                        
-                        # Parse the timestamp correctly
-                        try:
-                            attack_timestamp = datetime.fromisoformat(attack_data["timestamp"])
-                        except (ValueError, TypeError):
-                            attack_timestamp = datetime.now()
-                        
-                        # Create a hash for this attack
-                        attack_hash = db_service._get_attack_hash(attack_data)
-                        
-                        attack = Attack(
-                            id=str(uuid.uuid4()),
-                            honeypot_id=attack_data["honeypot_id"],
-                            source_ip=attack_data["source_ip"],
-                            attack_type=attack_data["attack_type"],
-                            username=attack_data.get("username"),
-                            password=attack_data.get("password"),
-                            timestamp=attack_timestamp,
-                            details=attack_data.get("details", {}),
-                            attack_hash=attack_hash  # Add the hash
-                        )
-                        
-                        # Save to database (will skip if duplicate)
-                        saved_attack = db_service.save_attack(attack)
-                        if saved_attack:
-                            new_attack_count += 1
-                            
-                            # Notify WebSocket clients
-                            from .honeypot import active_connections
-                            if active_connections:
-                                for connection in list(active_connections):
-                                    try:
-                                        await connection.send_json(attack.dict())
-                                    except Exception:
-                                        pass
-                    
-                    if new_attack_count > 0:
-                        logger.info(f"Added {new_attack_count} new attacks for honeypot {honeypot.id}")
-                    else:
-                        logger.debug(f"No new attacks for honeypot {honeypot.id}")
-                        
-                except Exception as e:
-                    logger.error(f"Error syncing attacks for honeypot {honeypot.id}: {e}")
+            # Honeypots whose previous sync is still running are skipped
+            await syncer.sync(active_honeypots)
             
             # Wait before next sync
-            await asyncio.sleep(30)
+            await asyncio.sleep(SYNC_INTERVAL)
             
         except Exception as e:
             logger.error(f"Error in periodic attack sync: {e}")
             await asyncio.sleep(60)
 
-@app.on_event("startup")
-async def startup_event():
-    """Run when the application starts"""
-    logger.info("Starting Honeypot Orchestrator API")
+async def start_leader_tasks():
+    """Start the work only one worker process should do: following honeypot logs and polling"""
+    from .honeypot import attack_detector
     
-    # Create required directories
-    os.makedirs("./data", exist_ok=True)
+    # Tail bind-mounted honeypot log files
+    from .docker_service import INGEST_MODE
+    if INGEST_MODE == "file":
+        attack_detector.start()
     
     # Recover honeypot states
     try:
@@ -144,10 +106,42 @@ async def startup_event():
     # Start background attack sync
     asyncio.create_task(periodic_attack_sync())
 
+@app.on_event("startup")
+async def startup_event():
+    """Run when the application starts"""
+    logger.info("Starting Honeypot Orchestrator API")
+    
+    # Create required directories
+    os.makedirs("./data", exist_ok=True)
+    
+    # Start the ingestion pipeline and WebSocket fan-out before anything produces attacks
+    from .honeypot import ingest_pipeline, attack_broadcaster, event_bus, handle_bus_command
+    attack_broadcaster.start()
+    ingest_pipeline.start()
+    
+    # With several workers, the event bus leader ingests logs and the others
+    # take over if it exits
+    await event_bus.start(on_leader=start_leader_tasks, on_command=handle_bus_command)
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Run when the application shuts down"""
     logger.info("Shutting down Honeypot Orchestrator API")
+    
+    # Stop following container logs
+    from .honeypot import log_streams, attack_detector
+    log_streams.stop_all()
+    attack_detector.stop()
+    
+    # Save whatever is still queued
+    from .honeypot import ingest_pipeline, attack_broadcaster, event_bus
+    await ingest_pipeline.stop()
+    await event_bus.stop()
+    await attack_broadcaster.stop()
+    
+    # Flush pending storage writes
+    from .storage import close_all_storage
+    close_all_storage()
 
 @app.get("/", tags=["health"])
 async def health_check():
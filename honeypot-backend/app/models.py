@@ -1,8 +1,9 @@
 # app/models.py
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Literal
 from pydantic import BaseModel, Field
 from datetime import datetime
 import uuid
+import os
 
 class User(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -51,7 +52,7 @@ class Honeypot(HoneypotBase):
 class Attack(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     honeypot_id: str
-    timestamp: datetime = Field(default_factory=datetime.now)
+    timestamp: datetime = Field(default_factory=datetime.utcnow)  # naive UTC
     source_ip: str
     attack_type: str
     username: Optional[str] = None
@@ -64,5 +65,47 @@ class Attack(BaseModel):
             datetime: lambda v: v.isoformat()
         }
 
+class AttackIngest(BaseModel):
+    honeypot_id: str
+    source_ip: str
+    attack_type: str
+    username: Optional[str] = None
+    password: Optional[str] = None
+    timestamp: Optional[datetime] = None
+    details: Dict[str, Any] = {}
+
+class AttackSubscription(BaseModel):
+    """Filter and frame format a WebSocket client asks for; empty lists match everything"""
+    type: str = "subscribe"
+    # Capped, as every broadcast attack is checked against these lists
+    honeypot_ids: List[str] = Field([], max_items=100)
+    attack_types: List[str] = Field([], max_items=50)
+    source_cidrs: List[str] = Field([], max_items=100)
+    # Coalesce attacks into {"type": "batch", "attacks": [...]} frames sent every
+    # batch_interval_ms or every batch_max_events attacks; both 0 = one frame per attack
+    batch_interval_ms: int = Field(0, ge=0, le=60000)
+    batch_max_events: int = Field(0, ge=0, le=10000)
+    projection: Literal["full", "slim"] = "full"  # slim leaves out details.raw_log
+    encoding: Literal["json", "msgpack"] = "json"  # msgpack frames are sent as binary
+    # Resume after a reconnect: replay buffered attacks with a higher seq from the same epoch
+    last_seq: Optional[int] = None
+    epoch: Optional[str] = None
+
+class BackfillRequest(BaseModel):
+    honeypot_id: str
+    paths: List[str] = []  # log files on the server
+    log_dir: Optional[str] = None  # parse every matching log file in this directory
+    container: bool = False  # dump and parse the container's full log output
+    workers: Optional[int] = Field(None, ge=1, le=os.cpu_count() or 1)  # parser processes, default CPU count
+    chunk_mb: int = Field(32, ge=1, le=256)  # each in-flight chunk is read into memory
+
+class AttackChanges(BaseModel):
+    attacks: List[Attack]  # oldest first, in ingestion order
+    cursor: int  # pass as ?since= to get the attacks stored after these
+    has_more: bool = False
+
 class AttackList(BaseModel):
-    attacks: List[Attack]
\ No newline at end of file
+    attacks: List[Attack]
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None  # pass as ?before= for older attacks
+    prev_cursor: Optional[str] = None  # pass as ?after= for newer attacks
\ No newline at end of file
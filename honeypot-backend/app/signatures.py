@@ -0,0 +1,257 @@
+# app/signatures.py
+import os
+import json
+import logging
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple, Iterable, Set
+from urllib.parse import unquote_plus
+
+logger = logging.getLogger(__name__)
+
+# Categories double as attack types; when several match, the first one listed wins
+CATEGORY_PRIORITY = (
+    "command_injection",
+    "sql_injection",
+    "xss_attempt",
+    "path_traversal",
+    "web_scan",
+)
+
+# (id, category, pattern); patterns are matched against lowercased, URL-decoded text
+SIGNATURES: List[Tuple[str, str, str]] = [
+    # SQL injection
+    ("SQLI-001", "sql_injection", "union select"),
+    ("SQLI-002", "sql_injection", "union all select"),
+    ("SQLI-003", "sql_injection", "' or '1'='1"),
+    ("SQLI-004", "sql_injection", "\" or \"1\"=\"1"),
+    ("SQLI-005", "sql_injection", " or 1=1"),
+    ("SQLI-006", "sql_injection", "' or 1=1"),
+    ("SQLI-007", "sql_injection", "information_schema"),
+    ("SQLI-008", "sql_injection", "sleep("),
+    ("SQLI-009", "sql_injection", "benchmark("),
+    ("SQLI-010", "sql_injection", "waitfor delay"),
+    ("SQLI-011", "sql_injection", "pg_sleep("),
+    ("SQLI-012", "sql_injection", "extractvalue("),
+    ("SQLI-013", "sql_injection", "updatexml("),
+    ("SQLI-014", "sql_injection", "load_file("),
+    ("SQLI-015", "sql_injection", "into outfile"),
+    ("SQLI-016", "sql_injection", "drop table"),
+    ("SQLI-017", "sql_injection", "';--"),
+    ("SQLI-018", "sql_injection", "@@version"),
+    ("SQLI-019", "sql_injection", "select * from"),
+    ("SQLI-020", "sql_injection", "xp_cmdshell"),
+    # Cross-site scripting
+    ("XSS-001", "xss_attempt", "<script"),
+    ("XSS-002", "xss_attempt", "javascript:"),
+    ("XSS-003", "xss_attempt", "onerror="),
+    ("XSS-004", "xss_attempt", "onload="),
+    ("XSS-005", "xss_attempt", "onmouseover="),
+    ("XSS-006", "xss_attempt", "<svg"),
+    ("XSS-007", "xss_attempt", "<iframe"),
+    ("XSS-008", "xss_attempt", "document.cookie"),
+    ("XSS-009", "xss_attempt", "alert("),
+    ("XSS-010", "xss_attempt", "<img src="),
+    ("XSS-011", "xss_attempt", "String.fromCharCode("),
+    # Path traversal and local file inclusion
+    ("TRAV-001", "path_traversal", "../"),
+    ("TRAV-002", "path_traversal", "..\\"),
+    ("TRAV-003", "path_traversal", "/etc/passwd"),
+    ("TRAV-004", "path_traversal", "/etc/shadow"),
+    ("TRAV-005", "path_traversal", "/proc/self/environ"),
+    ("TRAV-006", "path_traversal", "win.ini"),
+    ("TRAV-007", "path_traversal", "boot.ini"),
+    ("TRAV-008", "path_traversal", "php://filter"),
+    ("TRAV-009", "path_traversal", "php://input"),
+    ("TRAV-010", "path_traversal", "file:///"),
+    # Command injection
+    ("CMD-001", "command_injection", ";wget "),
+    ("CMD-002", "command_injection", ";curl "),
+    ("CMD-003", "command_injection", "|sh"),
+    ("CMD-004", "command_injection", "$(wget"),
+    ("CMD-005", "command_injection", "$(curl"),
+    ("CMD-006", "command_injection", "/bin/sh"),
+    ("CMD-007", "command_injection", "/bin/bash"),
+    ("CMD-008", "command_injection", "chmod 777"),
+    ("CMD-009", "command_injection", "${jndi:"),
+    ("CMD-010", "command_injection", "() { :; };"),
+    ("CMD-011", "command_injection", "nc -e"),
+    # Scanner user agents
+    ("SCAN-001", "web_scan", "sqlmap"),
+    ("SCAN-002", "web_scan", "nikto"),
+    ("SCAN-003", "web_scan", "nmap"),
+    ("SCAN-004", "web_scan", "masscan"),
+    ("SCAN-005", "web_scan", "zgrab"),
+    ("SCAN-006", "web_scan", "nuclei"),
+    ("SCAN-007", "web_scan", "dirbuster"),
+    ("SCAN-008", "web_scan", "gobuster"),
+    ("SCAN-009", "web_scan", "wpscan"),
+    ("SCAN-010", "web_scan", "acunetix"),
+    ("SCAN-011", "web_scan", "nessus"),
+    ("SCAN-012", "web_scan", "openvas"),
+    ("SCAN-013", "web_scan", "censysinspect"),
+    ("SCAN-014", "web_scan", "python-requests"),
+    ("SCAN-015", "web_scan", "go-http-client"),
+    # Common exploit and probe paths
+    ("PATH-001", "web_scan", "/admin"),
+    ("PATH-002", "web_scan", "/wp-login"),
+    ("PATH-003", "web_scan", "/wp-admin"),
+    ("PATH-004", "web_scan", "/xmlrpc.php"),
+    ("PATH-005", "web_scan", ".php"),
+    ("PATH-006", "web_scan", "/phpmyadmin"),
+    ("PATH-007", "web_scan", "/.env"),
+    ("PATH-008", "web_scan", "/.git/"),
+    ("PATH-009", "web_scan", "/cgi-bin/"),
+    ("PATH-010", "web_scan", "/boaform/"),
+    ("PATH-011", "web_scan", "/hnap1"),
+    ("PATH-012", "web_scan", "/manager/html"),
+    ("PATH-013", "web_scan", "/actuator/"),
+    ("PATH-014", "web_scan", "/solr/"),
+    ("PATH-015", "web_scan", "/vendor/phpunit"),
+    ("PATH-016", "web_scan", "/shell"),
+    ("PATH-017", "web_scan", "/config.json"),
+    ("PATH-018", "web_scan", "/server-status"),
+    ("PATH-019", "web_scan", "eval("),
+    ("PATH-020", "web_scan", "/.aws/"),
+]
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton matching many literal patterns in one pass.
+
+    Scanning costs O(len(text) + matches) regardless of how many patterns
+    were added.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+        self._values: List[Any] = []
+
+    def add(self, pattern: str, value: Any):
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = next_state
+        self._out[state] += (len(self._values),)
+        self._values.append(value)
+
+    def build(self):
+        """Compute failure links; call after the last ``add``"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._out[child] += self._out[self._fail[child]]
+        return self
+
+    def search(self, text: str) -> Set[Any]:
+        """Values of every pattern occurring in ``text``"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        values = self._values
+        return {values[i] for i in found}
+
+
+def normalize(text: str) -> str:
+    """URL-decode (twice, for double encoding) and lowercase"""
+    decoded = unquote_plus(text)
+    if "%" in decoded:
+        decoded = unquote_plus(decoded)
+    return decoded.lower()
+
+
+class SignatureMatcher:
+    """Classifies text against a signature library"""
+
+    def __init__(self, signatures: Iterable[Tuple[str, str, str]]):
+        self.automaton = AhoCorasick()
+        self.categories: Dict[str, str] = {}
+        for signature_id, category, pattern in signatures:
+            self.automaton.add(pattern.lower(), signature_id)
+            self.categories[signature_id] = category
+        self.automaton.build()
+
+    def __len__(self):
+        return len(self.categories)
+
+    def match(self, text: str) -> List[str]:
+        """Sorted IDs of the signatures found in the normalized text"""
+        return sorted(self.automaton.search(normalize(text)))
+
+    def classify(self, text: str) -> Tuple[Optional[str], List[str]]:
+        """Attack type and matched signature IDs, or (None, []) for clean text"""
+        matched = self.match(text)
+        if not matched:
+            return None, []
+        categories = {self.categories[signature_id] for signature_id in matched}
+        for category in CATEGORY_PRIORITY:
+            if category in categories:
+                return category, matched
+        return sorted(categories)[0], matched
+
+
+def load_signatures() -> List[Tuple[str, str, str]]:
+    """Built-in signatures plus any from HONEYPOT_SIGNATURES_FILE (a JSON list of {id, category, pattern})"""
+    signatures = list(SIGNATURES)
+    path = os.getenv("HONEYPOT_SIGNATURES_FILE")
+    if path:
+        try:
+            with open(path, "r") as f:
+                signatures.extend((s["id"], s["category"], s["pattern"]) for s in json.load(f))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Failed to load signatures from {path}: {e}")
+    return signatures
+
+
+_matcher: Optional[SignatureMatcher] = None
+
+
+def get_matcher() -> SignatureMatcher:
+    """Get the shared matcher, building it on first use"""
+    global _matcher
+    if _matcher is None:
+        _matcher = SignatureMatcher(load_signatures())
+        logger.info(f"Loaded {len(_matcher)} web attack signatures")
+    return _matcher
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    import random
+    import string
+
+    # Throughput should stay flat as synthetic signatures are added to the library
+    line = '203.0.113.9 - - [31/Mar/2025:17:38:31 +0000] "GET /item?id=1%20UNION%20SELECT%20pass HTTP/1.1" 200 10 "-" "sqlmap/1.7"'
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    rng = random.Random(0)
+    for extra in (0, 1_000, 5_000, 20_000):
+        synthetic = [
+            (f"GEN-{i:05d}", "web_scan", "".join(rng.choices(string.ascii_lowercase + "/._-", k=rng.randint(6, 16))))
+            for i in range(extra)
+        ]
+        matcher = SignatureMatcher(SIGNATURES + synthetic)
+        started = time.perf_counter()
+        for _ in range(count):
+            matcher.classify(line)
+        elapsed = time.perf_counter() - started
+        print(f"{len(matcher):>6} signatures: {int(count / elapsed):>8,} lines/s")
@@ -36,6 +36,7 @@ class AttackSimulation:
         passwords = password_pools.get(complexity, password_pools["basic"])
         
         attacks_sent = 0
+        pending = []
         
         for _ in range(count):
             username = random.choice(usernames)
@@ -44,7 +45,7 @@ class AttackSimulation:
             
             # Create attack record using your model
             attack_id = str(uuid.uuid4())
-            timestamp = datetime.now()
+            timestamp = datetime.utcnow()
             
             # Format raw log similar to your existing format
             raw_log = f"{timestamp.isoformat()} [HoneyPotSSHTransport,0,{source_ip}] login attempt [b'{username}'/b'{password}'] failed"
@@ -70,18 +71,22 @@ class AttackSimulation:
             
             # Create Attack object using your Pydantic model
             try:
-                attack = Attack(**attack_data)
-                
-                # Save attack if it doesn't exist already
-                if not self.db_service.attack_exists(attack_data):
-                    self.db_service.save_attack(attack)
-                    attacks_sent += 1
+                pending.append(Attack(**attack_data))
             except Exception as e:
-                print(f"Failed to save simulated attack: {str(e)}")
+                print(f"Failed to create simulated attack: {str(e)}")
+            
+            # Paced simulations save each attack as it happens, otherwise
+            # the whole batch is saved in one bulk call below
+            if delay > 0:
+                attacks_sent += len(self.db_service.save_attacks(pending))
+                pending = []
             
             # Delay between attacks
             await asyncio.sleep(delay)
         
+        if pending:
+            attacks_sent += len(self.db_service.save_attacks(pending))
+        
         return attacks_sent
                 
     async def run_attack_simulation(self, honeypot_id: str, attack_rate: int, duration_minutes: int, complexity: str = "basic"):
@@ -9,6 +9,7 @@ from datetime import datetime
 # Import database service
 from .database import DatabaseService
 from .models import Attack
+from .honeypot import ingest_pipeline
 
 # Setup logger
 logger = logging.getLogger(__name__)
@@ -43,7 +44,7 @@ async def attack_sim(payload: Dict[str, Any] = Body(...)):
         
         # Create attack ID and timestamp
         attack_id = str(uuid.uuid4())
-        timestamp = datetime.now()
+        timestamp = datetime.utcnow()
         
         # Generate source IP - more targeted or specific based on complexity
         source_ip = generate_source_ip(complexity)
@@ -281,18 +282,13 @@ async def attack_sim(payload: Dict[str, Any] = Body(...)):
         # Create attack object
         attack = Attack.parse_obj(attack_data)
         
-        # Check if attack exists
-        if db_service.attack_exists(attack_data):
-            logger.info(f"Attack with hash {attack_hash} already exists")
-            return {"success": False, "message": "Attack already exists"}
-        
-        # Save attack
-        result = db_service.save_attack(attack)
-        if result:
-            logger.info(f"Successfully saved attack: {attack_id}")
-            return {"success": True, "attack_id": attack_id}
-        
-        return {"success": False, "error": "Failed to save attack"}
+        # Queue it like any other producer; the pipeline drops duplicates,
+        # saves it and notifies live clients
+        if not ingest_pipeline.running:
+            return {"success": False, "error": "Ingestion pipeline is not running"}
+        await ingest_pipeline.submit_many([attack])
+        logger.info(f"Queued simulated attack: {attack_id}")
+        return {"success": True, "attack_id": attack_id}
         
     except Exception as e:
         logger.exception(f"Error in attack simulation: {str(e)}")
@@ -0,0 +1,200 @@
+# app/sketches.py
+import os
+import math
+import time
+import heapq
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 86400
+
+
+class SpaceSaving:
+    """Space-Saving heavy-hitter summary holding at most ``capacity`` items.
+
+    Reported counts overestimate the true count by at most the item's
+    recorded error, which is bounded by total / capacity.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        self.counters: Dict[str, List[int]] = {}  # item -> [count, error]
+        # Min-heap of (count, item); entries whose count is stale are skipped lazily
+        self._heap: List[Tuple[int, str]] = []
+
+    def add(self, item: str, count: int = 1):
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += count
+            self._push(counter[0], item)
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [count, 0]
+            self._push(count, item)
+        else:
+            # Replace the smallest counter and inherit its count as error
+            floor = self._pop_min()
+            self.counters[item] = [floor + count, floor]
+            self._push(floor + count, item)
+
+    def _push(self, count: int, item: str):
+        heapq.heappush(self._heap, (count, item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(c, i) for i, (c, _) in self.counters.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self) -> int:
+        """Remove the smallest counter and return its count"""
+        while True:
+            count, item = heapq.heappop(self._heap)
+            counter = self.counters.get(item)
+            if counter is not None and counter[0] == count:
+                del self.counters[item]
+                return count
+
+    def floor(self) -> int:
+        """Upper bound on the count of any item that isn't tracked"""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def merge(self, other: "SpaceSaving"):
+        # An item missing from one side may have been seen there up to that side's floor
+        own_floor, other_floor = self.floor(), other.floor()
+        for item in self.counters.keys() - other.counters.keys():
+            self.counters[item][0] += other_floor
+            self.counters[item][1] += other_floor
+        for item, (count, error) in other.counters.items():
+            counter = self.counters.get(item)
+            if counter is None:
+                self.counters[item] = [count + own_floor, error + own_floor]
+            else:
+                counter[0] += count
+                counter[1] += error
+        if len(self.counters) > self.capacity:
+            keep = sorted(self.counters.items(), key=lambda kv: kv[1][0], reverse=True)[:self.capacity]
+            self.counters = dict(keep)
+        self._heap = [(c, i) for i, (c, _) in self.counters.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, k: int) -> List[Dict[str, Any]]:
+        ranked = sorted(self.counters.items(), key=lambda kv: kv[1][0], reverse=True)[:k]
+        return [{"value": item, "count": count, "error": error} for item, (count, error) in ranked]
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter (about 1.6% standard error at p=12)"""
+
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+        self.alpha = 0.7213 / (1 + 1.079 / self.m)
+
+    def add(self, item: str):
+        x = int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), "big")
+        index = x >> (64 - self.p)
+        rest = x & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self) -> int:
+        estimate = self.alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Small range correction (linear counting)
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+
+class SketchSet:
+    """Sketches for one honeypot over one day"""
+
+    def __init__(self, capacity: int):
+        self.source_ips = SpaceSaving(capacity)
+        self.usernames = SpaceSaving(capacity)
+        self.passwords = SpaceSaving(capacity)
+        self.credentials = SpaceSaving(capacity)
+        self.unique_ips = HyperLogLog()
+        self.total = 0
+
+    def add(self, attack: Dict[str, Any]):
+        self.total += 1
+        source_ip = attack.get("source_ip")
+        if source_ip:
+            self.source_ips.add(source_ip)
+            self.unique_ips.add(source_ip)
+        username = attack.get("username")
+        password = attack.get("password")
+        if username:
+            self.usernames.add(username)
+        if password:
+            self.passwords.add(password)
+        if username or password:
+            self.credentials.add(f"{username or ''}:{password or ''}")
+
+    def merge(self, other: "SketchSet"):
+        self.source_ips.merge(other.source_ips)
+        self.usernames.merge(other.usernames)
+        self.passwords.merge(other.passwords)
+        self.credentials.merge(other.credentials)
+        self.unique_ips.merge(other.unique_ips)
+        self.total += other.total
+
+
+class AttackSketches:
+    """Heavy-hitter and cardinality sketches per honeypot and day.
+
+    Updated as attacks are saved; memory is bounded by the number of
+    honeypots times ``retention_days``, independent of attack volume.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, retention_days: Optional[int] = None):
+        self.capacity = capacity or int(os.getenv("HONEYPOT_SKETCH_CAPACITY", "64"))
+        self.retention_days = retention_days or int(os.getenv("HONEYPOT_SKETCH_RETENTION_DAYS", "30"))
+        self._sketches: Dict[Tuple[str, int], SketchSet] = {}
+        # Wall-clock time before any attack was added
+        self.created_at = time.time()
+        self._lock = threading.Lock()
+
+    def add_many(self, attacks: Iterable[Tuple[float, Dict[str, Any]]]):
+        """Add ``(ts, attack)`` pairs, ts being wall-clock seconds"""
+        with self._lock:
+            for ts, attack in attacks:
+                key = (attack["honeypot_id"], int(ts // DAY_SECONDS))
+                sketch = self._sketches.get(key)
+                if sketch is None:
+                    sketch = self._sketches[key] = SketchSet(self.capacity)
+                sketch.add(attack)
+
+    def expire(self, now: float):
+        """Drop days that fell out of the retention window"""
+        oldest_day = int(now // DAY_SECONDS) - self.retention_days
+        with self._lock:
+            for key in [k for k in self._sketches if k[1] < oldest_day]:
+                del self._sketches[key]
+
+    def query(self, now: float, days: int, honeypot_id: Optional[str] = None, k: int = 10) -> Dict[str, Any]:
+        """Merge the day sketches in the window and report the top K"""
+        first_day = int(now // DAY_SECONDS) - days + 1
+        merged = SketchSet(self.capacity)
+        with self._lock:
+            for (hp_id, day), sketch in self._sketches.items():
+                if day >= first_day and (honeypot_id is None or hp_id == honeypot_id):
+                    merged.merge(sketch)
+
+        return {
+            "total": merged.total,
+            "unique_source_ips": merged.unique_ips.count(),
+            "top_source_ips": merged.source_ips.top(k),
+            "top_usernames": merged.usernames.top(k),
+            "top_passwords": merged.passwords.top(k),
+            "top_credentials": merged.credentials.top(k),
+        }
@@ -0,0 +1,899 @@
+# app/storage.py
+import os
+import json
+import sqlite3
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+from .dedup import AttackHashIndex
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows, where the JSON data directory is not locked
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Attack timestamps are naive datetimes in UTC, so they are indexed as
+# seconds since the Unix epoch by treating them as UTC.
+EPOCH = datetime(1970, 1, 1)
+
+DEFAULT_BACKEND = "sqlite"
+
+# Width of the precomputed attack rollup buckets
+ROLLUP_BUCKET_SECONDS = 3600
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Attack timestamps are naive UTC; convert an offset-aware datetime to that"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def to_wall_seconds(value) -> float:
+    """Convert a datetime or ISO string to seconds since the Unix epoch (naive means UTC)"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return (to_naive_utc(value) - EPOCH).total_seconds()
+
+
+def from_wall_seconds(seconds: float) -> datetime:
+    """Inverse of to_wall_seconds"""
+    return EPOCH + timedelta(seconds=seconds)
+
+
+def rollup_bucket(ts: float) -> int:
+    """Start of the rollup bucket containing a wall-clock timestamp"""
+    return int(ts // ROLLUP_BUCKET_SECONDS) * ROLLUP_BUCKET_SECONDS
+
+
+class StorageBackend:
+    """Interface implemented by the storage engines behind DatabaseService.
+
+    Honeypots and attacks are passed around as plain dicts (``model.dict()``);
+    DatabaseService takes care of converting them to pydantic models.
+    """
+
+    name = "base"
+
+    # Honeypot operations
+    def get_all_honeypots(self) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def get_honeypot(self, honeypot_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def save_honeypot(self, honeypot: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def delete_honeypot(self, honeypot_id: str) -> bool:
+        raise NotImplementedError
+
+    def increment_attack_count(self, honeypot_id: str, amount: int = 1) -> bool:
+        raise NotImplementedError
+
+    # Attack operations
+    def count_attack_hashes(self) -> int:
+        """Number of distinct attack hashes in storage"""
+        raise NotImplementedError
+
+    def iter_attack_hashes(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def _open_hash_index(self):
+        """Load the dedup index that answers attack_hash_exists"""
+        self.hash_index = AttackHashIndex(os.path.join(self.data_dir, f"attack_hashes.{self.name}.idx"))
+        self.hash_index.load(self.count_attack_hashes(), self.iter_attack_hashes())
+
+    def attack_hash_exists(self, attack_hash: str) -> bool:
+        return self.hash_index.contains(attack_hash)
+
+    def insert_attacks(self, attacks: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert attacks in one pass and bump their honeypots' attack counts.
+
+        Attacks whose hash is already stored (or repeated within the batch)
+        are skipped; the ones actually inserted are returned.
+        """
+        raise NotImplementedError
+
+    def _new_candidates(self, attacks: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop attacks the dedup index already knows about"""
+        candidates = []
+        batch_hashes = set()
+        for attack in attacks:
+            attack_hash = attack.get("attack_hash")
+            if attack_hash:
+                if attack_hash in batch_hashes or self.hash_index.contains(attack_hash):
+                    continue
+                batch_hashes.add(attack_hash)
+            candidates.append(attack)
+        return candidates
+
+    def get_attacks(self, honeypot_id: Optional[str] = None,
+                    limit: int = 100, offset: int = 0,
+                    before: Optional[Tuple[float, str]] = None,
+                    after: Optional[Tuple[float, str]] = None) -> List[Dict[str, Any]]:
+        """Get attacks newest first, optionally filtered by honeypot ID.
+
+        ``before`` and ``after`` are ``(ts, id)`` keys; only attacks strictly
+        older (or newer) than the key are returned, which lets callers page
+        with a range scan instead of an offset.
+        """
+        raise NotImplementedError
+
+    def count_attacks(self, honeypot_id: Optional[str] = None) -> int:
+        raise NotImplementedError
+
+    def get_changes(self, after_seq: int, limit: int = 100, honeypot_id: Optional[str] = None
+                    ) -> Tuple[List[Tuple[int, Dict[str, Any]]], int]:
+        """Get ``(seq, attack)`` pairs inserted after ``after_seq``, oldest first.
+
+        ``seq`` is an attack's position in insertion order and never goes
+        backwards. Also returns the seq the scan got to, which is the
+        cursor for the next call even when no attack matched.
+        """
+        raise NotImplementedError
+
+    def latest_seq(self) -> int:
+        """Seq of the most recently inserted attack (0 when there are none)"""
+        raise NotImplementedError
+
+    def iter_attacks(self, since: Optional[float] = None) -> Iterable[Tuple[float, Dict[str, Any]]]:
+        """Stream ``(ts, attack)`` pairs in insertion order without details.
+
+        Used to build in-memory read-side structures; ``since`` skips
+        attacks older than that wall-clock timestamp.
+        """
+        raise NotImplementedError
+
+    def count_by_bucket(self, start: float, end: float, bucket_seconds: int,
+                        group_by: Tuple[str, ...] = (), honeypot_id: Optional[str] = None
+                        ) -> List[Tuple[int, Tuple[str, ...], int]]:
+        """Counts per ``(bucket, group values)`` for attacks in ``[start, end)``.
+
+        ``group_by`` may name honeypot_id and/or attack_type.
+        """
+        raise NotImplementedError
+
+    def get_rollups(self, honeypot_id: Optional[str] = None,
+                    since: Optional[float] = None) -> List[Tuple[str, str, int, int]]:
+        """Get ``(honeypot_id, attack_type, bucket, count)`` rollup rows.
+
+        Buckets are ROLLUP_BUCKET_SECONDS wide and maintained on insert;
+        ``since`` keeps only buckets that end after that timestamp.
+        """
+        raise NotImplementedError
+
+    def get_attack(self, attack_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def close(self):
+        """Flush pending writes and release resources"""
+
+
+class JSONStorage(StorageBackend):
+    """JSON storage for small installs.
+
+    Honeypots live in ``honeypots.json``. Attacks are kept in memory and
+    persisted as a read-optimized snapshot (``attacks.json``) plus NDJSON
+    segments (``attacks-<n>.ndjson``) that new attacks are appended to.
+    Appends are fsynced in groups every ``fsync_interval`` seconds, and a
+    background thread folds sealed segments back into the snapshot once the
+    active segment grows past ``compact_bytes``.
+
+    Only one process may open a data directory: segment numbering and
+    compaction assume a single writer, so a second process (such as
+    another uvicorn worker) fails to start. Use SQLite with several workers.
+    """
+
+    name = "json"
+
+    SEGMENT_PREFIX = "attacks-"
+    SEGMENT_SUFFIX = ".ndjson"
+
+    def __init__(self, data_dir: str, fsync_interval: Optional[float] = None,
+                 compact_bytes: Optional[int] = None):
+        self.data_dir = data_dir
+        self.honeypots_file = os.path.join(data_dir, "honeypots.json")
+        self.attacks_file = os.path.join(data_dir, "attacks.json")
+        self.fsync_interval = float(os.getenv("HONEYPOT_JSON_FSYNC_INTERVAL", "1.0")) \
+            if fsync_interval is None else fsync_interval
+        self.compact_bytes = int(os.getenv("HONEYPOT_JSON_COMPACT_BYTES", str(8 * 1024 * 1024))) \
+            if compact_bytes is None else compact_bytes
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._dir_lock_fd = self._lock_data_dir()
+
+        # Initialize empty files if they don't exist
+        if not os.path.exists(self.honeypots_file):
+            self._save_data(self.honeypots_file, {})
+
+        if not os.path.exists(self.attacks_file):
+            self._save_data(self.attacks_file, {})
+
+        self._attacks: Dict[str, Dict[str, Any]] = self._load_attacks()
+        # Attack IDs in insertion order; an attack's seq is its index + 1
+        self._order: List[str] = list(self._attacks)
+        self._rollups: Dict[Tuple[str, str, int], int] = {}
+        self._add_to_rollups(self._attacks.values())
+
+        # Start a fresh active segment after the ones that were replayed
+        segments = self._segment_numbers()
+        self._segment_no = (segments[-1] + 1) if segments else 1
+        self._segment = open(self._segment_path(self._segment_no), "a")
+        self._segment_bytes = 0
+        self._dirty = False
+
+        self._open_hash_index()
+
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="json-storage-flusher", daemon=True)
+        self._flusher.start()
+
+    def _lock_data_dir(self) -> Optional[int]:
+        if fcntl is None:
+            return None
+        fd = os.open(os.path.join(self.data_dir, "json-storage.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            raise RuntimeError(
+                f"JSON storage in {self.data_dir} is already open in another process; "
+                f"run a single worker or set HONEYPOT_STORAGE_BACKEND=sqlite"
+            )
+        return fd
+
+    def _load_data(self, file_path):
+        """Load data from a JSON file"""
+        try:
+            with open(file_path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            logger.error(f"Failed to load data from {file_path}: {e}")
+            return {}
+
+    def _save_data(self, file_path, data, indent=2):
+        """Atomically save data to a JSON file"""
+        tmp_path = f"{file_path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=indent, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, file_path)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save data to {file_path}: {e}")
+            return False
+
+    # Segment handling
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.data_dir, f"{self.SEGMENT_PREFIX}{number:08d}{self.SEGMENT_SUFFIX}")
+
+    def _segment_numbers(self) -> List[int]:
+        numbers = []
+        for name in os.listdir(self.data_dir):
+            if name.startswith(self.SEGMENT_PREFIX) and name.endswith(self.SEGMENT_SUFFIX):
+                try:
+                    numbers.append(int(name[len(self.SEGMENT_PREFIX):-len(self.SEGMENT_SUFFIX)]))
+                except ValueError:
+                    continue
+        return sorted(numbers)
+
+    def _load_attacks(self) -> Dict[str, Dict[str, Any]]:
+        """Load the snapshot and replay any segments written after it"""
+        attacks = self._load_data(self.attacks_file)
+        replayed = 0
+        for number in self._segment_numbers():
+            path = self._segment_path(number)
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        attack = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash mid-append leaves at most one torn record
+                        logger.warning(f"Skipping truncated record in {path}")
+                        continue
+                    attacks[attack["id"]] = attack
+                    replayed += 1
+        if replayed:
+            logger.info(f"Replayed {replayed} attacks from append log in {self.data_dir}")
+        return attacks
+
+    def _append(self, attacks: List[Dict[str, Any]]):
+        """Append records to the active segment (caller holds the lock)"""
+        payload = "".join(json.dumps(a, default=str) + "\n" for a in attacks)
+        self._segment.write(payload)
+        self._segment.flush()
+        self._segment_bytes += len(payload)
+        self._dirty = True
+        if self.fsync_interval <= 0:
+            self._sync()
+
+    def _sync(self):
+        if self._dirty:
+            os.fsync(self._segment.fileno())
+            self._dirty = False
+
+    def _flush_loop(self):
+        """Group commit: fsync pending appends and trigger compaction"""
+        interval = self.fsync_interval if self.fsync_interval > 0 else 1.0
+        while not self._closed.wait(interval):
+            try:
+                with self._lock:
+                    self._sync()
+                    needs_compaction = self._segment_bytes >= self.compact_bytes
+                if needs_compaction:
+                    self.compact()
+            except Exception as e:
+                logger.error(f"Error in JSON storage flusher: {e}")
+
+    def compact(self):
+        """Fold sealed segments into a new snapshot"""
+        with self._compact_lock:
+            with self._lock:
+                # Seal the active segment and start a new one
+                self._sync()
+                self._segment.close()
+                sealed = [n for n in self._segment_numbers() if n <= self._segment_no]
+                self._segment_no += 1
+                self._segment = open(self._segment_path(self._segment_no), "a")
+                self._segment_bytes = 0
+                snapshot = dict(self._attacks)
+
+            # Everything in the sealed segments is in the snapshot, so the
+            # segments can go once the snapshot is safely on disk
+            if self._save_data(self.attacks_file, snapshot, indent=None):
+                for number in sealed:
+                    try:
+                        os.remove(self._segment_path(number))
+                    except FileNotFoundError:
+                        pass
+                logger.info(f"Compacted {len(sealed)} attack segments into {self.attacks_file}")
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            self._sync()
+            self._segment.close()
+            if self._dir_lock_fd is not None:
+                # Closing the descriptor releases the lock
+                os.close(self._dir_lock_fd)
+                self._dir_lock_fd = None
+
+    # Honeypot operations
+    def get_all_honeypots(self):
+        return list(self._load_data(self.honeypots_file).values())
+
+    def get_honeypot(self, honeypot_id):
+        return self._load_data(self.honeypots_file).get(honeypot_id)
+
+    def save_honeypot(self, honeypot):
+        with self._lock:
+            data = self._load_data(self.honeypots_file)
+            data[honeypot["id"]] = honeypot
+            self._save_data(self.honeypots_file, data)
+
+    def delete_honeypot(self, honeypot_id):
+        with self._lock:
+            data = self._load_data(self.honeypots_file)
+            if honeypot_id in data:
+                del data[honeypot_id]
+                self._save_data(self.honeypots_file, data)
+                return True
+            return False
+
+    def increment_attack_count(self, honeypot_id, amount=1):
+        with self._lock:
+            data = self._load_data(self.honeypots_file)
+            if honeypot_id in data:
+                data[honeypot_id]["attack_count"] = data[honeypot_id].get("attack_count", 0) + amount
+                self._save_data(self.honeypots_file, data)
+                return True
+            return False
+
+    # Attack operations
+    def _attack_hashes(self):
+        return {a["attack_hash"] for a in self._attacks.values() if a.get("attack_hash")}
+
+    def count_attack_hashes(self):
+        return len(self._attack_hashes())
+
+    def iter_attack_hashes(self):
+        return iter(self._attack_hashes())
+
+    def _add_to_rollups(self, attacks):
+        for attack in attacks:
+            bucket = rollup_bucket(to_wall_seconds(str(attack["timestamp"])))
+            key = (attack["honeypot_id"], attack.get("attack_type") or "", bucket)
+            self._rollups[key] = self._rollups.get(key, 0) + 1
+
+    def insert_attacks(self, attacks):
+        with self._lock:
+            candidates = self._new_candidates(attacks)
+            if not candidates:
+                return []
+
+            records = [json.loads(json.dumps(a, default=str)) for a in candidates]
+            self._append(records)
+            counts: Dict[str, int] = {}
+            for record in records:
+                if record["id"] not in self._attacks:
+                    self._order.append(record["id"])
+                self._attacks[record["id"]] = record
+                counts[record["honeypot_id"]] = counts.get(record["honeypot_id"], 0) + 1
+            self._add_to_rollups(records)
+            self.hash_index.add_many(a.get("attack_hash") for a in candidates)
+
+            # One honeypots.json rewrite per batch
+            data = self._load_data(self.honeypots_file)
+            for honeypot_id, count in counts.items():
+                if honeypot_id in data:
+                    data[honeypot_id]["attack_count"] = data[honeypot_id].get("attack_count", 0) + count
+            self._save_data(self.honeypots_file, data)
+            return candidates
+
+    @staticmethod
+    def _sort_key(attack) -> Tuple[float, str]:
+        return to_wall_seconds(str(attack["timestamp"])), attack["id"]
+
+    def get_attacks(self, honeypot_id=None, limit=100, offset=0, before=None, after=None):
+        with self._lock:
+            keyed = [(self._sort_key(a), a) for a in self._attacks.values()
+                     if honeypot_id is None or a.get("honeypot_id") == honeypot_id]
+
+        if before is not None:
+            keyed = [item for item in keyed if item[0] < tuple(before)]
+        if after is not None:
+            # Take the attacks just after the key, then return them newest first
+            keyed = [item for item in keyed if item[0] > tuple(after)]
+            page = heapq.nsmallest(offset + limit, keyed, key=lambda item: item[0])[offset:]
+            return [a for _, a in reversed(page)]
+
+        page = heapq.nlargest(offset + limit, keyed, key=lambda item: item[0])[offset:]
+        return [a for _, a in page]
+
+    def count_attacks(self, honeypot_id=None):
+        if honeypot_id is None:
+            return len(self._attacks)
+        with self._lock:
+            return sum(1 for a in self._attacks.values() if a.get("honeypot_id") == honeypot_id)
+
+    def get_changes(self, after_seq, limit=100, honeypot_id=None):
+        rows = []
+        cursor = after_seq
+        with self._lock:
+            for seq in range(max(after_seq, 0) + 1, len(self._order) + 1):
+                cursor = seq
+                attack = self._attacks[self._order[seq - 1]]
+                if honeypot_id is None or attack.get("honeypot_id") == honeypot_id:
+                    rows.append((seq, attack))
+                    if len(rows) >= limit:
+                        break
+        return rows, cursor
+
+    def latest_seq(self):
+        return len(self._order)
+
+    def iter_attacks(self, since=None):
+        with self._lock:
+            attacks = list(self._attacks.values())
+        for attack in attacks:
+            ts = to_wall_seconds(str(attack["timestamp"]))
+            if since is None or ts >= since:
+                yield ts, attack
+
+    def count_by_bucket(self, start, end, bucket_seconds, group_by=(), honeypot_id=None):
+        counts: Dict[Tuple[int, Tuple[str, ...]], int] = {}
+        for ts, attack in self.iter_attacks(since=start):
+            if ts >= end or (honeypot_id is not None and attack.get("honeypot_id") != honeypot_id):
+                continue
+            key = (int(ts // bucket_seconds) * bucket_seconds,
+                   tuple(attack.get(name) or "" for name in group_by))
+            counts[key] = counts.get(key, 0) + 1
+        return sorted((bucket, group, count) for (bucket, group), count in counts.items())
+
+    def get_rollups(self, honeypot_id=None, since=None):
+        with self._lock:
+            items = list(self._rollups.items())
+        return [
+            (hp_id, attack_type, bucket, count)
+            for (hp_id, attack_type, bucket), count in items
+            if (honeypot_id is None or hp_id == honeypot_id)
+            and (since is None or bucket + ROLLUP_BUCKET_SECONDS > since)
+        ]
+
+    def get_attack(self, attack_id):
+        return self._attacks.get(attack_id)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS honeypots (
+    id TEXT PRIMARY KEY,
+    attack_count INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS attacks (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    honeypot_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    timestamp TEXT NOT NULL,
+    source_ip TEXT,
+    attack_type TEXT,
+    username TEXT,
+    password TEXT,
+    details TEXT,
+    attack_hash TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_attacks_honeypot_ts ON attacks (honeypot_id, ts, id);
+CREATE INDEX IF NOT EXISTS idx_attacks_ts ON attacks (ts, id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_attacks_hash ON attacks (attack_hash);
+CREATE INDEX IF NOT EXISTS idx_attacks_source_ip ON attacks (source_ip);
+
+CREATE TABLE IF NOT EXISTS attack_rollups (
+    honeypot_id TEXT NOT NULL,
+    attack_type TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (honeypot_id, attack_type, bucket)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rollups_bucket ON attack_rollups (bucket);
+"""
+
+ATTACK_COLUMNS = ("id", "honeypot_id", "timestamp", "source_ip", "attack_type",
+                  "username", "password", "details", "attack_hash")
+
+
+class SQLiteStorage(StorageBackend):
+    """SQLite storage in WAL mode with indexed attack lookups"""
+
+    name = "sqlite"
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self.db_file = os.path.join(data_dir, "honeypot.db")
+        self._local = threading.local()
+        # Every thread's connection, so close() can release them all
+        self._connections: Dict[threading.Thread, sqlite3.Connection] = {}
+        self._connections_lock = threading.Lock()
+
+        conn = self._conn()
+        conn.executescript(SQLITE_SCHEMA)
+        self._import_json_files()
+        self._build_rollups()
+        self._open_hash_index()
+
+    def _conn(self) -> sqlite3.Connection:
+        """Get the connection for the current thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Only this thread uses the connection; close() may close it from another
+            conn = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                # Connections of threads that have exited are no longer reachable
+                for thread in [t for t in self._connections if not t.is_alive()]:
+                    self._connections.pop(thread).close()
+                self._connections[threading.current_thread()] = conn
+        return conn
+
+    def close(self):
+        """Checkpoint the WAL into the database file and close every thread's connection"""
+        try:
+            self._conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to checkpoint {self.db_file}: {e}")
+        with self._connections_lock:
+            connections, self._connections = list(self._connections.values()), {}
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    def _import_json_files(self):
+        """One-time import of data written by the JSON backend"""
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone():
+            return
+
+        # Read the JSON files (snapshot plus append log) without opening
+        # a live JSONStorage, which would start its flusher thread
+        legacy = JSONStorage.__new__(JSONStorage)
+        legacy.data_dir = self.data_dir
+        legacy.honeypots_file = os.path.join(self.data_dir, "honeypots.json")
+        legacy.attacks_file = os.path.join(self.data_dir, "attacks.json")
+        honeypots = legacy._load_data(legacy.honeypots_file) if os.path.exists(legacy.honeypots_file) else {}
+        attacks = legacy._load_attacks() if os.path.exists(legacy.attacks_file) else {}
+
+        with conn:
+            for honeypot in honeypots.values():
+                self._save_honeypot(conn, honeypot)
+            for attack in attacks.values():
+                self._insert_attack(conn, attack)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('json_imported', ?)",
+                         (datetime.now().isoformat(),))
+
+        if honeypots or attacks:
+            logger.info(f"Imported {len(honeypots)} honeypots and {len(attacks)} attacks into {self.db_file}")
+
+    def _build_rollups(self):
+        """One-time build of the rollup table from existing attacks"""
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'rollups_built'").fetchone():
+            return
+        with conn:
+            conn.execute("DELETE FROM attack_rollups")
+            conn.execute(
+                "INSERT INTO attack_rollups (honeypot_id, attack_type, bucket, count) "
+                "SELECT honeypot_id, COALESCE(attack_type, ''), CAST(ts / ? AS INTEGER) * ?, COUNT(*) "
+                "FROM attacks GROUP BY 1, 2, 3",
+                (ROLLUP_BUCKET_SECONDS, ROLLUP_BUCKET_SECONDS)
+            )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('rollups_built', ?)",
+                         (datetime.now().isoformat(),))
+
+    @staticmethod
+    def _row_to_attack(row) -> Dict[str, Any]:
+        attack = {key: row[key] for key in ATTACK_COLUMNS}
+        attack["details"] = json.loads(row["details"]) if row["details"] else {}
+        return attack
+
+    @staticmethod
+    def _row_to_honeypot(row) -> Dict[str, Any]:
+        honeypot = json.loads(row["data"])
+        honeypot["attack_count"] = row["attack_count"]
+        return honeypot
+
+    # Honeypot operations
+    def get_all_honeypots(self):
+        rows = self._conn().execute("SELECT * FROM honeypots ORDER BY rowid").fetchall()
+        return [self._row_to_honeypot(row) for row in rows]
+
+    def get_honeypot(self, honeypot_id):
+        row = self._conn().execute("SELECT * FROM honeypots WHERE id = ?", (honeypot_id,)).fetchone()
+        return self._row_to_honeypot(row) if row else None
+
+    def _save_honeypot(self, conn, honeypot):
+        conn.execute(
+            "INSERT INTO honeypots (id, attack_count, data) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET attack_count = excluded.attack_count, data = excluded.data",
+            (honeypot["id"], honeypot.get("attack_count", 0), json.dumps(honeypot, default=str))
+        )
+
+    def save_honeypot(self, honeypot):
+        conn = self._conn()
+        with conn:
+            self._save_honeypot(conn, honeypot)
+
+    def delete_honeypot(self, honeypot_id):
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute("DELETE FROM honeypots WHERE id = ?", (honeypot_id,))
+        return cursor.rowcount > 0
+
+    def increment_attack_count(self, honeypot_id, amount=1):
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE honeypots SET attack_count = attack_count + ? WHERE id = ?",
+                (amount, honeypot_id)
+            )
+        return cursor.rowcount > 0
+
+    # Attack operations
+    def count_attack_hashes(self):
+        return self._conn().execute("SELECT COUNT(attack_hash) FROM attacks").fetchone()[0]
+
+    def iter_attack_hashes(self):
+        # Dedicated connection so the rebuild can stream rows
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        try:
+            for (attack_hash,) in conn.execute("SELECT attack_hash FROM attacks WHERE attack_hash IS NOT NULL"):
+                yield attack_hash
+        finally:
+            conn.close()
+
+    def _insert_attack(self, conn, attack) -> bool:
+        timestamp = attack["timestamp"]
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.isoformat()
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO attacks (id, honeypot_id, ts, timestamp, source_ip, attack_type, "
+            "username, password, details, attack_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                attack["id"],
+                attack["honeypot_id"],
+                to_wall_seconds(str(timestamp)),
+                str(timestamp),
+                attack.get("source_ip"),
+                attack.get("attack_type"),
+                attack.get("username"),
+                attack.get("password"),
+                json.dumps(attack.get("details") or {}, default=str),
+                attack.get("attack_hash"),
+            )
+        )
+        return cursor.rowcount > 0
+
+    def insert_attacks(self, attacks):
+        candidates = self._new_candidates(attacks)
+        if not candidates:
+            return []
+
+        inserted = []
+        counts: Dict[str, int] = {}
+        rollups: Dict[Tuple[str, str, int], int] = {}
+        conn = self._conn()
+        with conn:
+            for attack in candidates:
+                # The unique hash index still catches rows written by
+                # another process that this index has not seen yet
+                if self._insert_attack(conn, attack):
+                    inserted.append(attack)
+                    counts[attack["honeypot_id"]] = counts.get(attack["honeypot_id"], 0) + 1
+                    key = (attack["honeypot_id"], attack.get("attack_type") or "",
+                           rollup_bucket(to_wall_seconds(str(attack["timestamp"]))))
+                    rollups[key] = rollups.get(key, 0) + 1
+            conn.executemany(
+                "UPDATE honeypots SET attack_count = attack_count + ? WHERE id = ?",
+                [(count, honeypot_id) for honeypot_id, count in counts.items()]
+            )
+            conn.executemany(
+                "INSERT INTO attack_rollups (honeypot_id, attack_type, bucket, count) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(honeypot_id, attack_type, bucket) DO UPDATE SET count = count + excluded.count",
+                [(*key, count) for key, count in rollups.items()]
+            )
+        self.hash_index.add_many(a.get("attack_hash") for a in inserted)
+        return inserted
+
+    def get_attacks(self, honeypot_id=None, limit=100, offset=0, before=None, after=None):
+        clauses, params = [], []
+        if honeypot_id is not None:
+            clauses.append("honeypot_id = ?")
+            params.append(honeypot_id)
+        if before is not None:
+            clauses.append("(ts, id) < (?, ?)")
+            params.extend(before)
+        if after is not None:
+            clauses.append("(ts, id) > (?, ?)")
+            params.extend(after)
+
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        # Paging forward from an "after" key walks the index upwards
+        order = "ASC" if after is not None else "DESC"
+        rows = self._conn().execute(
+            f"SELECT * FROM attacks {where}ORDER BY ts {order}, id {order} LIMIT ? OFFSET ?",
+            (*params, limit, offset)
+        ).fetchall()
+        if after is not None:
+            rows.reverse()
+        return [self._row_to_attack(row) for row in rows]
+
+    def count_attacks(self, honeypot_id=None):
+        if honeypot_id is None:
+            return self._conn().execute("SELECT COUNT(*) FROM attacks").fetchone()[0]
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM attacks WHERE honeypot_id = ?", (honeypot_id,)
+        ).fetchone()[0]
+
+    def get_changes(self, after_seq, limit=100, honeypot_id=None):
+        conn = self._conn()
+        # Bound the scan by the newest committed seq so the cursor never skips rows
+        latest = self.latest_seq()
+        clauses, params = ["seq > ?", "seq <= ?"], [after_seq, latest]
+        if honeypot_id is not None:
+            clauses.append("honeypot_id = ?")
+            params.append(honeypot_id)
+        rows = conn.execute(
+            f"SELECT * FROM attacks WHERE {' AND '.join(clauses)} ORDER BY seq LIMIT ?",
+            (*params, limit)
+        ).fetchall()
+        cursor = rows[-1]["seq"] if len(rows) >= limit else max(after_seq, latest)
+        return [(row["seq"], self._row_to_attack(row)) for row in rows], cursor
+
+    def latest_seq(self):
+        return self._conn().execute("SELECT COALESCE(MAX(seq), 0) FROM attacks").fetchone()[0]
+
+    def iter_attacks(self, since=None):
+        # Dedicated connection so large scans can stream rows
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = conn.execute(
+                "SELECT seq, id, ts, honeypot_id, source_ip, attack_type, username, password "
+                "FROM attacks WHERE ts >= ? ORDER BY seq",
+                (since if since is not None else float("-inf"),)
+            )
+            for row in rows:
+                yield row["ts"], dict(row)
+        finally:
+            conn.close()
+
+    def count_by_bucket(self, start, end, bucket_seconds, group_by=(), honeypot_id=None):
+        # group_by is validated by DatabaseService, so the names are safe to inline
+        columns = "".join(f", COALESCE({name}, '')" for name in group_by)
+        clauses, params = ["ts >= ?", "ts < ?"], [start, end]
+        if honeypot_id is not None:
+            clauses.append("honeypot_id = ?")
+            params.append(honeypot_id)
+        rows = self._conn().execute(
+            f"SELECT CAST(ts / ? AS INTEGER) AS bucket{columns}, COUNT(*) FROM attacks "
+            f"WHERE {' AND '.join(clauses)} GROUP BY {', '.join(str(i + 1) for i in range(len(group_by) + 1))} "
+            f"ORDER BY bucket",
+            (bucket_seconds, *params)
+        ).fetchall()
+        return [(row[0] * bucket_seconds, tuple(row[1:-1]), row[-1]) for row in rows]
+
+    def get_rollups(self, honeypot_id=None, since=None):
+        clauses, params = [], []
+        if honeypot_id is not None:
+            clauses.append("honeypot_id = ?")
+            params.append(honeypot_id)
+        if since is not None:
+            clauses.append("bucket > ?")
+            params.append(since - ROLLUP_BUCKET_SECONDS)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(
+            f"SELECT honeypot_id, attack_type, bucket, count FROM attack_rollups{where}", params
+        ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def get_attack(self, attack_id):
+        row = self._conn().execute("SELECT * FROM attacks WHERE id = ?", (attack_id,)).fetchone()
+        return self._row_to_attack(row) if row else None
+
+
+BACKENDS = {
+    "sqlite": SQLiteStorage,
+    "json": JSONStorage,
+}
+
+# One backend instance per data directory, shared by every DatabaseService
+_backends: Dict[Any, StorageBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def open_storage(data_dir: str, backend: Optional[str] = None) -> StorageBackend:
+    """Get the shared storage backend for a data directory.
+
+    The backend is chosen by the ``backend`` argument, falling back to the
+    HONEYPOT_STORAGE_BACKEND environment variable and then to SQLite.
+    """
+    backend = (backend or os.getenv("HONEYPOT_STORAGE_BACKEND") or DEFAULT_BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {backend}")
+
+    key = (os.path.abspath(data_dir), backend)
+    with _backends_lock:
+        if key not in _backends:
+            os.makedirs(data_dir, exist_ok=True)
+            _backends[key] = BACKENDS[backend](data_dir)
+            logger.info(f"Opened {backend} storage in {data_dir}")
+        return _backends[key]
+
+
+def close_all_storage():
+    """Close every open storage backend"""
+    with _backends_lock:
+        for backend in _backends.values():
+            try:
+                backend.close()
+            except Exception as e:
+                logger.error(f"Failed to close {backend.name} storage: {e}")
+        _backends.clear()
@@ -0,0 +1,33 @@
+# tests/conftest.py
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+# Run from honeypot-backend with `python -m pytest`; this also makes plain `pytest` work
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import DatabaseService
+from app.models import Attack
+
+
+@pytest.fixture(params=["sqlite", "json"])
+def db_service(request, tmp_path):
+    """A DatabaseService on a fresh data directory, once per storage backend"""
+    return DatabaseService(str(tmp_path / "data"), backend=request.param)
+
+
+def make_attack(n: int, honeypot_id: str = "hp-1", **fields) -> Attack:
+    """The n-th of a series of distinct attacks, one second apart"""
+    data = {
+        "id": f"attack-{n:05d}",
+        "honeypot_id": honeypot_id,
+        "source_ip": f"10.0.{n // 256 % 256}.{n % 256}",
+        "attack_type": "ssh_login_attempt",
+        "username": "root",
+        "password": f"password{n}",
+        "timestamp": datetime(2026, 1, 1) + timedelta(seconds=n),
+    }
+    data.update(fields)
+    return Attack(**data)
@@ -0,0 +1,38 @@
+# tests/test_api_tokens.py
+import pytest
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+
+from app.api_tokens import require_token
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.post("/admin/job", dependencies=[Depends(require_token("HONEYPOT_TEST_TOKEN"))])
+    def start_job():
+        return {"started": True}
+
+    return TestClient(app)
+
+
+def test_routes_are_disabled_until_a_token_is_set(client, monkeypatch):
+    monkeypatch.delenv("HONEYPOT_TEST_TOKEN", raising=False)
+    assert client.post("/admin/job", headers={"Authorization": "Bearer anything"}).status_code == 503
+
+
+@pytest.mark.parametrize("header", [None, "Bearer wrong", "Basic s3cret", "s3cret"])
+def test_requests_without_the_token_are_rejected(client, monkeypatch, header):
+    monkeypatch.setenv("HONEYPOT_TEST_TOKEN", "s3cret")
+    headers = {"Authorization": header} if header else {}
+    response = client.post("/admin/job", headers=headers)
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "Bearer"
+
+
+def test_authorized_request_gets_through(client, monkeypatch):
+    monkeypatch.setenv("HONEYPOT_TEST_TOKEN", "s3cret")
+    response = client.post("/admin/job", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    assert response.json() == {"started": True}
@@ -0,0 +1,195 @@
+# tests/test_attack_detector.py
+import json
+import threading
+import time
+from functools import partial
+
+import pytest
+
+from app import attack_detector
+from app.attack_detector import AttackDetector
+from app.file_tailer import FileTailer
+from app.docker_service import COWRIE_LOG_DIR, DockerService
+
+
+def cowrie_event(n, eventid="cowrie.login.failed"):
+    return json.dumps({"eventid": eventid, "username": f"user{n}", "password": "x",
+                       "src_ip": "198.51.100.7", "timestamp": "2026-06-01T00:00:00.000000Z"}) + "\n"
+
+
+class Collector:
+    def __init__(self):
+        self.usernames = []
+        self.changed = threading.Condition()
+
+    def __call__(self, attacks):
+        with self.changed:
+            self.usernames.extend(a["username"] for a in attacks)
+            self.changed.notify_all()
+        return len(attacks)
+
+    def wait_for(self, count, timeout=5.0):
+        with self.changed:
+            assert self.changed.wait_for(lambda: len(self.usernames) >= count, timeout), self.usernames
+        return list(self.usernames)
+
+
+@pytest.fixture
+def detector_factory(tmp_path):
+    detectors = []
+
+    def make(callback, **kwargs):
+        detector = AttackDetector(callback, offsets_file=str(tmp_path / "offsets.json"), **kwargs)
+        detectors.append(detector)
+        return detector
+
+    yield make
+    for detector in detectors:
+        detector.stop()
+
+
+def test_appended_cowrie_events_reach_the_callback(tmp_path, detector_factory):
+    log_dir = tmp_path / "honeypot_logs" / "hp-1"
+    log_dir.mkdir(parents=True)
+    (log_dir / "cowrie.json").write_text(cowrie_event(0))
+    collector = Collector()
+    detector = detector_factory(collector)
+
+    detector.start()
+    detector.add_honeypot("hp-1", "ssh", str(log_dir))
+    assert collector.wait_for(1) == ["user0"]
+    assert detector.is_watching("hp-1")
+
+    with open(log_dir / "cowrie.json", "a") as f:
+        f.write(cowrie_event(1, "cowrie.session.connect"))
+        f.write(cowrie_event(2))
+    # Cowrie's text log carries the same logins and is not tailed
+    (log_dir / "cowrie.log").write_text("login attempt [b'user9'/b'x'] failed 198.51.100.7\n")
+
+    assert collector.wait_for(2) == ["user0", "user2"]
+    time.sleep(0.2)
+    assert collector.usernames == ["user0", "user2"]
+
+
+def test_restart_resumes_from_the_saved_offset(tmp_path, detector_factory):
+    log_dir = tmp_path / "honeypot_logs" / "hp-1"
+    log_dir.mkdir(parents=True)
+    (log_dir / "cowrie.json").write_text(cowrie_event(0) + cowrie_event(1))
+
+    first = Collector()
+    detector = detector_factory(first)
+    detector.start()
+    detector.add_honeypot("hp-1", "ssh", str(log_dir))
+    first.wait_for(2)
+    detector.stop()
+
+    with open(log_dir / "cowrie.json", "a") as f:
+        f.write(cowrie_event(2))
+    second = Collector()
+    detector = detector_factory(second)
+    detector.start()
+    detector.add_honeypot("hp-1", "ssh", str(log_dir))
+    assert second.wait_for(1) == ["user2"]
+
+
+def test_rejected_attacks_are_read_again(tmp_path, detector_factory):
+    log_dir = tmp_path / "honeypot_logs" / "hp-1"
+    log_dir.mkdir(parents=True)
+    (log_dir / "cowrie.json").write_text(cowrie_event(0))
+    accept = [0]
+    seen = Collector()
+
+    def callback(attacks):
+        seen(attacks)
+        return accept[0]
+
+    detector = detector_factory(callback)
+    detector.start()
+    detector.add_honeypot("hp-1", "ssh", str(log_dir))
+    seen.wait_for(1)
+
+    # The next event for the file re-reads the chunk that was not accepted
+    accept[0] = 10
+    with open(log_dir / "cowrie.json", "a") as f:
+        f.write(cowrie_event(1))
+    assert seen.wait_for(3) == ["user0", "user0", "user1"]
+
+
+def test_log_mount_is_found_by_its_container_destination(tmp_path):
+    service = DockerService.__new__(DockerService)
+    mounts = [
+        {"Type": "volume", "Destination": COWRIE_LOG_DIR, "Source": "/var/lib/docker/volumes/x"},
+        {"Type": "bind", "Destination": "/etc/cowrie", "Source": "/srv/config"},
+        {"Type": "bind", "Destination": COWRIE_LOG_DIR, "Source": str(tmp_path / "hp-1")},
+    ]
+    api = type("Api", (), {"inspect_container": staticmethod(lambda _id: {"Mounts": mounts})})()
+    service.client = type("Client", (), {"api": api})()
+    assert service.get_log_mount("c1") == str(tmp_path / "hp-1")
+
+    mounts.pop()
+    assert service.get_log_mount("c1") is None
+
+
+def test_many_honeypots_share_one_watch_and_a_fixed_pool(tmp_path, detector_factory):
+    root = tmp_path / "honeypot_logs"
+    collector = Collector()
+    detector = detector_factory(collector, workers=3)
+    detector.start()
+    (root / "hp-0").mkdir(parents=True)
+    detector.add_honeypot("hp-0", "ssh", str(root / "hp-0"))
+    # The first honeypot adds the watch's own threads; later ones add none
+    threads_with_one = threading.active_count()
+
+    for n in range(1, 20):
+        (root / f"hp-{n}").mkdir(parents=True)
+        detector.add_honeypot(f"hp-{n}", "ssh", str(root / f"hp-{n}"))
+    for n in range(20):
+        (root / f"hp-{n}" / "cowrie.json").write_text(cowrie_event(n))
+
+    assert sorted(collector.wait_for(20)) == sorted(f"user{n}" for n in range(20))
+    metrics = detector.metrics()
+    assert metrics["watched_directories"] == 1
+    assert metrics["workers"] == 3
+    assert threading.active_count() == threads_with_one
+
+    for n in range(20):
+        detector.remove_honeypot(f"hp-{n}")
+    assert detector.metrics()["watched_directories"] == 0
+
+
+def test_events_are_routed_by_the_deepest_log_directory(tmp_path, detector_factory):
+    detector = detector_factory(Collector())
+    root = tmp_path / "honeypot_logs"
+    detector.add_honeypot("outer", "web", str(root / "outer"))
+    detector.add_honeypot("inner", "ssh", str(root / "outer" / "inner"))
+
+    detector.dispatch(str(root / "outer" / "inner" / "sub" / "cowrie.json"))
+    detector.dispatch(str(root / "outer" / "access.log"))
+    detector.dispatch(str(root / "outer" / "inner" / "cowrie.log"))
+    detector.dispatch(str(tmp_path / "elsewhere" / "cowrie.json"))
+
+    assert {h: set(files) for h, files in detector._pending.items()} == {
+        "inner": {str(root / "outer" / "inner" / "sub" / "cowrie.json")},
+        "outer": {str(root / "outer" / "access.log")},
+    }
+
+
+def test_a_busy_honeypot_does_not_starve_a_quiet_one(tmp_path, detector_factory, monkeypatch):
+    # Tiny chunks and turns, so the busy log takes many turns to drain
+    monkeypatch.setattr(attack_detector, "FileTailer", partial(FileTailer, chunk_size=256))
+    monkeypatch.setattr(attack_detector, "CHUNKS_PER_TURN", 1)
+    root = tmp_path / "honeypot_logs"
+    (root / "busy").mkdir(parents=True)
+    (root / "quiet").mkdir(parents=True)
+    (root / "busy" / "cowrie.json").write_text("".join(cowrie_event(n) for n in range(200)))
+    (root / "quiet" / "cowrie.json").write_text(cowrie_event(999))
+
+    collector = Collector()
+    detector = detector_factory(collector, workers=1)
+    detector.add_honeypot("busy", "ssh", str(root / "busy"))
+    detector.add_honeypot("quiet", "ssh", str(root / "quiet"))
+    detector.start()
+
+    usernames = collector.wait_for(201)
+    assert usernames.index("user999") < 10
+    assert usernames.count("user999") == 1
@@ -0,0 +1,89 @@
+# tests/test_attack_sync.py
+import asyncio
+import threading
+import time
+
+from app.attack_sync import AttackSync
+from app.models import Honeypot
+
+
+class FakeDocker:
+    """Container log reads that take ``delays[honeypot_id]`` seconds"""
+
+    def __init__(self, delays, fail=()):
+        self.delays = delays
+        self.fail = set(fail)
+        self.events = []
+        self._lock = threading.Lock()
+
+    def get_attacks_from_container(self, container_id, honeypot_id, honeypot_type):
+        time.sleep(self.delays.get(honeypot_id, 0))
+        if honeypot_id in self.fail:
+            raise RuntimeError("container went away")
+        return [{"honeypot_id": honeypot_id}], f"cursor-{honeypot_id}"
+
+    def commit_log_cursor(self, container_id, cursor):
+        with self._lock:
+            self.events.append(("commit", cursor))
+
+
+class FakePipeline:
+    def __init__(self, docker):
+        self.docker = docker
+
+    async def submit_many(self, attacks):
+        self.docker.events.append(("queued", attacks[0]["honeypot_id"]))
+        return len(attacks)
+
+
+def honeypots(*ids):
+    return [Honeypot(id=i, name=i, type="ssh", ip_address="127.0.0.1", port="22",
+                     status="active", container_id=f"c-{i}") for i in ids]
+
+
+def test_honeypots_are_read_concurrently():
+    docker = FakeDocker({f"hp{n}": 0.2 for n in range(4)})
+    syncer = AttackSync(docker, FakePipeline(docker), concurrency=4, timeout=5)
+
+    started = time.monotonic()
+    asyncio.run(syncer.sync(honeypots("hp0", "hp1", "hp2", "hp3")))
+
+    assert time.monotonic() - started < 0.6
+    assert sorted(e for e in docker.events if e[0] == "commit") == [("commit", f"cursor-hp{n}") for n in range(4)]
+
+
+def test_cursor_is_committed_after_the_attacks_are_queued():
+    docker = FakeDocker({})
+    asyncio.run(AttackSync(docker, FakePipeline(docker)).sync(honeypots("hp0")))
+    assert docker.events == [("queued", "hp0"), ("commit", "cursor-hp0")]
+
+
+def test_failed_read_commits_nothing_and_spares_the_others():
+    docker = FakeDocker({}, fail={"bad"})
+    asyncio.run(AttackSync(docker, FakePipeline(docker)).sync(honeypots("bad", "good")))
+    assert docker.events == [("queued", "good"), ("commit", "cursor-good")]
+
+
+def test_slow_honeypot_is_skipped_until_its_late_attacks_are_queued():
+    docker = FakeDocker({"slow": 0.3})
+    syncer = AttackSync(docker, FakePipeline(docker), timeout=0.05)
+
+    async def main():
+        started = time.monotonic()
+        await syncer.sync(honeypots("slow", "fast"))
+        assert time.monotonic() - started < 0.25
+        assert syncer.in_flight == {"slow"}
+        assert docker.events == [("queued", "fast"), ("commit", "cursor-fast")]
+
+        # The next round must not start a second read of the same container
+        await syncer.sync(honeypots("slow"))
+        assert docker.events == [("queued", "fast"), ("commit", "cursor-fast")]
+
+        deadline = time.monotonic() + 2
+        while ("commit", "cursor-slow") not in docker.events:
+            assert time.monotonic() < deadline, "late attacks were never queued"
+            await asyncio.sleep(0.02)
+        assert syncer.in_flight == set()
+
+    asyncio.run(main())
+    assert docker.events[-2:] == [("queued", "slow"), ("commit", "cursor-slow")]
@@ -0,0 +1,132 @@
+# tests/test_backfill.py
+import json
+import os
+
+import pytest
+
+from app.backfill import BackfillManager, resolve_under, run_backfill
+from app.database import DatabaseService
+from app.models import Honeypot
+
+
+def cowrie_login(n):
+    return json.dumps({
+        "eventid": "cowrie.login.failed", "username": "root", "password": f"pw{n}",
+        "src_ip": "198.51.100.4", "session": f"s{n}", "timestamp": f"2026-01-01T00:00:{n:02d}.000000Z",
+    })
+
+
+class FakeContainer:
+    def __init__(self, lines):
+        self.lines = lines
+
+    def logs(self, stream, follow, timestamps):
+        assert stream and not follow and timestamps
+        for n, line in enumerate(self.lines):
+            yield f"2026-01-01T00:00:{n:02d}.000000000Z {line}\n".encode()
+
+
+class FakeDocker:
+    """Just enough of DockerService for dump_container_logs"""
+
+    def __init__(self, lines):
+        container = FakeContainer(lines)
+        self.client = type("Client", (), {})()
+        self.client.containers = type("Containers", (), {"get": staticmethod(lambda _id: container)})()
+
+
+@pytest.fixture
+def honeypot():
+    hp = Honeypot(name="ssh-1", type="ssh", ip_address="127.0.0.1", port=2222, container_id="c0ffee" * 4)
+    hp.id = "hp-ssh"
+    return hp
+
+
+@pytest.fixture
+def log_root(tmp_path):
+    root = tmp_path / "logs"
+    (root / "ssh-1").mkdir(parents=True)
+    (root / "ssh-1" / "cowrie.json").write_text("\n".join(cowrie_login(n) for n in range(5)) + "\n")
+    (root / "ssh-1" / "cowrie.json.1").write_text(cowrie_login(9) + "\n")
+    (root / "ssh-1" / "notes.txt").write_text("not a log\n")
+    return root
+
+
+def test_resolve_under_accepts_paths_inside_root(log_root):
+    path = resolve_under(str(log_root / "ssh-1" / ".." / "ssh-1" / "cowrie.json"), str(log_root))
+    assert path == os.path.realpath(log_root / "ssh-1" / "cowrie.json")
+
+
+@pytest.mark.parametrize("relative", ["..", "../logs-other/cowrie.json", "ssh-1/../../secret"])
+def test_resolve_under_rejects_paths_outside_root(log_root, relative):
+    with pytest.raises(ValueError, match="outside"):
+        resolve_under(str(log_root / relative), str(log_root))
+
+
+def test_create_job_lists_rotated_logs_for_the_type(tmp_path, log_root, honeypot):
+    manager = BackfillManager(db_service=None, dump_dir=str(tmp_path / "backfill"))
+    job = manager.create_job(honeypot, log_dir=str(log_root / "ssh-1"), root=str(log_root))
+    assert [os.path.basename(path) for path, _ in job.files] == ["cowrie.json", "cowrie.json.1"]
+
+
+def test_create_job_confines_paths_and_log_dirs_to_root(tmp_path, log_root, honeypot):
+    outside = tmp_path / "etc"
+    outside.mkdir()
+    (outside / "cowrie.json").write_text(cowrie_login(0) + "\n")
+    manager = BackfillManager(db_service=None, dump_dir=str(tmp_path / "backfill"))
+
+    with pytest.raises(ValueError, match="outside"):
+        manager.create_job(honeypot, paths=[str(outside / "cowrie.json")], root=str(log_root))
+    with pytest.raises(ValueError, match="outside"):
+        manager.create_job(honeypot, log_dir=str(outside), root=str(log_root))
+    with pytest.raises(ValueError, match="outside"):
+        manager.create_job(honeypot, log_dir=str(log_root / ".." / "etc"), root=str(log_root))
+
+
+def test_create_job_rejects_symlinks_out_of_root(tmp_path, log_root, honeypot):
+    secret = tmp_path / "secret.json"
+    secret.write_text(cowrie_login(0) + "\n")
+    # A symlink found while walking the log directory must not escape it either
+    os.symlink(secret, log_root / "ssh-1" / "cowrie.json.2")
+    manager = BackfillManager(db_service=None, dump_dir=str(tmp_path / "backfill"))
+
+    with pytest.raises(ValueError, match="outside"):
+        manager.create_job(honeypot, log_dir=str(log_root / "ssh-1"), root=str(log_root))
+
+
+def test_container_dump_is_removed_after_backfill(tmp_path, honeypot):
+    db = DatabaseService(str(tmp_path / "data"))
+    dump_dir = tmp_path / "backfill"
+    docker = FakeDocker([cowrie_login(n) for n in range(3)] + ['{"eventid": "cowrie.session.closed"}'])
+    manager = BackfillManager(db, docker_service=docker, dump_dir=str(dump_dir))
+
+    job = manager.create_job(honeypot, container=True)
+    (dump_path, docker_timestamps), = job.files
+    assert docker_timestamps and os.path.isfile(dump_path)
+
+    run_backfill(job, db, workers=1)
+
+    assert job.status == "completed"
+    assert (job.lines, job.parsed, job.saved) == (4, 3, 3)
+    assert not os.path.exists(dump_path)
+
+
+def test_container_dump_is_removed_when_the_job_cannot_start(tmp_path, honeypot):
+    dump_dir = tmp_path / "backfill"
+    manager = BackfillManager(db_service=None, docker_service=FakeDocker([cowrie_login(0)]),
+                              dump_dir=str(dump_dir))
+
+    with pytest.raises(ValueError, match="not found"):
+        manager.create_job(honeypot, paths=[str(tmp_path / "missing.json")], container=True)
+    assert os.listdir(dump_dir) == []
+
+
+def test_log_files_are_left_alone(tmp_path, log_root, honeypot):
+    db = DatabaseService(str(tmp_path / "data"))
+    manager = BackfillManager(db, dump_dir=str(tmp_path / "backfill"))
+    job = manager.create_job(honeypot, log_dir=str(log_root / "ssh-1"), root=str(log_root))
+
+    run_backfill(job, db, workers=1)
+
+    assert job.saved == 6
+    assert all(os.path.isfile(path) for path, _ in job.files)
@@ -0,0 +1,147 @@
+# tests/test_broadcaster.py
+import json
+import asyncio
+
+from app.broadcaster import AttackBroadcaster
+from conftest import make_attack
+
+
+class FakeWebSocket:
+    """Collects what the broadcaster sends"""
+
+    client = None
+
+    def __init__(self):
+        self.frames = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.frames.append(json.loads(text))
+
+    async def send_bytes(self, data):
+        self.frames.append(data)
+
+    async def close(self, code=1000):
+        pass
+
+    def attacks(self):
+        return [frame["seq"] for frame in self.frames if "seq" in frame and "type" not in frame]
+
+    def replies(self):
+        return [frame for frame in self.frames if frame.get("type") == "subscribed"]
+
+
+async def settle():
+    # Let the fan-out and sender tasks run
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+
+
+def run(scenario, **options):
+    async def main():
+        broadcaster = AttackBroadcaster(**options)
+        broadcaster.start()
+        try:
+            return await scenario(broadcaster)
+        finally:
+            await broadcaster.stop()
+    return asyncio.run(main())
+
+
+async def resume(broadcaster, last_seq, epoch=None, **subscription):
+    websocket = FakeWebSocket()
+    await broadcaster.connect(websocket)
+    message = {"type": "subscribe", "last_seq": last_seq,
+               "epoch": epoch or broadcaster.epoch, **subscription}
+    broadcaster.handle_message(websocket, json.dumps(message))
+    await settle()
+    return websocket
+
+
+def test_resume_replays_missed_attacks():
+    async def scenario(broadcaster):
+        broadcaster.publish([make_attack(n) for n in range(5)])
+        await settle()
+        websocket = await resume(broadcaster, last_seq=2)
+        reply, = websocket.replies()
+        assert reply["replayed"] == 3 and not reply["reset"]
+        assert reply["seq"] == 5
+        assert websocket.attacks() == [3, 4, 5]
+    run(scenario)
+
+
+def test_replay_honours_the_new_filter():
+    async def scenario(broadcaster):
+        broadcaster.publish([make_attack(n, honeypot_id=f"hp-{n % 2}") for n in range(6)])
+        await settle()
+        websocket = await resume(broadcaster, last_seq=0, honeypot_ids=["hp-1"])
+        assert websocket.attacks() == [2, 4, 6]
+    run(scenario)
+
+
+def test_live_attacks_are_not_replayed_again():
+    async def scenario(broadcaster):
+        websocket = FakeWebSocket()
+        await broadcaster.connect(websocket)
+        broadcaster.publish([make_attack(n) for n in range(3)])
+        await settle()
+        assert websocket.attacks() == [1, 2, 3]
+
+        broadcaster.handle_message(websocket, json.dumps(
+            {"type": "subscribe", "last_seq": 0, "epoch": broadcaster.epoch}))
+        await settle()
+        assert websocket.replies()[0]["replayed"] == 0
+        assert websocket.attacks() == [1, 2, 3]
+    run(scenario)
+
+
+def test_resume_resets_when_the_buffer_has_moved_on():
+    async def scenario(broadcaster):
+        broadcaster.publish([make_attack(n) for n in range(10)])
+        await settle()
+        websocket = await resume(broadcaster, last_seq=2)
+        assert websocket.replies()[0]["reset"]
+        assert websocket.attacks() == []
+
+        # The oldest seq still buffered can be resumed from
+        websocket = await resume(broadcaster, last_seq=7)
+        assert websocket.attacks() == [8, 9, 10]
+    run(scenario, replay_size=3)
+
+
+def test_resume_resets_on_another_epoch_or_a_future_seq():
+    async def scenario(broadcaster):
+        broadcaster.publish([make_attack(n) for n in range(3)])
+        await settle()
+        stale = await resume(broadcaster, last_seq=1, epoch="restarted")
+        ahead = await resume(broadcaster, last_seq=9)
+        assert stale.replies()[0]["reset"] and ahead.replies()[0]["reset"]
+        assert stale.attacks() == ahead.attacks() == []
+    run(scenario)
+
+
+def test_leader_assigned_numbering():
+    async def scenario(broadcaster):
+        # The event bus leader announces its epoch, then numbers every batch
+        broadcaster.publish([], 1, "leader-1")
+        broadcaster.publish([make_attack(n) for n in range(3)], 1, "leader-1")
+        broadcaster.publish([make_attack(n) for n in range(3, 5)], 4, "leader-1")
+        await settle()
+        assert (broadcaster.epoch, broadcaster.seq) == ("leader-1", 5)
+        websocket = await resume(broadcaster, last_seq=3)
+        assert websocket.attacks() == [4, 5]
+
+        # Missed batches leave a gap that can't be replayed across
+        broadcaster.publish([make_attack(9)], 9, "leader-1")
+        await settle()
+        assert (await resume(broadcaster, last_seq=5)).replies()[0]["reset"]
+        assert (await resume(broadcaster, last_seq=8)).attacks() == [9]
+
+        # A new leader starts a new epoch
+        broadcaster.publish([make_attack(10)], 1, "leader-2")
+        await settle()
+        assert (await resume(broadcaster, last_seq=9, epoch="leader-1")).replies()[0]["reset"]
+        assert (await resume(broadcaster, last_seq=0)).attacks() == [1]
+    run(scenario)
@@ -0,0 +1,58 @@
+# tests/test_bulk_save.py
+from datetime import datetime
+
+from app.ingest import save_attack_data
+from app.log_parsers import parse_lines
+from app.models import Honeypot
+
+COWRIE_LINES = [
+    "2026-04-02T08:00:0%d.000000Z [HoneyPotSSHTransport,%d,203.0.113.%d] login attempt [b'root'/b'pw%d'] failed"
+    % (n, n, n, n)
+    for n in range(4)
+]
+
+
+def honeypot(db_service, honeypot_id):
+    hp = Honeypot(id=honeypot_id, name=honeypot_id, type="ssh", ip_address="127.0.0.1", port="22")
+    return db_service.create_honeypot(hp)
+
+
+def test_parsed_lines_are_saved_in_one_batch(db_service):
+    honeypot(db_service, "hp-a")
+    saved = save_attack_data(parse_lines("ssh", COWRIE_LINES, "hp-a"), db_service)
+
+    assert [a.source_ip for a in saved] == [f"203.0.113.{n}" for n in range(4)]
+    assert saved[0].timestamp == datetime(2026, 4, 2, 8, 0, 0)
+    assert db_service.count_attacks("hp-a") == 4
+    assert db_service.get_honeypot("hp-a").attack_count == 4
+
+
+def test_only_new_attacks_bump_attack_counts(db_service):
+    honeypot(db_service, "hp-a")
+    honeypot(db_service, "hp-b")
+    save_attack_data(parse_lines("ssh", COWRIE_LINES[:2], "hp-a"), db_service)
+
+    # Two repeats for hp-a, one new for hp-a and two for hp-b in the same call
+    batch = (parse_lines("ssh", COWRIE_LINES[:3], "hp-a")
+             + parse_lines("ssh", COWRIE_LINES[2:], "hp-b"))
+    saved = save_attack_data(batch, db_service)
+
+    assert [(a.honeypot_id, a.source_ip) for a in saved] == [
+        ("hp-a", "203.0.113.2"), ("hp-b", "203.0.113.2"), ("hp-b", "203.0.113.3"),
+    ]
+    assert db_service.get_honeypot("hp-a").attack_count == 3
+    assert db_service.get_honeypot("hp-b").attack_count == 2
+
+
+def test_malformed_records_are_skipped_not_fatal(db_service):
+    good = parse_lines("ssh", COWRIE_LINES[:1], "hp-a")
+    saved = save_attack_data([{"honeypot_id": "hp-a"}] + good + [{"source_ip": "1.2.3.4"}], db_service)
+    assert len(saved) == 1
+    assert db_service.count_attacks() == 1
+
+
+def test_save_attack_is_a_batch_of_one(db_service):
+    attack = save_attack_data(parse_lines("ssh", COWRIE_LINES[:1], "hp-a"), db_service)[0]
+    assert db_service.save_attack(attack.copy(update={"id": "again"})) is None
+    fresh = save_attack_data(parse_lines("ssh", COWRIE_LINES[1:2], "hp-a"), db_service)[0]
+    assert db_service.get_attack(fresh.id).username == "root"
@@ -0,0 +1,141 @@
+# tests/test_change_feed.py
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.change_feed import ChangeFeed
+from app.database import DatabaseService
+from app.models import Attack
+
+T0 = datetime(2026, 4, 1)
+
+
+def attacks(*specs):
+    """Attacks from (id, honeypot_id, minutes after T0) triples; equal ids are duplicates"""
+    return [Attack(id=attack_id, honeypot_id=honeypot_id, source_ip="192.0.2.1",
+                   attack_type="ssh_login_attempt", username=attack_id,
+                   timestamp=T0 + timedelta(minutes=minutes))
+            for attack_id, honeypot_id, minutes in specs]
+
+
+@pytest.fixture(params=["sqlite", "json"])
+def database(request, tmp_path):
+    database = DatabaseService(str(tmp_path), backend=request.param)
+    yield database
+    database.storage.close()
+
+
+def test_changes_follow_insertion_order_not_timestamps(database):
+    database.save_attacks(attacks(("late", "hp-1", 30), ("early", "hp-1", 0)))
+    database.save_attacks(attacks(("backfilled", "hp-1", -600)))
+
+    found, cursor = database.get_attack_changes(0)
+    assert [a.id for a in found] == ["late", "early", "backfilled"]
+    assert cursor == database.latest_change_cursor() == 3
+
+
+def test_paging_with_the_cursor_visits_every_attack_once(database):
+    database.save_attacks(attacks(*((f"a{n}", "hp-1", n) for n in range(25))))
+    seen, cursor = [], 0
+    while True:
+        page, cursor = database.get_attack_changes(cursor, limit=10)
+        if not page:
+            break
+        seen.extend(a.id for a in page)
+    assert seen == [f"a{n}" for n in range(25)]
+
+    database.save_attacks(attacks(("a25", "hp-1", 25)))
+    page, cursor = database.get_attack_changes(cursor, limit=10)
+    assert [a.id for a in page] == ["a25"] and cursor == 26
+
+
+def test_a_filtered_scan_still_moves_the_cursor(database):
+    database.save_attacks(attacks(("x", "hp-2", 0), ("y", "hp-2", 1), ("z", "hp-1", 2), ("w", "hp-2", 3)))
+
+    page, cursor = database.get_attack_changes(0, honeypot_id="hp-3")
+    assert page == [] and cursor == 4
+
+    page, cursor = database.get_attack_changes(0, limit=1, honeypot_id="hp-1")
+    assert [a.id for a in page] == ["z"] and cursor == 3
+
+
+def test_duplicates_do_not_advance_the_feed(database):
+    database.save_attacks(attacks(("a", "hp-1", 0)))
+    database.save_attacks(attacks(("a", "hp-1", 0)))
+    assert database.latest_change_cursor() == 1
+    assert database.get_attack_changes(1) == ([], 1)
+
+
+def test_an_empty_store_starts_at_zero(database):
+    assert database.latest_change_cursor() == 0
+    assert database.get_attack_changes(0) == ([], 0)
+
+
+def test_notify_from_a_worker_thread_wakes_the_waiting_reader():
+    async def main():
+        feed = ChangeFeed()
+        waiter = feed.register()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        threading.Timer(0.05, feed.notify).start()
+
+        assert await feed.wait(waiter, timeout=2)
+        assert loop.time() - started < 1
+        assert feed.waiting() == 0 and feed.notifications == 1
+
+    asyncio.run(main())
+
+
+def test_a_notify_before_the_wait_is_not_lost():
+    async def main():
+        feed = ChangeFeed()
+        waiter = feed.register()
+        # The insert lands between the reader's empty check and its wait
+        feed.notify()
+        assert await feed.wait(waiter, timeout=0.5)
+
+    asyncio.run(main())
+
+
+def test_wait_times_out_and_unregister_forgets_the_reader():
+    async def main():
+        feed = ChangeFeed()
+        waiter = feed.register()
+        assert not await feed.wait(waiter, timeout=0.02)
+        feed.unregister(waiter)
+        assert feed.waiting() == 0
+        feed.notify()
+        assert not waiter.done()
+
+    asyncio.run(main())
+
+
+def test_saving_attacks_wakes_long_polls_on_the_database(tmp_path):
+    database = DatabaseService(str(tmp_path), backend="sqlite")
+
+    async def poll(since, timeout):
+        feed = database.get_change_feed()
+        waiter = feed.register()
+        try:
+            found, cursor = database.get_attack_changes(since)
+            if not found and await feed.wait(waiter, timeout):
+                found, cursor = database.get_attack_changes(cursor)
+            return [a.id for a in found]
+        finally:
+            feed.unregister(waiter)
+
+    async def main():
+        since = database.latest_change_cursor()
+        waiting = asyncio.ensure_future(poll(since, timeout=2))
+        await asyncio.sleep(0.02)
+        await asyncio.get_running_loop().run_in_executor(
+            None, database.save_attacks, attacks(("new", "hp-1", 0)))
+        assert await asyncio.wait_for(waiting, 1) == ["new"]
+
+        # Nothing stored means the poll runs out its timeout with nothing
+        assert await poll(database.latest_change_cursor(), timeout=0.05) == []
+
+    asyncio.run(main())
+    database.storage.close()
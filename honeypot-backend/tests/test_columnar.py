@@ -0,0 +1,110 @@
+# tests/test_columnar.py
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import database
+from app.columnar import ColumnarAttackStore
+from app.database import DatabaseService
+from app.models import Attack
+
+
+def rows(count, seed=3, start=1_767_225_600):
+    rng = random.Random(seed)
+    return [
+        (start + rng.randrange(3 * 86400), {
+            "honeypot_id": rng.choice(["a", "b", "c"]),
+            "attack_type": rng.choice(["scan", "login_attempt"]),
+            "source_ip": f"203.0.113.{rng.randrange(20)}",
+        })
+        for _ in range(count)
+    ]
+
+
+def test_columns_grow_past_their_initial_capacity():
+    store = ColumnarAttackStore(initial_capacity=4)
+    data = rows(1000)
+    store.append_many(data[:10], chunk_size=3)
+    store.append_many(data[10:], chunk_size=256)
+
+    assert len(store) == 1000
+    stats = store.stats(since=0)
+    assert stats["total"] == 1000
+    assert stats["by_type"] == Counter(a["attack_type"] for _, a in data)
+    assert stats["by_honeypot"] == Counter(a["honeypot_id"] for _, a in data)
+
+
+def test_filters_and_histogram_match_a_plain_loop():
+    store = ColumnarAttackStore()
+    data = rows(500)
+    store.append_many(data)
+    start, end = 1_767_225_600 + 3600, 1_767_225_600 + 2 * 86400
+
+    expected = Counter(
+        (ts // 3600 * 3600, (a["attack_type"],))
+        for ts, a in data if start <= ts < end and a["honeypot_id"] == "b"
+    )
+    got = store.histogram(start, end, 3600, ("attack_type",), honeypot_id="b")
+    assert {(bucket, group): count for bucket, group, count in got} == expected
+    assert [bucket for bucket, _, _ in got] == sorted(bucket for bucket, _, _ in got)
+
+    days = store.stats(since=start, honeypot_id="c")["by_day"]
+    assert days == Counter(ts // 86400 * 86400 for ts, a in data if ts >= start and a["honeypot_id"] == "c")
+
+
+def test_unknown_honeypot_matches_nothing():
+    store = ColumnarAttackStore()
+    store.append_many(rows(50))
+    assert store.stats(since=0, honeypot_id="nope")["total"] == 0
+    assert store.histogram(None, None, 60, honeypot_id="nope") == []
+
+
+@pytest.fixture
+def columnar_db(tmp_path, monkeypatch):
+    monkeypatch.setenv("HONEYPOT_COLUMNAR_CACHE", "1")
+    return DatabaseService(str(tmp_path / "data"), backend="sqlite")
+
+
+def recent_attacks(count, offset=0):
+    now = datetime.utcnow()
+    return [
+        Attack(id=f"col-{n}", honeypot_id=["a", "b"][n % 2], attack_type=["scan", "xss", "sqli"][n % 3],
+               source_ip="192.0.2.9", password=str(n), timestamp=now - timedelta(minutes=37 * n))
+        for n in range(offset, offset + count)
+    ]
+
+
+def test_columnar_answers_match_the_storage_queries(columnar_db, monkeypatch):
+    columnar_db.save_attacks(recent_attacks(100))
+    # Built after the first batch, then kept up to date on insert
+    assert len(columnar_db.get_columnar()) == 100
+    columnar_db.save_attacks(recent_attacks(100, offset=100))
+
+    end = datetime.utcnow() + timedelta(hours=1)
+    start = end - timedelta(days=5)
+    with_cache = columnar_db.get_attack_histogram(start, end, "hour", ["honeypot_id"])
+    stats_with_cache = columnar_db.get_honeypot_attack_stats("a", days=3)
+    totals_with_cache = columnar_db.get_attack_stats(days=2)
+
+    monkeypatch.setenv("HONEYPOT_COLUMNAR_CACHE", "0")
+    assert columnar_db.get_attack_histogram(start, end, "hour", ["honeypot_id"]) == with_cache
+    assert sum(b["count"] for b in with_cache) == sum(
+        1 for a in recent_attacks(200) if start <= a.timestamp < end
+    )
+    # Both paths start their windows at the hour containing the cutoff
+    assert columnar_db.get_honeypot_attack_stats("a", days=3) == stats_with_cache
+    assert columnar_db.get_attack_stats(days=2) == totals_with_cache
+
+
+def test_too_many_rows_falls_back_to_the_rollups(columnar_db, monkeypatch):
+    monkeypatch.setattr(database, "COLUMNAR_MAX_ROWS", 10)
+    monkeypatch.setattr(database, "COLUMNAR_RECONCILE_SECONDS", 0)
+    columnar_db.save_attacks(recent_attacks(5))
+    assert len(columnar_db.get_columnar()) == 5
+
+    # The cache outgrows the limit and is dropped at the next reconcile
+    columnar_db.save_attacks(recent_attacks(15, offset=5))
+    assert columnar_db.get_columnar() is None
+    assert columnar_db.get_attack_stats(days=30)["total"] == 20
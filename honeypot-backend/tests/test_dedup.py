@@ -0,0 +1,98 @@
+# tests/test_dedup.py
+import os
+import hashlib
+
+import pytest
+
+from app.dedup import BloomFilter, AttackHashIndex, hash_digest, DIGEST_SIZE
+from conftest import make_attack
+
+
+def digest(n: int) -> bytes:
+    return hashlib.md5(str(n).encode()).digest()
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000)
+    for n in range(1000):
+        bloom.add(digest(n))
+    assert all(bloom.might_contain(digest(n)) for n in range(1000))
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom = BloomFilter(10000, error_rate=0.01)
+    for n in range(10000):
+        bloom.add(digest(n))
+    false_positives = sum(bloom.might_contain(digest(n)) for n in range(10000, 60000))
+    assert false_positives / 50000 < 0.02
+
+
+def test_hash_digest_accepts_any_string():
+    md5 = hashlib.md5(b"x").hexdigest()
+    assert hash_digest(md5) == bytes.fromhex(md5)
+    assert len(hash_digest("not hex")) == DIGEST_SIZE
+
+
+def test_index_is_reloaded_from_its_file(tmp_path):
+    index_file = str(tmp_path / "hashes.idx")
+    hashes = [hashlib.md5(str(n).encode()).hexdigest() for n in range(100)]
+    index = AttackHashIndex(index_file)
+    index.load(0, [])
+    index.add_many(hashes)
+    assert index.contains(hashes[0]) and not index.contains("missing")
+
+    def no_rebuild():
+        raise AssertionError("index should not be rebuilt")
+        yield
+
+    reloaded = AttackHashIndex(index_file)
+    reloaded.load(100, no_rebuild())
+    assert len(reloaded) == 100
+    assert all(reloaded.contains(h) for h in hashes)
+
+
+@pytest.mark.parametrize("damage", ["torn", "stale"])
+def test_index_is_rebuilt_when_out_of_date(tmp_path, damage):
+    index_file = str(tmp_path / "hashes.idx")
+    hashes = [hashlib.md5(str(n).encode()).hexdigest() for n in range(10)]
+    index = AttackHashIndex(index_file)
+    index.load(0, [])
+    index.add_many(hashes[:5])
+    if damage == "torn":
+        with open(index_file, "ab") as f:
+            f.write(b"\x00" * 3)
+
+    # Storage has 10 hashes but the file only knows 5 (or is torn)
+    reloaded = AttackHashIndex(index_file)
+    reloaded.load(10, iter(hashes))
+    assert len(reloaded) == 10
+    assert os.path.getsize(index_file) == 10 * DIGEST_SIZE
+
+
+def test_save_attacks_skips_duplicates(db_service):
+    first = db_service.save_attacks([make_attack(n) for n in range(5)])
+    assert len(first) == 5
+
+    # Same content under new IDs, repeated within the batch and against storage
+    again = [make_attack(n, id=f"copy-{n}") for n in (3, 4, 4, 5)]
+    saved = db_service.save_attacks(again)
+
+    assert [a.id for a in saved] == ["copy-5"]
+    assert db_service.count_attacks() == 6
+    assert db_service.attack_exists(make_attack(4).dict())
+    assert not db_service.attack_exists(make_attack(99).dict())
+
+
+def test_duplicates_are_caught_after_reopening(db_service):
+    db_service.save_attacks([make_attack(n) for n in range(3)])
+    storage = db_service.storage
+    storage.close()
+
+    reopened = type(storage)(db_service.data_dir)
+    try:
+        attack = make_attack(1)
+        attack.attack_hash = db_service._get_attack_hash(attack.dict())
+        assert reopened.attack_hash_exists(attack.attack_hash)
+        assert reopened.insert_attacks([attack.dict()]) == []
+    finally:
+        reopened.close()
@@ -0,0 +1,94 @@
+# tests/test_docker_log_cursor.py
+import json
+
+import pytest
+
+from app import docker_service
+from app.docker_service import DockerService, LogCursorStore, parse_docker_timestamp
+
+
+@pytest.mark.parametrize("stamp, expected", [
+    ("2026-01-01T00:00:00.123456789Z", (1767225600, 123456789)),
+    ("2026-01-01T00:00:01.5Z", (1767225601, 500000000)),
+    ("2026-01-01T00:00:02Z", (1767225602, 0)),
+    ("2026-01-01T00:00:03.1234567891234Z", (1767225603, 123456789)),
+    ("not-a-timestamp", None),
+])
+def test_parse_docker_timestamp(stamp, expected):
+    assert parse_docker_timestamp(stamp) == expected
+
+
+def test_cursor_store_only_moves_forward_and_persists(tmp_path):
+    path = tmp_path / "cursors.json"
+    store = LogCursorStore(str(path))
+    store.set("abc", (100, 5))
+    store.set("abc", (100, 4))
+    store.set("abc", (99, 999999999))
+    assert store.get("abc") == (100, 5)
+    assert json.loads(path.read_text()) == {"abc": "100.000000005"}
+
+    store.set("def", (7, 0), persist=False)
+    assert "def" not in json.loads(path.read_text())
+    store.flush()
+    assert LogCursorStore(str(path)).get("def") == (7, 0)
+
+    store.remove("abc")
+    assert LogCursorStore(str(path)).get("abc") is None
+
+
+class FakeContainer:
+    """Serves timestamped log lines the way docker's since option does"""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.calls = []
+
+    def logs(self, timestamps, since=None):
+        self.calls.append(since)
+        # Like docker given a whole second, earlier lines from that second come back too
+        out = [
+            f"{stamp} {text}" for stamp, text in self.lines
+            if since is None or parse_docker_timestamp(stamp)[0] >= int(since)
+        ]
+        return "\n".join(out).encode()
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    container = FakeContainer([
+        ("2026-01-01T00:00:00.100000000Z", "first"),
+        ("2026-01-01T00:00:00.200000000Z", "second"),
+    ])
+    client = type("Client", (), {})()
+    client.containers = type("Containers", (), {"get": staticmethod(lambda _id: container)})()
+    monkeypatch.setattr(docker_service.docker, "from_env", lambda: client)
+    svc = DockerService(cursor_file=str(tmp_path / "cursors.json"), log_root=str(tmp_path / "logs"))
+    svc.container = container
+    return svc
+
+
+def test_only_lines_after_the_committed_cursor_are_returned(service):
+    lines, cursor = service.get_new_container_logs("c1")
+    assert lines == ["first", "second"]
+    assert service.container.calls == [None]
+
+    # Not committed yet, so the same lines come back
+    assert service.get_new_container_logs("c1")[0] == ["first", "second"]
+
+    service.commit_log_cursor("c1", cursor)
+    service.container.lines.append(("2026-01-01T00:00:00.300000000Z", "third"))
+    lines, cursor = service.get_new_container_logs("c1")
+
+    # Lines up to the checkpoint are sent again and must be skipped
+    assert service.container.calls[-1] == pytest.approx(1767225600.2)
+    assert lines == ["third"]
+    assert cursor == (1767225600, 300000000)
+
+
+def test_no_new_lines_leaves_the_cursor_alone(service):
+    _, cursor = service.get_new_container_logs("c1")
+    service.commit_log_cursor("c1", cursor)
+    lines, newest = service.get_new_container_logs("c1")
+    assert (lines, newest) == ([], None)
+    service.commit_log_cursor("c1", newest)
+    assert service.log_cursors.get("c1") == (1767225600, 200000000)
@@ -0,0 +1,106 @@
+# tests/test_event_bus.py
+import os
+import stat
+import asyncio
+
+import pytest
+
+from app import event_bus
+from app.event_bus import EventBus
+from conftest import make_attack
+
+pytestmark = pytest.mark.skipif(event_bus.fcntl is None, reason="needs fcntl and Unix sockets")
+
+
+class Worker:
+    """One worker's side of the bus, recording what it would broadcast"""
+
+    def __init__(self, socket_path):
+        self.delivered = []
+        self.commands = []
+        self.bus = EventBus(self.deliver, socket_path=socket_path)
+
+    def deliver(self, attacks, first_seq, epoch):
+        self.delivered.extend((attack.id, first_seq + i, epoch) for i, attack in enumerate(attacks))
+
+    async def on_command(self, command):
+        self.commands.append(command)
+
+    async def start(self):
+        await self.bus.start(on_command=self.on_command)
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+
+def test_leader_numbers_every_workers_attacks(tmp_path, monkeypatch):
+    monkeypatch.setenv("HONEYPOT_EVENT_BUS", "1")
+
+    async def main():
+        leader, follower = Worker(str(tmp_path / "bus.sock")), Worker(str(tmp_path / "bus.sock"))
+        await leader.start()
+        await follower.start()
+        try:
+            await wait_for(lambda: follower.bus.metrics()["connected"])
+            assert leader.bus.is_leader and not follower.bus.is_leader
+
+            leader.bus.publish([make_attack(n) for n in range(2)])
+            follower.bus.publish([make_attack(n) for n in range(2, 5)])
+            follower.bus.command({"type": "reconcile_ingestion"})
+            await wait_for(lambda: len(follower.delivered) == 5 and leader.commands)
+
+            # Both workers hand their clients the same numbers in the leader's epoch
+            assert leader.delivered == follower.delivered
+            assert [seq for _, seq, _ in leader.delivered] == [1, 2, 3, 4, 5]
+            assert {epoch for _, _, epoch in leader.delivered} == {leader.bus.epoch}
+            assert leader.commands == [{"type": "reconcile_ingestion"}]
+            assert follower.commands == []
+        finally:
+            await follower.bus.stop()
+            await leader.bus.stop()
+
+    asyncio.run(main())
+
+
+def test_standalone_bus_numbers_its_own_attacks(tmp_path, monkeypatch):
+    monkeypatch.setenv("HONEYPOT_EVENT_BUS", "0")
+
+    async def main():
+        worker = Worker(str(tmp_path / "bus.sock"))
+        await worker.start()
+        worker.bus.publish([make_attack(n) for n in range(3)])
+        worker.bus.command({"type": "reconcile_ingestion"})
+        await asyncio.sleep(0)
+        assert [seq for _, seq, _ in worker.delivered] == [1, 2, 3]
+        assert worker.commands == [{"type": "reconcile_ingestion"}]
+        await worker.bus.stop()
+
+    asyncio.run(main())
+
+
+def test_leader_socket_is_private_and_replaces_a_stale_one(tmp_path, monkeypatch):
+    monkeypatch.setenv("HONEYPOT_EVENT_BUS", "1")
+    socket_path = tmp_path / "bus.sock"
+    socket_path.write_text("left behind by a crashed leader")
+    old_umask = os.umask(0o000)
+
+    async def main():
+        worker = Worker(str(socket_path))
+        await worker.start()
+        try:
+            assert worker.bus.is_leader
+            mode = os.stat(socket_path).st_mode
+            assert stat.S_ISSOCK(mode)
+            assert stat.S_IMODE(mode) == 0o600
+            assert sorted(p.name for p in tmp_path.iterdir()) == ["bus.sock", "bus.sock.lock"]
+        finally:
+            await worker.bus.stop()
+
+    try:
+        asyncio.run(main())
+    finally:
+        os.umask(old_umask)
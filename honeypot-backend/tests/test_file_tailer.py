@@ -0,0 +1,118 @@
+# tests/test_file_tailer.py
+import os
+
+import pytest
+
+from app.file_tailer import FileTailer, TailOffsetStore
+
+
+@pytest.fixture
+def offsets(tmp_path):
+    return TailOffsetStore(str(tmp_path / "offsets.json"))
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / "logs" / "cowrie.json")
+
+
+def write(path: str, text: str, mode: str = "a"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, mode) as f:
+        f.write(text)
+
+
+def read_all(tailer: FileTailer):
+    return [line for batch in tailer.read_lines() for line in batch]
+
+
+def test_partial_line_waits_for_its_newline(log_path, offsets):
+    tailer = FileTailer(log_path, offsets)
+    write(log_path, "one\ntwo\nthr")
+    assert read_all(tailer) == ["one", "two"]
+
+    write(log_path, "ee\n")
+    assert read_all(tailer) == ["three"]
+    assert read_all(tailer) == []
+
+
+def test_batch_is_checkpointed_only_when_the_next_is_requested(log_path, offsets):
+    write(log_path, "".join(f"line {n}\n" for n in range(10)))
+    tailer = FileTailer(log_path, offsets, chunk_size=16)
+
+    # A batch the caller never finished with is read again
+    first = next(tailer.read_lines())
+    assert next(tailer.read_lines()) == first
+
+    lines = read_all(tailer)
+    assert lines == [f"line {n}" for n in range(10)]
+
+
+def test_max_chunks_leaves_the_rest_for_later(log_path, offsets):
+    write(log_path, "".join(f"line {n}\n" for n in range(10)))
+    tailer = FileTailer(log_path, offsets, chunk_size=16)
+
+    first = [line for batch in tailer.read_lines(max_chunks=2) for line in batch]
+    assert tailer.has_more
+    rest = read_all(tailer)
+    assert not tailer.has_more
+    assert first + rest == [f"line {n}" for n in range(10)]
+
+
+def test_rotation_drains_the_old_file_first(log_path, offsets):
+    tailer = FileTailer(log_path, offsets)
+    write(log_path, "a\nb\n")
+    assert read_all(tailer) == ["a", "b"]
+
+    # Written after the last read, then the file is rotated away
+    write(log_path, "c\nunterminated")
+    os.rename(log_path, f"{log_path}.1")
+    write(log_path, "d\n")
+
+    assert read_all(tailer) == ["c", "unterminated", "d"]
+    assert read_all(tailer) == []
+
+
+def test_rotated_file_that_is_gone_starts_the_new_one_fresh(log_path, offsets):
+    tailer = FileTailer(log_path, offsets)
+    write(log_path, "a\n")
+    read_all(tailer)
+
+    # Replaced rather than renamed, so the old inode can't be found
+    write(f"{log_path}.new", "b\n")
+    os.replace(f"{log_path}.new", log_path)
+    assert read_all(tailer) == ["b"]
+
+
+def test_truncated_file_is_read_from_the_start(log_path, offsets):
+    tailer = FileTailer(log_path, offsets)
+    write(log_path, "first\nsecond\n")
+    read_all(tailer)
+
+    write(log_path, "new\n", mode="w")
+    assert read_all(tailer) == ["new"]
+
+
+def test_overlong_line_is_skipped(log_path, offsets):
+    write(log_path, "short\n" + "x" * 100 + "\nafter\n")
+    tailer = FileTailer(log_path, offsets, chunk_size=16)
+    assert read_all(tailer) == ["short", "after"]
+
+
+def test_offsets_survive_a_restart(log_path, offsets):
+    write(log_path, "a\nb\n")
+    read_all(FileTailer(log_path, offsets))
+    offsets.flush()
+
+    write(log_path, "c\n")
+    restarted = TailOffsetStore(offsets.path)
+    assert read_all(FileTailer(log_path, restarted)) == ["c"]
+
+
+def test_symlinks_are_not_followed(tmp_path, log_path, offsets):
+    secret = tmp_path / "secret.txt"
+    secret.write_text("root:x:0:0\n")
+    os.makedirs(os.path.dirname(log_path))
+    os.symlink(secret, log_path)
+
+    assert read_all(FileTailer(log_path, offsets)) == []
@@ -0,0 +1,130 @@
+# tests/test_ingest.py
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import ingest
+from app.ingest import IngestionPipeline
+from app.models import Attack
+
+
+def attacks(count, start=0):
+    return [
+        Attack(id=f"ing-{n}", honeypot_id="hp-ingest", source_ip="192.0.2.1", attack_type="activity",
+               timestamp=datetime(2026, 3, 1) + timedelta(minutes=n), attack_hash=f"h{n}")
+        for n in range(start, start + count)
+    ]
+
+
+class FlakyDatabase:
+    """Records saved batches; fails the first ``failures`` saves"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.batches = []
+        self.recovered = threading.Event()
+
+    def save_attacks(self, batch):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        self.recovered.set()
+        self.batches.append([a.id for a in batch])
+        return list(batch)
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(ingest, "SAVE_RETRY_DELAY", 0.01)
+    monkeypatch.setattr(ingest, "SAVE_RETRY_MAX_DELAY", 0.02)
+
+
+def test_queued_attacks_are_saved_in_batches_of_batch_size():
+    db, notified = FlakyDatabase(), []
+    pipeline = IngestionPipeline(db, notified.append, batch_size=3, flush_interval=0)
+
+    async def main():
+        pipeline.start()
+        assert pipeline.offer(attacks(7)) == 7
+        await pipeline.stop()
+
+    asyncio.run(main())
+    assert [len(b) for b in db.batches] == [3, 3, 1]
+    assert [a.id for batch in notified for a in batch] == [f"ing-{n}" for n in range(7)]
+    assert pipeline.metrics()["saved"] == 7
+
+
+def test_zero_flush_interval_is_not_replaced_by_the_default(monkeypatch):
+    monkeypatch.setenv("HONEYPOT_INGEST_FLUSH_MS", "250")
+    assert IngestionPipeline(None, print, flush_interval=0).flush_interval == 0
+    assert IngestionPipeline(None, print).flush_interval == 0.25
+
+
+def test_a_flush_interval_lets_a_trickle_share_one_batch():
+    db = FlakyDatabase()
+    pipeline = IngestionPipeline(db, lambda _: None, batch_size=100, flush_interval=0.2)
+
+    async def main():
+        pipeline.start()
+        for attack in attacks(4):
+            await pipeline.submit(attack)
+            await asyncio.sleep(0.01)
+        await pipeline.stop()
+
+    asyncio.run(main())
+    assert db.batches == [[f"ing-{n}" for n in range(4)]]
+
+
+def test_failed_batch_is_retried_until_saved():
+    db, notified = FlakyDatabase(failures=3), []
+    pipeline = IngestionPipeline(db, notified.append, batch_size=10, flush_interval=0)
+
+    async def main():
+        pipeline.start()
+        pipeline.offer(attacks(5))
+        await pipeline.stop()
+
+    asyncio.run(main())
+    assert db.batches == [[f"ing-{n}" for n in range(5)]]
+    assert len(notified) == 1
+    metrics = pipeline.metrics()
+    assert (metrics["retries"], metrics["failed"], metrics["saved"]) == (3, 0, 5)
+
+
+def test_checkpointing_producer_waits_while_storage_is_down():
+    # A producer only advances its checkpoint once submit_threadsafe
+    # accepted everything, so it has to block rather than drop
+    db = FlakyDatabase(failures=20)
+    pipeline = IngestionPipeline(db, lambda _: None, max_queue=2, batch_size=2, flush_interval=0)
+    accepted = []
+
+    async def main():
+        pipeline.start()
+        producer = threading.Thread(target=lambda: accepted.append(pipeline.submit_threadsafe(attacks(6), timeout=None)))
+        producer.start()
+        await asyncio.sleep(0.1)
+        assert not accepted and not db.recovered.is_set()
+        await asyncio.get_running_loop().run_in_executor(None, producer.join, 5)
+        await pipeline.stop()
+
+    asyncio.run(main())
+    assert accepted == [6]
+    assert [a for batch in db.batches for a in batch] == [f"ing-{n}" for n in range(6)]
+    assert pipeline.metrics()["dropped"] == 0
+
+
+def test_stopping_while_retrying_counts_the_batch_as_failed():
+    db = FlakyDatabase(failures=10 ** 6)
+    pipeline = IngestionPipeline(db, lambda _: None, batch_size=10, flush_interval=0)
+
+    async def main():
+        pipeline.start()
+        pipeline.offer(attacks(4))
+        await pipeline.stop(timeout=0.1)
+
+    asyncio.run(main())
+    metrics = pipeline.metrics()
+    assert metrics["failed"] == 4 and metrics["retries"] > 0
+    assert db.batches == []
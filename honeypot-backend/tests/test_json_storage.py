@@ -0,0 +1,108 @@
+# tests/test_json_storage.py
+import json
+import time
+
+import pytest
+
+from app import storage
+from app.storage import JSONStorage
+
+
+def attack(n):
+    return {
+        "id": f"json-{n}",
+        "honeypot_id": "hp-json",
+        "source_ip": "203.0.113.5",
+        "attack_type": "login_attempt",
+        "timestamp": f"2026-02-01T10:00:{n:02d}",
+        "details": {},
+        "attack_hash": f"hash-{n}",
+    }
+
+
+@pytest.mark.skipif(storage.fcntl is None, reason="needs fcntl")
+def test_second_instance_on_a_data_dir_refuses_to_open(tmp_path):
+    first = JSONStorage(str(tmp_path), fsync_interval=0)
+    try:
+        first.insert_attacks([attack(n) for n in range(3)])
+        segments_before = first._segment_numbers()
+
+        # Another worker would reuse the active segment number and compact it away
+        with pytest.raises(RuntimeError, match="already open"):
+            JSONStorage(str(tmp_path), fsync_interval=0)
+        assert first._segment_numbers() == segments_before
+
+        first.compact()
+        first.insert_attacks([attack(3)])
+    finally:
+        first.close()
+
+    reopened = JSONStorage(str(tmp_path), fsync_interval=0)
+    try:
+        assert reopened.count_attacks() == 4
+        assert [a["id"] for a in reopened.get_attacks(limit=2)] == ["json-3", "json-2"]
+    finally:
+        reopened.close()
+
+
+def test_appends_survive_a_restart_without_compaction(tmp_path):
+    first = JSONStorage(str(tmp_path), fsync_interval=0)
+    first.insert_attacks([attack(n) for n in range(3)])
+    first.insert_attacks([attack(3)])
+    first.close()
+
+    # Nothing was compacted, so the snapshot is still empty and the segment is replayed
+    assert (tmp_path / "attacks.json").read_text() == "{}"
+    reopened = JSONStorage(str(tmp_path), fsync_interval=0)
+    try:
+        assert reopened.count_attacks() == 4
+        assert reopened.latest_seq() == 4
+    finally:
+        reopened.close()
+
+
+def test_torn_last_record_is_skipped_on_replay(tmp_path):
+    first = JSONStorage(str(tmp_path), fsync_interval=0)
+    first.insert_attacks([attack(0), attack(1)])
+    segment = first._segment_path(first._segment_no)
+    first.close()
+    with open(segment, "a") as f:
+        f.write('{"id": "json-2", "honeypot_id": "hp-js')
+
+    reopened = JSONStorage(str(tmp_path), fsync_interval=0)
+    try:
+        assert sorted(a["id"] for a in reopened.get_attacks()) == ["json-0", "json-1"]
+    finally:
+        reopened.close()
+
+
+def test_compaction_folds_sealed_segments_into_the_snapshot(tmp_path):
+    store = JSONStorage(str(tmp_path), fsync_interval=0)
+    try:
+        store.insert_attacks([attack(n) for n in range(5)])
+        store.compact()
+        # Only the fresh active segment is left, and it is empty
+        assert store._segment_numbers() == [store._segment_no]
+        assert len(json.loads((tmp_path / "attacks.json").read_text())) == 5
+
+        store.insert_attacks([attack(5)])
+    finally:
+        store.close()
+
+    reopened = JSONStorage(str(tmp_path), fsync_interval=0)
+    try:
+        assert reopened.count_attacks() == 6
+    finally:
+        reopened.close()
+
+
+def test_flusher_compacts_once_the_segment_passes_compact_bytes(tmp_path):
+    store = JSONStorage(str(tmp_path), fsync_interval=0.01, compact_bytes=1)
+    try:
+        store.insert_attacks([attack(0)])
+        deadline = time.monotonic() + 5
+        while "json-0" not in (tmp_path / "attacks.json").read_text():
+            assert time.monotonic() < deadline, "segment was never compacted"
+            time.sleep(0.01)
+    finally:
+        store.close()
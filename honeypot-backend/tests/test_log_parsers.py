@@ -0,0 +1,84 @@
+# tests/test_log_parsers.py
+import pytest
+
+from app.log_parsers import (
+    GENERIC_PARSER, PARSERS, SAMPLE_LINES, CowrieLogParser, LogParser, get_parser, parse_lines,
+)
+
+
+@pytest.mark.parametrize("line, username, password, attack_type", [
+    ("2025-03-31T17:38:31.123456Z [HoneyPotSSHTransport,12,203.0.113.7] login attempt [b'root'/b'123456'] failed",
+     "root", "123456", "login_attempt"),
+    ("2025-03-31T17:38:31+0000 [HoneyPotSSHTransport,3,203.0.113.7] login attempt [admin/p/w] succeeded",
+     "admin", "p/w", "login_success"),
+    ("2025-03-31T17:38:31.5Z [HoneyPotSSHTransport,4,203.0.113.7] login attempt [b''/b''] failed",
+     "", "", "login_attempt"),
+])
+def test_cowrie_text_logins(line, username, password, attack_type):
+    attack = get_parser("ssh").parse_line(line, "hp")
+    assert (attack["username"], attack["password"], attack["attack_type"]) == (username, password, attack_type)
+    assert attack["source_ip"] == "203.0.113.7"
+    assert attack["timestamp"] == "2025-03-31T17:38:31"
+    assert attack["details"]["raw_log"] == line
+
+
+def test_cowrie_json_keeps_session_details_and_drops_other_events():
+    parser = get_parser("SSH")
+    login, connect = SAMPLE_LINES["ssh"][2], SAMPLE_LINES["ssh"][3]
+
+    attack = parser.parse_line(login, "hp")
+    assert attack["timestamp"] == "2025-03-31T17:38:32.000000"
+    assert attack["details"]["session"] == "a1b2c3d4"
+    assert attack["username"] == "admin"
+    assert parser.parse_line(connect, "hp") is None
+    assert parser.parse_line('{"eventid": "cowrie.login.failed", broken', "hp") is None
+
+
+@pytest.mark.parametrize("stamp, expected", [
+    ("31/Mar/2025:17:38:31 +0000", "2025-03-31T17:38:31"),
+    ("01/Apr/2025:02:08:31 +0530", "2025-03-31T20:38:31"),
+    ("31/Dec/2025:20:00:00 -0500", "2026-01-01T01:00:00"),
+])
+def test_web_access_times_become_naive_utc(stamp, expected):
+    line = f'203.0.113.9 - - [{stamp}] "GET /wp-login.php HTTP/1.1" 404 153 "-" "curl/8.0"'
+    attack = get_parser("web").parse_line(line, "hp")
+    assert attack["timestamp"] == expected
+    assert attack["details"]["path"] == "/wp-login.php"
+
+
+def test_web_requests_without_signatures_are_not_attacks():
+    assert get_parser("web").parse_line(SAMPLE_LINES["web"][1], "hp") is None
+    assert get_parser("web").parse_line("no quotes here 203.0.113.9", "hp") is None
+
+
+@pytest.mark.parametrize("line, username, source_ip", [
+    ("(?@203.0.113.20) [WARNING] Authentication failed for user [root]", "root", "203.0.113.20"),
+    ("pure-ftpd: (?@10.1.1.1) [INFO] User bob OK", "bob", "10.1.1.1"),
+    ("Password required for username=carol", "carol", "127.0.0.1"),
+])
+def test_ftp_lines(line, username, source_ip):
+    attack = get_parser("ftp").parse_line(line, "hp")
+    assert (attack["username"], attack["source_ip"], attack["attack_type"]) == (username, source_ip, "ftp_login_attempt")
+
+
+def test_unknown_types_use_the_generic_parser():
+    assert get_parser("telnet") is GENERIC_PARSER
+    assert get_parser(None) is GENERIC_PARSER
+    assert parse_lines("telnet", SAMPLE_LINES["generic"], "hp")[0]["source_ip"] == "203.0.113.30"
+    assert set(PARSERS) == {"ssh", "web", "ftp"}
+
+
+def test_a_line_that_raises_is_skipped():
+    class Picky(LogParser):
+        def parse_line(self, line, honeypot_id):
+            if line == "boom":
+                raise ValueError("bad line")
+            return super().parse_line(line, honeypot_id)
+
+    attacks = Picky().parse_lines(["from 192.0.2.1", "boom", "from 192.0.2.2"], "hp")
+    assert [a["source_ip"] for a in attacks] == ["192.0.2.1", "192.0.2.2"]
+
+
+def test_cowrie_only_tails_its_json_log():
+    assert CowrieLogParser.log_files == ("cowrie.json",)
+    assert LogParser.log_files == ("*.log", "*.json")
@@ -0,0 +1,109 @@
+# tests/test_log_streamer.py
+import calendar
+
+from app.docker_service import LogCursorStore
+from app.log_parsers import get_parser
+from app.log_streamer import ContainerLogStreamer, LogStreamManager
+from app.models import Honeypot
+
+NOON = calendar.timegm((2026, 5, 5, 12, 0, 0))
+
+
+def login_line(second, user):
+    stamp = f"2026-05-05T12:00:{second:02d}.000000000Z"
+    return (f"{stamp} {stamp} [HoneyPotSSHTransport,1,203.0.113.{second}] "
+            f"login attempt [b'{user}'/b'x'] failed\n").encode()
+
+
+class FakeDockerService:
+    def __init__(self, cursor_file):
+        self.log_cursors = LogCursorStore(cursor_file)
+
+    def parse_log_lines(self, lines, honeypot_id, honeypot_type):
+        return get_parser(honeypot_type).parse_lines(lines, honeypot_id)
+
+
+class FakeClient:
+    """Hands out a fixed list of chunks as the container's follow stream"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.log_kwargs = []
+        client = self
+
+        class Container:
+            def logs(self, **kwargs):
+                client.log_kwargs.append(kwargs)
+                return iter(client.chunks)
+
+        self.containers = type("Containers", (), {"get": staticmethod(lambda _id: Container())})()
+
+
+def streamer(tmp_path, accept=None):
+    received = []
+
+    def on_attacks(honeypot_id, attacks):
+        received.append([a["username"] for a in attacks])
+        return len(attacks) if accept is None else accept
+
+    service = FakeDockerService(str(tmp_path / "cursors.json"))
+    return ContainerLogStreamer(service, "hp-stream", "ssh", "container-1", on_attacks), received
+
+
+def test_lines_split_across_chunks_are_parsed_once_complete(tmp_path):
+    s, received = streamer(tmp_path)
+    first, second = login_line(1, "alice"), login_line(2, "bob")
+    client = FakeClient([first[:30], first[30:] + second[:10], second[10:]])
+
+    s._follow(client)
+
+    assert received == [["alice"], ["bob"]]
+    assert client.log_kwargs[0] == {"stream": True, "follow": True, "timestamps": True}
+    assert s.docker_service.log_cursors.get("container-1") == (NOON + 2, 0)
+
+
+def test_reconnect_resumes_after_the_checkpoint(tmp_path):
+    s, received = streamer(tmp_path)
+    s._follow(FakeClient([login_line(1, "alice")]))
+
+    # Docker's since is inclusive, so the stream starts with the line already seen
+    client = FakeClient([login_line(1, "alice"), login_line(3, "carol")])
+    s._follow(client)
+
+    assert received == [["alice"], ["carol"]]
+    assert client.log_kwargs[0]["since"] == NOON + 1
+
+
+def test_checkpoint_stays_put_when_attacks_are_not_all_queued(tmp_path):
+    s, received = streamer(tmp_path, accept=0)
+    s._follow(FakeClient([login_line(1, "alice"), login_line(2, "bob")]))
+
+    # The stream stops at the first batch that couldn't be queued
+    assert received == [["alice"]]
+    assert s.docker_service.log_cursors.get("container-1") is None
+
+
+def test_lines_without_attacks_still_advance_the_checkpoint(tmp_path):
+    s, received = streamer(tmp_path)
+    s._follow(FakeClient([b"2026-05-05T12:00:09.000000000Z Remote SSH version: SSH-2.0-Go\n"]))
+    assert received == []
+    assert s.docker_service.log_cursors.get("container-1") == (NOON + 9, 0)
+
+
+def test_manager_only_streams_active_honeypots_with_containers(tmp_path, monkeypatch):
+    started = []
+    monkeypatch.setattr(ContainerLogStreamer, "start", lambda self: started.append(self.honeypot_id))
+    manager = LogStreamManager(FakeDockerService(str(tmp_path / "c.json")), pipeline=None)
+    manager.enabled = True
+
+    def honeypot(hp_id, **fields):
+        return Honeypot(id=hp_id, name=hp_id, type="ssh", ip_address="127.0.0.1", port="22", **fields)
+
+    manager.start(honeypot("created", container_id="c1"))
+    manager.start(honeypot("no-container", status="active"))
+    manager.start(honeypot("active", status="active", container_id="c2"))
+    assert started == ["active"]
+    assert manager.honeypot_ids() == ["active"]
+
+    manager.stop("active")
+    assert manager.honeypot_ids() == []
@@ -0,0 +1,67 @@
+# tests/test_pagination.py
+import pytest
+
+from app.database import encode_cursor, decode_cursor
+from conftest import make_attack
+
+
+def test_cursor_round_trip():
+    attack = make_attack(7)
+    ts, attack_id = decode_cursor(encode_cursor(attack))
+    assert attack_id == attack.id
+    assert ts == pytest.approx(1767225607.0)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "W10", "WyJ4Il0"])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_pages_cover_every_attack_once(db_service):
+    db_service.save_attacks([make_attack(n) for n in range(25)])
+
+    seen, cursor = [], None
+    while True:
+        page = db_service.get_attacks(limit=10, before=cursor)
+        if not page:
+            break
+        seen.extend(a.id for a in page)
+        cursor = encode_cursor(page[-1])
+
+    assert seen == [make_attack(n).id for n in reversed(range(25))]
+
+
+def test_pages_stay_stable_when_attacks_arrive(db_service):
+    db_service.save_attacks([make_attack(n) for n in range(10)])
+    first = db_service.get_attacks(limit=5)
+
+    # Newer attacks must not shift the next page the way an offset would
+    db_service.save_attacks([make_attack(n) for n in range(100, 103)])
+    second = db_service.get_attacks(limit=5, before=encode_cursor(first[-1]))
+
+    assert [a.id for a in second] == [make_attack(n).id for n in range(4, -1, -1)]
+
+
+def test_after_pages_back_towards_newer_attacks(db_service):
+    db_service.save_attacks([make_attack(n) for n in range(10)])
+    page = db_service.get_attacks(limit=3, after=encode_cursor(make_attack(2)))
+    # Still newest first, starting just after the cursor
+    assert [a.id for a in page] == [make_attack(n).id for n in (5, 4, 3)]
+
+
+def test_equal_timestamps_are_ordered_by_id(db_service):
+    attacks = [make_attack(n, timestamp=make_attack(0).timestamp) for n in range(6)]
+    db_service.save_attacks(attacks)
+
+    first = db_service.get_attacks(limit=3)
+    second = db_service.get_attacks(limit=3, before=encode_cursor(first[-1]))
+
+    assert [a.id for a in first + second] == sorted((a.id for a in attacks), reverse=True)
+
+
+def test_count_is_exact_per_honeypot(db_service):
+    db_service.save_attacks([make_attack(n) for n in range(4)])
+    db_service.save_attacks([make_attack(n, honeypot_id="hp-2") for n in range(10, 13)])
+    assert db_service.count_attacks() == 7
+    assert db_service.count_attacks("hp-2") == 3
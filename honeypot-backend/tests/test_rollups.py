@@ -0,0 +1,86 @@
+# tests/test_rollups.py
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+from app.models import Attack
+from app.storage import ROLLUP_BUCKET_SECONDS, to_wall_seconds
+
+HONEYPOTS = ["hp-ssh", "hp-web"]
+TYPES = ["login_attempt", "sql_injection", "xss"]
+
+
+def random_attacks(count, seed=7):
+    """Attacks over the last six days, none within an hour of the one-day cutoff"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    attacks = []
+    while len(attacks) < count:
+        age = timedelta(seconds=rng.uniform(60, 6 * 86400))
+        if abs(age - timedelta(days=1)) < timedelta(hours=2):
+            continue
+        n = len(attacks)
+        attacks.append(Attack(
+            id=f"r{n}", honeypot_id=rng.choice(HONEYPOTS), attack_type=rng.choice(TYPES),
+            source_ip=f"198.51.100.{n % 250}", password=str(n), timestamp=now - age,
+        ))
+    return attacks, now
+
+
+def brute_force_rollups(attacks):
+    return Counter(
+        (a.honeypot_id, a.attack_type, int(to_wall_seconds(a.timestamp) // ROLLUP_BUCKET_SECONDS) * ROLLUP_BUCKET_SECONDS)
+        for a in attacks
+    )
+
+
+def test_rollups_match_counting_the_attacks(db_service):
+    attacks, _ = random_attacks(400)
+    for start in range(0, 400, 64):
+        db_service.save_attacks(attacks[start:start + 64])
+
+    rows = {(hp, t, bucket): count for hp, t, bucket, count in db_service.storage.get_rollups()}
+    assert rows == brute_force_rollups(attacks)
+
+
+def test_duplicates_do_not_count(db_service):
+    attacks, _ = random_attacks(50)
+    db_service.save_attacks(attacks)
+    db_service.save_attacks([a.copy(update={"id": f"dup-{a.id}", "attack_hash": None}) for a in attacks[:20]])
+
+    assert sum(count for *_, count in db_service.storage.get_rollups()) == 50
+
+
+def test_stats_windows_agree_with_the_raw_attacks(db_service):
+    attacks, now = random_attacks(300)
+    db_service.save_attacks(attacks)
+
+    week = db_service.get_attack_stats(days=7)
+    assert week["total"] == 300
+    assert week["by_type"] == dict(Counter(a.attack_type for a in attacks))
+    assert week["by_honeypot"] == dict(Counter(a.honeypot_id for a in attacks))
+    assert week["daily"] == dict(Counter(a.timestamp.strftime("%Y-%m-%d") for a in attacks))
+
+    recent = [a for a in attacks if a.timestamp > now - timedelta(days=1)]
+    day = db_service.get_attack_stats(days=1)
+    assert day["total"] == len(recent)
+    assert day["by_type"] == dict(Counter(a.attack_type for a in recent))
+
+    ssh = db_service.get_honeypot_attack_stats("hp-ssh", days=1)
+    assert ssh["total"] == sum(1 for a in recent if a.honeypot_id == "hp-ssh")
+    assert sum(ssh["by_hour"].values()) == ssh["total"]
+
+
+def test_rollups_are_the_same_after_reopening(db_service):
+    attacks, _ = random_attacks(120, seed=11)
+    db_service.save_attacks(attacks)
+    storage = db_service.storage
+    before = sorted(storage.get_rollups())
+    storage.close()
+
+    reopened = type(storage)(db_service.data_dir)
+    try:
+        assert sorted(reopened.get_rollups()) == before
+        assert sorted(reopened.get_rollups(honeypot_id="hp-web")) == [r for r in before if r[0] == "hp-web"]
+    finally:
+        reopened.close()
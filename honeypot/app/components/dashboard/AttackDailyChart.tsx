@@ -10,6 +10,7 @@ import {
   Tooltip,
   Legend,
 } from 'chart.js';
+import { getAttackHistogram } from '@/lib/api-client';
 
 ChartJS.register(
   CategoryScale,
@@ -35,10 +36,15 @@ const AttackDailyBarChart: React.FC<AttackDailyProps> = ({
   useEffect(() => {
     const fetchAttackData = async () => {
       try {
-        const response = await fetch(`/honeypots/${honeypotId}/attacks?limit=1000`);
-        const data = await response.json();
+        // Start of the first local day in the range, sent as UTC since the server works in UTC
+        const rangeStart = new Date();
+        rangeStart.setDate(rangeStart.getDate() - (days - 1));
+        rangeStart.setHours(0, 0, 0, 0);
+        const start = rangeStart.toISOString();
+
+        // Server day buckets are UTC days, so fetch hours and group them into local days
+        const histogram = await getAttackHistogram({ bucket: 'hour', honeypotId, start });
         
-        // Group attacks by day
         const attacksByDay: { [day: string]: number } = {};
         
         // Create last X days
@@ -50,12 +56,13 @@ const AttackDailyBarChart: React.FC<AttackDailyProps> = ({
           attacksByDay[dayKey] = 0;
         }
         
-        data.attacks.forEach((attack: any) => {
-          const date = new Date(attack.timestamp);
+        histogram.buckets.forEach((bucket) => {
+          // Bucket times are naive UTC
+          const date = new Date(/(Z|[+-]\d{2}:\d{2})$/i.test(bucket.time) ? bucket.time : `${bucket.time}Z`);
           const dayKey = date.toLocaleDateString();
           
           if (attacksByDay[dayKey] !== undefined) {
-            attacksByDay[dayKey]++;
+            attacksByDay[dayKey] += bucket.count;
           }
         });
         
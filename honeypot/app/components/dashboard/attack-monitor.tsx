@@ -22,7 +22,8 @@ export default function AttackMonitor({
   const [attacks, setAttacks] = useState<Attack[]>([]);
 
   useEffect(() => {
-    // Subscribe to real-time attacks
+    // Subscribe to real-time attacks, filtered server-side to this honeypot if given
+    const filter = honeypotId ? { honeypot_ids: [honeypotId] } : undefined;
     const unsubscribe = subscribeToAttacks((attack) => {
       // Only add attacks for this honeypot if honeypotId is provided
       if (!honeypotId || attack.honeypot_id === honeypotId) {
@@ -35,7 +36,7 @@ export default function AttackMonitor({
           return newAttacks;
         });
       }
-    });
+    }, filter);
 
     // Cleanup
     return () => {
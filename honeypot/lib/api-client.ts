@@ -34,10 +34,14 @@ export interface Attack {
   username?: string;
   password?: string;
   details: any;
+  seq?: number;  // live feed sequence number
 }
 
 export interface AttackList {
   attacks: Attack[];
+  total?: number;
+  next_cursor?: string | null;
+  prev_cursor?: string | null;
 }
 
 export interface AttackStats {
@@ -47,8 +51,44 @@ export interface AttackStats {
   daily: Record<string, number>;
 }
 
+export type HistogramBucketSize = 'minute' | 'hour' | 'day';
+
+export interface HistogramBucket {
+  time: string;
+  count: number;
+  attack_type?: string;
+  honeypot_id?: string;
+}
+
+export interface AttackHistogram {
+  start: string;
+  end: string;
+  bucket: HistogramBucketSize;
+  group_by: string[];
+  buckets: HistogramBucket[];
+}
+
+export interface HistogramQuery {
+  start?: string;
+  end?: string;
+  bucket?: HistogramBucketSize;
+  groupBy?: ('attack_type' | 'honeypot_id')[];
+  honeypotId?: string;
+}
+
+// Server-side filter for the live attack feed; omitted fields match everything
+export interface AttackSubscription {
+  honeypot_ids?: string[];
+  attack_types?: string[];
+  source_cidrs?: string[];
+}
+
 let wsConnection: WebSocket | null = null;
 let wsCallbacks: ((attack: Attack) => void)[] = [];
+const wsFilters = new Map<(attack: Attack) => void, AttackSubscription>();
+// Position in the live feed, so a reconnect only replays what was missed
+let wsEpoch: string | null = null;
+let wsLastSeq: number | null = null;
 
 // Helper function to handle API errors
 async function handleResponse(response: Response) {
@@ -118,59 +158,143 @@ export async function getAllAttacks(limit = 20, offset = 0): Promise<AttackList>
   return handleResponse(response);
 }
 
+export interface AttackChanges {
+  attacks: Attack[];  // oldest first, in ingestion order
+  cursor: number;     // pass back as `since`
+  has_more: boolean;
+}
+
+// Attacks ingested after a cursor; with waitSeconds the request long-polls until there are new ones
+export async function getAttackChanges(
+  since?: number,
+  waitSeconds = 0,
+  honeypotId?: string,
+  limit = 100
+): Promise<AttackChanges> {
+  const params = new URLSearchParams({ wait: String(waitSeconds), limit: String(limit) });
+  if (since !== undefined) params.set('since', String(since));
+  if (honeypotId) params.set('honeypot_id', honeypotId);
+  const response = await fetch(`${API_BASE_URL}/attacks/changes?${params.toString()}`);
+  return handleResponse(response);
+}
+
 export async function getAttackStats(days = 7): Promise<AttackStats> {
   const response = await fetch(`${API_BASE_URL}/attacks/stats?days=${days}`);
   return handleResponse(response);
 }
 
-// WebSocket connection for real-time attack notifications
-export function subscribeToAttacks(callback: (attack: Attack) => void): () => void {
+// Server-side time-bucketed attack counts for charts
+export async function getAttackHistogram(query: HistogramQuery = {}): Promise<AttackHistogram> {
+  const params = new URLSearchParams();
+  if (query.start) params.set('start', query.start);
+  if (query.end) params.set('end', query.end);
+  if (query.bucket) params.set('bucket', query.bucket);
+  if (query.groupBy && query.groupBy.length > 0) params.set('group_by', query.groupBy.join(','));
+  if (query.honeypotId) params.set('honeypot_id', query.honeypotId);
+
+  const response = await fetch(`${API_BASE_URL}/attacks/histogram?${params.toString()}`);
+  return handleResponse(response);
+}
+
+// Callbacks share one connection, so the server only narrows the feed when they all want the same filter
+function sendSubscription() {
+  if (!wsConnection || wsConnection.readyState !== WebSocket.OPEN) return;
+  const filters = wsCallbacks.map(cb => JSON.stringify(wsFilters.get(cb) ?? {}));
+  const shared = filters.length > 0 && filters.every(f => f === filters[0]) ? JSON.parse(filters[0]) : {};
+  const resume = wsEpoch !== null && wsLastSeq !== null ? { epoch: wsEpoch, last_seq: wsLastSeq } : {};
+  // Attacks arrive coalesced into batch frames at most every 250ms
+  wsConnection.send(JSON.stringify({
+    type: 'subscribe', ...shared, ...resume, batch_interval_ms: 250, batch_max_events: 500
+  }));
+}
+
+function deliverAttack(attack: Attack) {
+  if (attack.seq !== undefined) wsLastSeq = Math.max(wsLastSeq ?? 0, attack.seq);
+  wsCallbacks.forEach(cb => cb(attack));
+}
+
+function connectAttackSocket() {
+  const wsUrl = API_BASE_URL.replace(/^http/, 'ws') + '/ws/attacks';
+  wsConnection = new WebSocket(wsUrl);
+
+  wsConnection.onopen = () => sendSubscription();
+
+  wsConnection.onmessage = (event) => {
+    try {
+      const message = JSON.parse(event.data);
+      if (message.type === 'batch') {
+        (message.attacks as Attack[]).forEach(deliverAttack);
+        return;
+      }
+      // Control messages (subscription acks and errors) carry a type; attacks don't
+      if (message.type === 'subscribed') {
+        if (message.reset && wsLastSeq !== null) {
+          console.warn('Live attack feed could not be resumed; some attacks may be missing until the next refresh');
+        }
+        // After a server restart or a gap, continue from the server's current position
+        if (message.reset || wsEpoch === null) wsLastSeq = message.seq;
+        wsEpoch = message.epoch;
+        return;
+      }
+      if (message.type) {
+        if (message.type === 'error') console.error('WebSocket subscription error:', message.detail);
+        return;
+      }
+      // Call all registered callbacks
+      deliverAttack(message as Attack);
+    } catch (error) {
+      console.error('Error parsing WebSocket message:', error);
+    }
+  };
+
+  wsConnection.onclose = () => {
+    // Try to reconnect after a delay
+    setTimeout(() => {
+      wsConnection = null;
+      if (wsCallbacks.length > 0) {
+        connectAttackSocket();
+      }
+    }, 5000);
+  };
+
+  // Keep connection alive
+  const pingInterval = setInterval(() => {
+    if (wsConnection && wsConnection.readyState === WebSocket.OPEN) {
+      wsConnection.send('ping');
+    } else if (!wsConnection || wsConnection.readyState === WebSocket.CLOSED) {
+      clearInterval(pingInterval);
+    }
+  }, 30000);
+}
+
+// WebSocket connection for real-time attack notifications. Callbacks may still
+// receive attacks outside their filter when other subscribers use a different one.
+export function subscribeToAttacks(
+  callback: (attack: Attack) => void,
+  filter?: AttackSubscription
+): () => void {
   // Add callback to the list
   wsCallbacks.push(callback);
+  if (filter) wsFilters.set(callback, filter);
 
   // Create WebSocket connection if it doesn't exist
   if (!wsConnection) {
-    const wsUrl = API_BASE_URL.replace(/^http/, 'ws') + '/ws/attacks';
-    wsConnection = new WebSocket(wsUrl);
-
-    wsConnection.onmessage = (event) => {
-      try {
-        const attack = JSON.parse(event.data) as Attack;
-        // Call all registered callbacks
-        wsCallbacks.forEach(cb => cb(attack));
-      } catch (error) {
-        console.error('Error parsing WebSocket message:', error);
-      }
-    };
-
-    wsConnection.onclose = () => {
-      // Try to reconnect after a delay
-      setTimeout(() => {
-        wsConnection = null;
-        if (wsCallbacks.length > 0) {
-          subscribeToAttacks(() => { });
-        }
-      }, 5000);
-    };
-
-    // Keep connection alive
-    const pingInterval = setInterval(() => {
-      if (wsConnection && wsConnection.readyState === WebSocket.OPEN) {
-        wsConnection.send('ping');
-      } else if (!wsConnection || wsConnection.readyState === WebSocket.CLOSED) {
-        clearInterval(pingInterval);
-      }
-    }, 30000);
+    connectAttackSocket();
+  } else {
+    sendSubscription();
   }
 
   // Return unsubscribe function
   return () => {
     wsCallbacks = wsCallbacks.filter(cb => cb !== callback);
+    wsFilters.delete(callback);
 
     // Close connection if no more callbacks
     if (wsCallbacks.length === 0 && wsConnection) {
       wsConnection.close();
       wsConnection = null;
+    } else {
+      sendSubscription();
     }
   };
 }